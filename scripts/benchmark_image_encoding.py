@@ -0,0 +1,140 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Benchmark the raster output options for floor plan images.
+
+Lays out a floor plan spec locally (no provider calls), draws it once per
+raster mode and encodes it with every PNG compress level under test plus
+lossless WebP, and the SVG backend for comparison. Reports the median draw
+and encode time, the output size and the output sha256 for each option.
+Rendering is deterministic, so the sha256 can be compared across runs to
+spot output changes; every timed repetition is checked to produce the same
+bytes.
+
+Usage: python benchmark_image_encoding.py [--spec spec.json] [--runs 5] [--json]
+"""
+
+import os
+import sys
+import io
+import json
+import time
+import hashlib
+import argparse
+import statistics
+from contextlib import redirect_stdout
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import generate_floor_plan
+
+# A typical Gemini spec, used when no --spec file is given
+SAMPLE_SPEC = {
+    "rooms": [
+        {"name": "Living Room", "type": "living", "features": ["large window", "main door"],
+         "coordinates": {"x": 0, "y": 0, "width": 18, "height": 15}},
+        {"name": "Kitchen", "type": "kitchen", "features": ["window"],
+         "coordinates": {"x": 18, "y": 0, "width": 12, "height": 10}},
+        {"name": "Dining Room", "type": "dining", "features": [],
+         "coordinates": {"x": 30, "y": 0, "width": 12, "height": 12}},
+        {"name": "Bedroom 1", "type": "bedroom", "features": ["window", "closet"],
+         "coordinates": {"x": 0, "y": 15, "width": 12, "height": 12}},
+        {"name": "Bedroom 2", "type": "bedroom", "features": ["window"],
+         "coordinates": {"x": 12, "y": 15, "width": 12, "height": 12}},
+        {"name": "Bathroom", "type": "bathroom", "features": ["door"],
+         "coordinates": {"x": 24, "y": 15, "width": 6, "height": 8}},
+        {"name": "Pooja Room", "type": "pooja", "features": [],
+         "coordinates": {"x": 30, "y": 15, "width": 8, "height": 8}}
+    ],
+    "layout_style": "traditional",
+    "total_area": "1500 sq ft",
+    "house_dimensions": {"width": 45, "depth": 30},
+    "design_style": "indian"
+}
+
+SAMPLE_DESCRIPTION = "2 bedroom house with kitchen, dining room, pooja room and 1 bathroom"
+
+
+def _median_ms(func, runs):
+    timings = []
+    results = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        results.append(func())
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings), results[-1], results
+
+
+def _digest(outputs):
+    """sha256 of the encoded output, checking that every run produced the same bytes"""
+    digests = {hashlib.sha256(data).hexdigest() for data in outputs}
+    if len(digests) != 1:
+        raise RuntimeError(f"Output changed between runs: {sorted(digests)}")
+    return digests.pop()
+
+
+def run_benchmark(spec, description, runs=5, compress_levels=(1, 6, 9)):
+    """Time drawing and encoding for every output option and return one row per option"""
+    with redirect_stdout(io.StringIO()):
+        layout = generate_floor_plan.layout_floor_plan(description, spec)
+
+    rows = []
+    for raster_mode in ('rgb', 'palette', 'bilevel'):
+        draw_ms, img, _ = _median_ms(lambda: generate_floor_plan.draw_floor_plan(layout, raster_mode), runs)
+        options = [('png', level) for level in compress_levels] + [('webp', None)]
+        for image_format, level in options:
+            encode_ms, data, outputs = _median_ms(
+                lambda: generate_floor_plan.encode_raster(img, image_format, level), runs)
+            rows.append({
+                "format": image_format,
+                "rasterMode": raster_mode,
+                "compressLevel": level,
+                "drawMs": round(draw_ms, 2),
+                "encodeMs": round(encode_ms, 2),
+                "bytes": len(data),
+                "sha256": _digest(outputs)
+            })
+
+    svg_ms, data, outputs = _median_ms(lambda: generate_floor_plan.render_floor_plan_svg(layout), runs)
+    rows.append({
+        "format": "svg",
+        "rasterMode": None,
+        "compressLevel": None,
+        "drawMs": round(svg_ms, 2),
+        "encodeMs": 0.0,
+        "bytes": len(data),
+        "sha256": _digest(outputs)
+    })
+    return rows
+
+
+def main():
+    """Main function to run the encoding benchmark"""
+    parser = argparse.ArgumentParser(description="Benchmark floor plan image encoding options")
+    parser.add_argument("--spec", help="Path to a floor plan spec JSON file (defaults to a built-in sample)")
+    parser.add_argument("--description", default=SAMPLE_DESCRIPTION)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--json", action="store_true", help="Print results as JSON")
+    args = parser.parse_args()
+
+    spec = SAMPLE_SPEC
+    if args.spec:
+        with open(args.spec, 'r', encoding='utf-8') as f:
+            spec = json.load(f)
+
+    rows = run_benchmark(spec, args.description, args.runs)
+
+    if args.json:
+        print(json.dumps(rows, indent=2))
+        return
+
+    print(f"{'format':<6} {'raster':<8} {'level':>5} {'draw ms':>9} {'encode ms':>10} {'bytes':>9}  sha256")
+    for row in rows:
+        level = '' if row['compressLevel'] is None else row['compressLevel']
+        print(f"{row['format']:<6} {row['rasterMode'] or '':<8} {level:>5} "
+              f"{row['drawMs']:>9.1f} {row['encodeMs']:>10.1f} {row['bytes']:>9}  {row['sha256'][:12]}")
+
+
+if __name__ == "__main__":
+    main()
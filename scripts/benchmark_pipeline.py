@@ -0,0 +1,279 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Per-stage latency benchmark for floor plan generation.
+
+Gemini and Groq are replaced by canned responses for plans of 5, 20 and 100
+rooms, so the numbers measure only local work and are comparable between
+machines and runs. Every stage is timed separately:
+
+    analyze    get_floor_plan_details_from_gemini() on the canned response
+    parse      parse_floor_plan_spec() (extract and validate) on the raw response text
+    census     room type extraction and design style detection
+    recommend  get_painting_recommendations_from_groq() on the canned response
+    layout     layout_floor_plan() (packing, validation and repair)
+    draw       draw_floor_plan() in the configured raster mode
+    encode     PNG encoding
+    base64     base64 of the PNG, as sent in base64 output mode
+    save       save_results() into a temporary directory
+
+Results are p50/p95 milliseconds per stage and plan size. Save a run with
+--save-baseline and compare later runs with --baseline; a stage regresses
+when its p50 grows by more than --threshold and by at least --min-delta-ms.
+The script exits with status 1 on any regression.
+
+Usage: python benchmark_pipeline.py [--sizes 5,20,100] [--runs 20] [--json]
+           [--baseline FILE] [--save-baseline FILE] [--threshold 1.25]
+"""
+
+import os
+import sys
+import io
+import json
+import math
+import time
+import base64
+import shutil
+import argparse
+import tempfile
+from contextlib import contextmanager, redirect_stdout
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import generate_floor_plan
+
+STAGES = ['analyze', 'parse', 'census', 'recommend', 'layout', 'draw', 'encode', 'base64', 'save']
+
+ROOM_CYCLE = [('Living Room', 'living'), ('Kitchen', 'kitchen'), ('Dining Room', 'dining'),
+              ('Bedroom', 'bedroom'), ('Bathroom', 'bathroom'), ('Pooja Room', 'pooja'),
+              ('Study', 'study'), ('Balcony', 'balcony')]
+
+ROOM_WIDTH = 12
+ROOM_DEPTH = 10
+
+
+def make_spec(room_count):
+    """A valid Gemini-style spec with room_count rooms laid out on a grid"""
+    columns = math.ceil(math.sqrt(room_count))
+    rows = math.ceil(room_count / columns)
+    rooms = []
+    for i in range(room_count):
+        name, room_type = ROOM_CYCLE[i % len(ROOM_CYCLE)]
+        if i >= len(ROOM_CYCLE):
+            name = f"{name} {i // len(ROOM_CYCLE) + 1}"
+        row, column = divmod(i, columns)
+        rooms.append({
+            "name": name,
+            "type": room_type,
+            "dimensions": f"{ROOM_WIDTH} x {ROOM_DEPTH}",
+            "position": "center",
+            "adjacent_to": [rooms[-1]["name"]] if column else [],
+            "features": ["window", "door"],
+            "coordinates": {"x": column * ROOM_WIDTH, "y": row * ROOM_DEPTH,
+                            "width": ROOM_WIDTH, "height": ROOM_DEPTH}
+        })
+    return {
+        "rooms": rooms,
+        "layout_style": "traditional",
+        "total_area": f"{columns * ROOM_WIDTH * rows * ROOM_DEPTH} sq ft",
+        "special_features": [],
+        "house_shape": "rectangular",
+        "house_dimensions": {"width": columns * ROOM_WIDTH, "depth": rows * ROOM_DEPTH},
+        "design_style": "indian"
+    }
+
+
+def make_recommendations(spec):
+    """A Groq-style recommendation document covering every room type in the spec"""
+    room_types = sorted({room['type'] for room in spec['rooms']})
+    return {
+        "overall_theme": "Warm neutrals with blue accents",
+        "rooms": [{
+            "room_type": room_type,
+            "color_options": [{"name": f"Shade {i + 1}", "brand": "Asian Paints", "code": f"AP-{1000 + i}",
+                               "finish": "Matte", "cost_per_sqft": "Rs.15-20"} for i in range(3)],
+            "techniques": "Two coats over primer",
+            "maintenance": "Wipe with a damp cloth"
+        } for room_type in room_types],
+        "tips": ["Test a patch before painting a whole wall"]
+    }
+
+
+class CannedResponse:
+    """Just enough of requests.Response for the provider code paths"""
+
+    status_code = 200
+
+    def __init__(self, payload):
+        self.text = json.dumps(payload)
+
+    def json(self):
+        return json.loads(self.text)
+
+
+def canned_responses(spec):
+    """Return (gemini_response, groq_response, gemini_text) for a spec"""
+    gemini_text = f"```json\n{json.dumps(spec, indent=2)}\n```"
+    gemini = CannedResponse({"candidates": [{"content": {"parts": [{"text": gemini_text}]}}]})
+    groq_text = f"Here are my recommendations:\n{json.dumps(make_recommendations(spec), indent=2)}"
+    groq = CannedResponse({"choices": [{"message": {"content": groq_text}}]})
+    return gemini, groq, gemini_text
+
+
+@contextmanager
+def stubbed_providers(gemini_response, groq_response):
+    """Serve canned provider responses with caching off, restoring everything afterwards"""
+    module = generate_floor_plan
+    saved = (module.gemini_client.post_json, module.groq_client.post_json,
+             module.GOOGLE_API_KEY, module.GROQ_API_KEY,
+             module.spec_cache.enabled, module.paint_cache.enabled)
+    module.gemini_client.post_json = lambda *args, **kwargs: gemini_response
+    module.groq_client.post_json = lambda *args, **kwargs: groq_response
+    module.GOOGLE_API_KEY = module.GROQ_API_KEY = 'benchmark'
+    module.spec_cache.enabled = module.paint_cache.enabled = False
+    try:
+        yield
+    finally:
+        (module.gemini_client.post_json, module.groq_client.post_json,
+         module.GOOGLE_API_KEY, module.GROQ_API_KEY,
+         module.spec_cache.enabled, module.paint_cache.enabled) = saved
+
+
+def _percentile(values, pct):
+    """Nearest-rank percentile"""
+    ordered = sorted(values)
+    rank = max(math.ceil(pct / 100 * len(ordered)), 1)
+    return ordered[rank - 1]
+
+
+def _timed(timings, stage, func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    timings[stage].append((time.perf_counter() - start) * 1000)
+    return result
+
+
+def run_stages(room_count, runs):
+    """Run every stage runs times for one plan size and return {stage: [ms, ...]}.
+
+    An untimed warm-up run comes first, so one-off costs such as lazy
+    imports and font loading don't land in the first sample.
+    """
+    module = generate_floor_plan
+    spec = make_spec(room_count)
+    description = f"{room_count} room house with kitchen, living room and dining room"
+    gemini_response, groq_response, gemini_text = canned_responses(spec)
+    timings = {stage: [] for stage in STAGES}
+
+    def census(specs):
+        room_types = module.extract_room_types(specs, description)
+        return module.canonical_room_types(room_types), module.detect_design_style(specs, description)
+
+    output_dir = tempfile.mkdtemp(prefix='floor-plan-benchmark-')
+    cwd = os.getcwd()
+    try:
+        os.chdir(output_dir)
+        with stubbed_providers(gemini_response, groq_response), redirect_stdout(io.StringIO()):
+            # Run 0 is the warm-up; its timings go to a dict that is thrown away
+            for run in range(runs + 1):
+                sample = timings if run else {stage: [] for stage in STAGES}
+                specs = _timed(sample, 'analyze', module.get_floor_plan_details_from_gemini, description)
+                _timed(sample, 'parse', module.parse_floor_plan_spec, gemini_text)
+                _timed(sample, 'census', census, specs)
+                recommendations = _timed(sample, 'recommend', module.get_painting_recommendations_from_groq,
+                                         specs, description)
+                layout = _timed(sample, 'layout', module.layout_floor_plan, description, specs)
+                img = _timed(sample, 'draw', module.draw_floor_plan, layout, module.RASTER_MODE)
+                image_bytes = _timed(sample, 'encode', module.encode_raster, img, 'png')
+                _timed(sample, 'base64', base64.b64encode, image_bytes)
+                _timed(sample, 'save', module.save_results, f"benchmark-{room_count}-{run}", description,
+                       image_bytes, recommendations)
+    finally:
+        os.chdir(cwd)
+        shutil.rmtree(output_dir, ignore_errors=True)
+    return timings
+
+
+def run_benchmark(sizes=(5, 20, 100), runs=20):
+    """Time every stage for each plan size and return p50/p95 per stage"""
+    results = {}
+    for room_count in sizes:
+        timings = run_stages(room_count, runs)
+        results[str(room_count)] = {
+            stage: {"p50Ms": round(_percentile(values, 50), 3), "p95Ms": round(_percentile(values, 95), 3)}
+            for stage, values in timings.items()
+        }
+    return {"runs": runs, "rasterMode": generate_floor_plan.RASTER_MODE, "sizes": results}
+
+
+def compare(results, baseline, threshold=1.25, min_delta_ms=0.5):
+    """Compare p50 per stage against a baseline run and flag regressions"""
+    comparison = {}
+    for size, stages in results['sizes'].items():
+        baseline_stages = baseline.get('sizes', {}).get(size, {})
+        for stage, figures in stages.items():
+            if stage not in baseline_stages:
+                continue
+            before = baseline_stages[stage]['p50Ms']
+            after = figures['p50Ms']
+            ratio = after / before if before else None
+            comparison.setdefault(size, {})[stage] = {
+                "baselineP50Ms": before,
+                "p50Ms": after,
+                "ratio": round(ratio, 3) if ratio is not None else None,
+                "regressed": ratio is not None and ratio > threshold and after - before >= min_delta_ms
+            }
+    return comparison
+
+
+def main():
+    """Main function to run the per-stage benchmark"""
+    parser = argparse.ArgumentParser(description="Benchmark each floor plan stage with stubbed providers")
+    parser.add_argument("--sizes", default="5,20,100", help="Comma separated room counts")
+    parser.add_argument("--runs", type=int, default=20)
+    parser.add_argument("--json", action="store_true", help="Print results as JSON")
+    parser.add_argument("--baseline", help="Results file from an earlier run to compare against")
+    parser.add_argument("--save-baseline", help="Write this run's results to a file for later comparison")
+    parser.add_argument("--threshold", type=float, default=1.25,
+                        help="p50 ratio over the baseline that counts as a regression")
+    parser.add_argument("--min-delta-ms", type=float, default=0.5,
+                        help="Ignore regressions smaller than this many milliseconds")
+    args = parser.parse_args()
+
+    sizes = [int(size) for size in args.sizes.split(',') if size.strip()]
+    results = run_benchmark(sizes, args.runs)
+
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            results['comparison'] = compare(results, json.load(f), args.threshold, args.min_delta_ms)
+
+    if args.save_baseline:
+        with open(args.save_baseline, 'w', encoding='utf-8') as f:
+            json.dump({"runs": results['runs'], "rasterMode": results['rasterMode'],
+                       "sizes": results['sizes']}, f, indent=2)
+
+    comparison = results.get('comparison', {})
+    regressions = [(size, stage) for size, stages in comparison.items()
+                   for stage, figures in stages.items() if figures['regressed']]
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        print(f"{'rooms':>5} {'stage':<10} {'p50 ms':>9} {'p95 ms':>9} {'base p50':>9} {'ratio':>6}")
+        for size, stages in results['sizes'].items():
+            for stage, figures in stages.items():
+                base = comparison.get(size, {}).get(stage)
+                base_p50 = f"{base['baselineP50Ms']:>9.3f}" if base else f"{'':>9}"
+                ratio = f"{base['ratio']:>6.2f}" if base and base['ratio'] is not None else f"{'':>6}"
+                flag = "  REGRESSED" if base and base['regressed'] else ""
+                print(f"{size:>5} {stage:<10} {figures['p50Ms']:>9.3f} {figures['p95Ms']:>9.3f} {base_p50} {ratio}{flag}")
+
+    if regressions:
+        print(f"{len(regressions)} stages regressed: " +
+              ", ".join(f"{stage} ({size} rooms)" for size, stage in regressions), file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,265 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Local stand-in for the Gemini and Groq APIs, for offline load testing.
+
+Serves provider responses recorded with FLOOR_PLAN_RECORD_DIR (see
+floor_plan_providers.py). A request whose path and payload match a
+recording gets that recording. Any other request gets the provider's
+recordings in turn, preferring ones made for the same API path, so load
+tests with fresh descriptions still receive realistic responses. Streaming
+requests (Gemini's :streamGenerateContent?alt=sse) are answered with
+server-sent events, with the latency spread over the events. Each response
+can be delayed by a lognormal latency, failed with a 500 at a given rate,
+or throttled with 429 bursts that repeat on a fixed period.
+
+Point the generator at it with:
+    GEMINI_API_BASE=http://127.0.0.1:8766/gemini
+    GROQ_API_BASE=http://127.0.0.1:8766/groq
+
+Usage: python fake_provider_server.py <fixture_dir> [--port 8766]
+           [--gemini-latency-ms 1500] [--groq-latency-ms 600] [--latency-sigma 0.5]
+           [--error-rate 0.02] [--burst-every 60 --burst-seconds 5] [--seed N]
+
+Endpoints:
+    POST /gemini/<path>  -> recorded Gemini response (server-sent events for streaming calls)
+    POST /groq/<path>    -> recorded Groq response
+    GET  /stats          -> request, replay, error and throttle counts per provider
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import threading
+from itertools import count
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from floor_plan_providers import fixture_key
+
+PROVIDERS = ('gemini', 'groq')
+
+
+class FixtureStore:
+    """Recorded responses per provider, looked up by request key"""
+
+    def __init__(self, fixture_dir):
+        self.by_key = {}
+        self.by_provider = {provider: [] for provider in PROVIDERS}
+        self.by_path = {}
+        self._turns = {}
+        for provider in PROVIDERS:
+            provider_dir = os.path.join(fixture_dir, provider)
+            if not os.path.isdir(provider_dir):
+                continue
+            for name in sorted(os.listdir(provider_dir)):
+                if not name.endswith('.json'):
+                    continue
+                with open(os.path.join(provider_dir, name), 'r', encoding='utf-8') as f:
+                    fixture = json.load(f)
+                self.by_key[(provider, name[:-len('.json')])] = fixture
+                self.by_provider[provider].append(fixture)
+                self.by_path.setdefault((provider, fixture.get('path')), []).append(fixture)
+
+    def lookup(self, provider, path, payload):
+        """Return (fixture, exact) for a request, or (None, False) without recordings"""
+        fixture = self.by_key.get((provider, fixture_key(path, payload)))
+        if fixture is not None:
+            return fixture, True
+        group = (provider, path.strip('/'))
+        fixtures = self.by_path.get(group)
+        if not fixtures:
+            group = provider
+            fixtures = self.by_provider.get(provider)
+        if not fixtures:
+            return None, False
+        turn = next(self._turns.setdefault(group, count()))
+        return fixtures[turn % len(fixtures)], False
+
+
+def merge_events(events):
+    """Join streamed Gemini events into one generateContent-style response"""
+    text = ''.join(part.get('text', '')
+                   for event in events
+                   for candidate in (event.get('candidates') or [])[:1]
+                   for part in candidate.get('content', {}).get('parts', []))
+    return {"candidates": [{"content": {"parts": [{"text": text}], "role": "model"}}]}
+
+
+class FaultModel:
+    """Latency, error and throttling behaviour of the fake providers"""
+
+    def __init__(self, latency_ms, latency_sigma=0.5, error_rate=0.0, burst_every=0, burst_seconds=0,
+                 retry_after=1, seed=None):
+        self.latency_ms = latency_ms
+        self.latency_sigma = latency_sigma
+        self.error_rate = error_rate
+        self.burst_every = burst_every
+        self.burst_seconds = burst_seconds
+        self.retry_after = retry_after
+        self.started = time.monotonic()
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def delay(self, provider):
+        """Seconds to wait before answering, drawn around the provider's median latency"""
+        median = self.latency_ms.get(provider, 0)
+        if median <= 0:
+            return 0.0
+        with self._lock:
+            return median * self._random.lognormvariate(0, self.latency_sigma) / 1000
+
+    def throttled(self):
+        """True during the 429 burst at the start of every burst period"""
+        if self.burst_every <= 0 or self.burst_seconds <= 0:
+            return False
+        return (time.monotonic() - self.started) % self.burst_every < self.burst_seconds
+
+    def failed(self):
+        with self._lock:
+            return self._random.random() < self.error_rate
+
+
+class FakeProviderHandler(BaseHTTPRequestHandler):
+    """Answer provider API calls from recorded fixtures"""
+
+    protocol_version = "HTTP/1.1"
+
+    def _send_json(self, status, payload, headers=None):
+        body = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_events(self, events, delay):
+        """Stream events as server-sent events, spreading the delay over them"""
+        pause = delay / (len(events) + 1)
+        time.sleep(pause)
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        self.close_connection = True
+        for event in events:
+            time.sleep(pause)
+            self.wfile.write(f"data: {json.dumps(event)}\r\n\r\n".encode('utf-8'))
+            self.wfile.flush()
+
+    def _count(self, provider, outcome):
+        stats = self.server.stats
+        with self.server.stats_lock:
+            stats[provider][outcome] = stats[provider].get(outcome, 0) + 1
+
+    def do_GET(self):
+        if self.path == "/stats":
+            with self.server.stats_lock:
+                self._send_json(200, self.server.stats)
+        else:
+            self._send_json(404, {"error": {"message": "Not found"}})
+
+    def do_POST(self):
+        provider, _, path = self.path.lstrip('/').partition('/')
+        path, _, query = path.partition('?')
+        streaming = path.endswith(':streamGenerateContent') or 'alt=sse' in query
+        length = int(self.headers.get('Content-Length', 0))
+        body = self.rfile.read(length) if length else b''
+
+        if provider not in PROVIDERS:
+            self._send_json(404, {"error": {"message": f"Unknown provider: {provider}"}})
+            return
+        self._count(provider, 'requests')
+
+        faults = self.server.faults
+        if faults.throttled():
+            self._count(provider, 'throttled')
+            self._send_json(429, {"error": {"message": "Rate limit exceeded"}},
+                            headers={"Retry-After": str(faults.retry_after)})
+            return
+
+        try:
+            payload = json.loads(body or b'null')
+        except json.JSONDecodeError:
+            self._send_json(400, {"error": {"message": "Request body is not valid JSON"}})
+            return
+
+        fixture, exact = self.server.fixtures.lookup(provider, path, payload)
+        delay = faults.delay(provider)
+
+        if faults.failed():
+            time.sleep(delay)
+            self._count(provider, 'errors')
+            self._send_json(500, {"error": {"message": "Injected server error"}})
+            return
+
+        if fixture is None:
+            self._count(provider, 'missing')
+            self._send_json(404, {"error": {"message": f"No recordings for {provider}"}})
+            return
+        self._count(provider, 'replayed' if exact else 'substituted')
+
+        recorded = fixture['body']
+        if streaming:
+            self._send_events(recorded if isinstance(recorded, list) else [recorded], delay)
+        else:
+            time.sleep(delay)
+            self._send_json(fixture.get('status', 200),
+                            merge_events(recorded) if isinstance(recorded, list) else recorded)
+
+    def log_message(self, format, *args):
+        # Load tests send thousands of requests; keep the console quiet
+        pass
+
+
+def serve(fixture_dir, host='127.0.0.1', port=8766, faults=None):
+    """Serve recorded provider responses until interrupted"""
+    server = ThreadingHTTPServer((host, port), FakeProviderHandler)
+    server.daemon_threads = True
+    server.fixtures = FixtureStore(fixture_dir)
+    server.faults = faults or FaultModel({})
+    server.stats = {provider: {} for provider in PROVIDERS}
+    server.stats_lock = threading.Lock()
+
+    loaded = ", ".join(f"{len(server.fixtures.by_provider[p])} {p}" for p in PROVIDERS)
+    print(f"Fake providers listening on http://{host}:{port} with {loaded} recordings")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+def main():
+    """Main function to run the fake provider server"""
+    parser = argparse.ArgumentParser(description="Replay recorded Gemini/Groq responses for load testing")
+    parser.add_argument("fixture_dir", help="Directory recorded with FLOOR_PLAN_RECORD_DIR")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8766)
+    parser.add_argument("--gemini-latency-ms", type=float, default=0, help="Median Gemini latency")
+    parser.add_argument("--groq-latency-ms", type=float, default=0, help="Median Groq latency")
+    parser.add_argument("--latency-sigma", type=float, default=0.5,
+                        help="Spread of the lognormal latency; 0 makes every response take the median")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of requests answered with 500")
+    parser.add_argument("--burst-every", type=float, default=0, help="Seconds between the starts of 429 bursts")
+    parser.add_argument("--burst-seconds", type=float, default=0, help="Length of each 429 burst in seconds")
+    parser.add_argument("--retry-after", type=int, default=1, help="Retry-After seconds sent with 429s")
+    parser.add_argument("--seed", type=int, default=None, help="Seed for reproducible latency and errors")
+    args = parser.parse_args()
+
+    faults = FaultModel({'gemini': args.gemini_latency_ms, 'groq': args.groq_latency_ms},
+                        args.latency_sigma, args.error_rate, args.burst_every, args.burst_seconds,
+                        args.retry_after, args.seed)
+    serve(args.fixture_dir, args.host, args.port, faults)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+# -*- coding: utf-8 -*-
+
+"""
+Versioned per-project generation artifacts.
+
+Every generation saves the parsed Gemini spec, the resolved layout (room
+rectangles in pixels) and the paint recommendations as a new revision
+under <artifact dir>/<projectId>/r<N>.json. render_from_spec.py rebuilds
+images from these revisions offline. It reuses the stored layout, or
+recomputes the layout from the stored spec when the layout code has
+changed since. Either way a re-render needs no provider calls.
+
+Only the newest FLOOR_PLAN_ARTIFACT_KEEP revisions of a project are kept;
+saving a revision prunes older ones (0 keeps every revision).
+
+Artifacts carry ARTIFACT_VERSION, the version of this file format, so an
+older reader refuses an artifact it can't understand instead of
+misreading it.
+"""
+
+import os
+import re
+import json
+import time
+import threading
+
+import floor_plan_config  # loads .env.local before the settings below are read
+
+ARTIFACT_DIR = os.getenv('FLOOR_PLAN_ARTIFACT_DIR', os.path.join('data', 'floor-plans'))
+
+# Revisions kept per project; 0 keeps them all
+ARTIFACT_KEEP = int(os.getenv('FLOOR_PLAN_ARTIFACT_KEEP', '10'))
+
+# Version of the artifact format; bump when fields change meaning
+ARTIFACT_VERSION = 1
+
+_REVISION_FILE = re.compile(r'^r(\d+)\.json$')
+
+
+def _project_dir(project_id, artifact_dir=None):
+    return os.path.join(artifact_dir or ARTIFACT_DIR, str(project_id))
+
+
+def list_revisions(project_id, artifact_dir=None):
+    """Revision numbers saved for a project, oldest first"""
+    try:
+        names = os.listdir(_project_dir(project_id, artifact_dir))
+    except FileNotFoundError:
+        return []
+    return sorted(int(match.group(1)) for match in map(_REVISION_FILE.match, names) if match)
+
+
+def list_projects(artifact_dir=None):
+    """Project ids that have at least one saved revision"""
+    root = artifact_dir or ARTIFACT_DIR
+    if not os.path.isdir(root):
+        return []
+    return sorted(name for name in os.listdir(root) if list_revisions(name, root))
+
+
+def prune_artifacts(project_id, keep=None, artifact_dir=None):
+    """Delete all but the project's newest `keep` revisions and return how many were deleted"""
+    if keep is None:
+        keep = ARTIFACT_KEEP
+    if keep <= 0:
+        return 0
+    removed = 0
+    for revision in list_revisions(project_id, artifact_dir)[:-keep]:
+        try:
+            os.remove(os.path.join(_project_dir(project_id, artifact_dir), f"r{revision}.json"))
+            removed += 1
+        except FileNotFoundError:
+            # A concurrent save already pruned it
+            pass
+    return removed
+
+
+def save_artifact(project_id, artifact, artifact_dir=None):
+    """Save the artifact as the project's next revision, prune old ones and return (revision, path)"""
+    directory = _project_dir(project_id, artifact_dir)
+    os.makedirs(directory, exist_ok=True)
+    revisions = list_revisions(project_id, artifact_dir)
+    revision = (revisions[-1] if revisions else 0) + 1
+    created_at = time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime())
+    tmp_path = os.path.join(directory, f".r{os.getpid()}-{threading.get_ident()}.tmp")
+    try:
+        while True:
+            record = dict(artifact, artifactVersion=ARTIFACT_VERSION, projectId=str(project_id),
+                          revision=revision, createdAt=created_at)
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(record, f)
+            path = os.path.join(directory, f"r{revision}.json")
+            try:
+                # Linking claims the revision number even against a concurrent writer,
+                # and readers never see a half-written file
+                os.link(tmp_path, path)
+            except FileExistsError:
+                revision += 1
+                continue
+            prune_artifacts(project_id, artifact_dir=artifact_dir)
+            return revision, path
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def load_artifact(project_id, revision=None, artifact_dir=None):
+    """Load a project's revision (default: the latest), or None if it has none"""
+    if revision is None:
+        revisions = list_revisions(project_id, artifact_dir)
+        if not revisions:
+            return None
+        revision = revisions[-1]
+    path = os.path.join(_project_dir(project_id, artifact_dir), f"r{revision}.json")
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            artifact = json.load(f)
+    except FileNotFoundError:
+        return None
+    if artifact.get('artifactVersion', 0) > ARTIFACT_VERSION:
+        raise ValueError(f"{path} uses artifact format {artifact['artifactVersion']}, "
+                         f"this code reads up to {ARTIFACT_VERSION}")
+    return artifact
@@ -0,0 +1,170 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Batch floor plan generation over a JSONL manifest.
+
+Each manifest line is a record like {"projectId": "...", "description": "..."}.
+Provider calls (Gemini, Groq) are I/O bound and run on a bounded thread
+pool. Layout, rendering and saving are CPU bound and run on a process
+pool. One result line per record is appended to the output JSONL as soon
+as that record finishes. Its timings hold the provider spans followed by
+the render process's spans. Rerunning with the same output file skips every
+project that already has a successful result, so a crashed backfill
+resumes where it stopped.
+
+Usage: python floor_plan_batch.py <manifest.jsonl> <results.jsonl>
+           [--render-workers N] [--provider-workers N] [--format png|webp|svg]
+"""
+
+import os
+import sys
+import json
+import argparse
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import generate_floor_plan
+from floor_plan_trace import join_summaries, tracing
+
+
+def load_completed(output_path):
+    """Return the project ids that already have a successful result line"""
+    completed = set()
+    if not os.path.exists(output_path):
+        return completed
+    with open(output_path, 'r', encoding='utf-8') as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                # A crash can leave a truncated last line behind
+                continue
+            if record.get('success') and record.get('projectId'):
+                completed.add(str(record['projectId']))
+    return completed
+
+
+def read_manifest(manifest_path, completed):
+    """Yield (project_id, description) for each pending manifest record"""
+    with open(manifest_path, 'r', encoding='utf-8') as f:
+        for line_number, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError as e:
+                print(f"Skipping manifest line {line_number}: {e}")
+                continue
+            project_id = record.get('projectId')
+            description = record.get('description')
+            if not project_id or not description:
+                print(f"Skipping manifest line {line_number}: projectId and description are required")
+                continue
+            if str(project_id) in completed:
+                continue
+            yield str(project_id), description
+
+
+def run_providers(project_id, description):
+    """Run the provider stages in their own trace and return the stages with its summary"""
+    with tracing('providers', projectId=project_id) as trace:
+        stages = generate_floor_plan.run_provider_stages(description)
+    stages['timings'] = trace.summary()
+    return stages
+
+
+def run_batch(manifest_path, output_path, render_workers=None, provider_workers=8, image_format=None):
+    """Generate every pending manifest record and append one result line per record"""
+    render_workers = render_workers or os.cpu_count() or 1
+    completed = load_completed(output_path)
+    if completed:
+        print(f"Resuming: {len(completed)} projects already done")
+
+    pending = read_manifest(manifest_path, completed)
+    # Bound the work in flight so huge manifests don't pile up specs in memory
+    max_provider_jobs = provider_workers * 2
+    max_render_jobs = render_workers * 2
+
+    counts = {'succeeded': 0, 'failed': 0}
+
+    # Spawn render processes rather than fork them: the provider threads may hold
+    # locks (HTTP sessions, rate limiters, caches) that a forked child would inherit locked
+    with open(output_path, 'a', encoding='utf-8') as output, \
+            ThreadPoolExecutor(max_workers=provider_workers) as provider_pool, \
+            ProcessPoolExecutor(max_workers=render_workers,
+                                mp_context=multiprocessing.get_context('spawn')) as render_pool:
+
+        def write_result(result):
+            output.write(json.dumps(result) + '\n')
+            output.flush()
+            counts['succeeded' if result.get('success') else 'failed'] += 1
+
+        provider_jobs = {}
+        render_jobs = {}
+        exhausted = False
+
+        while True:
+            # Only start provider calls while the render pool can absorb their output
+            while not exhausted and len(provider_jobs) < max_provider_jobs and len(render_jobs) < max_render_jobs:
+                try:
+                    project_id, description = next(pending)
+                except StopIteration:
+                    exhausted = True
+                    break
+                description = description.replace('₹', 'Rs.')
+                future = provider_pool.submit(run_providers, project_id, description)
+                provider_jobs[future] = (project_id, description)
+
+            if not provider_jobs and not render_jobs:
+                break
+
+            done, _ = wait(list(provider_jobs) + list(render_jobs), return_when=FIRST_COMPLETED)
+            for future in done:
+                if future in provider_jobs:
+                    project_id, description = provider_jobs.pop(future)
+                    try:
+                        stages = future.result()
+                    except Exception as e:
+                        write_result({"success": False, "projectId": project_id, "error": str(e)})
+                        continue
+                    render_future = render_pool.submit(
+                        generate_floor_plan.finish_generation, project_id, description,
+                        stages['floor_plan_specs'], stages['painting_recommendations'], image_format)
+                    render_jobs[render_future] = (project_id, stages['timings'])
+                else:
+                    project_id, provider_timings = render_jobs.pop(future)
+                    try:
+                        result = future.result()
+                        # The render trace was recorded in another process; put the provider spans first
+                        result['timings'] = join_summaries(provider_timings, result['timings'])
+                        write_result(result)
+                    except Exception as e:
+                        write_result({"success": False, "projectId": project_id, "error": str(e)})
+
+    print(f"Batch finished: {counts['succeeded']} succeeded, {counts['failed']} failed")
+    return counts
+
+
+def main():
+    """Main function to run a batch of floor plan generations"""
+    parser = argparse.ArgumentParser(description="Generate floor plans for every record in a JSONL manifest")
+    parser.add_argument("manifest", help="JSONL file of {projectId, description} records")
+    parser.add_argument("output", help="JSONL file that results are appended to; reused to resume")
+    parser.add_argument("--render-workers", type=int, default=None,
+                        help="Processes for layout and rendering (default: CPU count)")
+    parser.add_argument("--provider-workers", type=int, default=8,
+                        help="Threads for concurrent Gemini/Groq calls")
+    parser.add_argument("--format", choices=sorted(generate_floor_plan.IMAGE_MIME_TYPES), default=None)
+    args = parser.parse_args()
+
+    counts = run_batch(args.manifest, args.output, args.render_workers, args.provider_workers, args.format)
+    if counts['failed']:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
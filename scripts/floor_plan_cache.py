@@ -0,0 +1,154 @@
+# -*- coding: utf-8 -*-
+
+"""
+Persistent on-disk cache for provider responses.
+
+Entries are JSON files named by a SHA-256 content key, so identical
+requests from any process (CLI, worker, batch jobs) share results. Each
+entry records when it was created for TTL expiry, and its file mtime is
+refreshed on every hit so eviction can drop the least recently used
+entries once the cache holds more than max_entries.
+"""
+
+import os
+import re
+import json
+import time
+import hashlib
+import tempfile
+import threading
+
+import floor_plan_config  # loads .env.local before the settings below are read
+
+# Cache root, relative to the project root the generator runs from
+CACHE_DIR = os.getenv('FLOOR_PLAN_CACHE_DIR', os.path.join('.cache', 'floor-plans'))
+CACHE_ENABLED = os.getenv('FLOOR_PLAN_CACHE', '1').lower() not in ('0', 'false', 'no')
+
+
+def normalize_text(text):
+    """Normalize free text so trivially different inputs share a cache key"""
+    text = text.replace('₹', 'Rs.').lower()
+    text = re.sub(r'\s+', ' ', text)
+    return text.strip(' .')
+
+
+def make_key(*parts):
+    """Build a content-addressed key from the given parts"""
+    payload = json.dumps(parts, sort_keys=True, ensure_ascii=False, separators=(',', ':'))
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class DiskCache:
+    """A namespaced JSON cache on disk with TTL and LRU eviction"""
+
+    def __init__(self, namespace, ttl=None, max_entries=1000, root=None, enabled=None):
+        self.directory = os.path.join(root or CACHE_DIR, namespace)
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.enabled = CACHE_ENABLED if enabled is None else enabled
+        self._lock = threading.Lock()
+        self._counters = {'hits': 0, 'misses': 0, 'expired': 0, 'sets': 0, 'evictions': 0}
+
+    def _count(self, name, amount=1):
+        with self._lock:
+            self._counters[name] += amount
+
+    def _path(self, key):
+        return os.path.join(self.directory, key[:2], f"{key}.json")
+
+    def get(self, key):
+        """Return the cached value for key, or None on a miss or expired entry"""
+        if not self.enabled:
+            return None
+
+        path = self._path(key)
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            self._count('misses')
+            return None
+
+        if self.ttl and time.time() - entry.get('created', 0) > self.ttl:
+            self._remove(path)
+            self._count('expired')
+            self._count('misses')
+            return None
+
+        self._count('hits')
+
+        # Refresh the mtime so LRU eviction keeps recently used entries
+        try:
+            os.utime(path, None)
+        except OSError:
+            pass
+        return entry.get('value')
+
+    def set(self, key, value):
+        """Store value under key, then evict old entries if the cache is full"""
+        if not self.enabled:
+            return
+
+        path = self._path(key)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            # Write to a temporary file first so readers never see a partial entry
+            fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump({'created': time.time(), 'value': value}, f)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            print(f"Warning: could not write cache entry {key}: {e}")
+            return
+
+        self._count('sets')
+        self._evict()
+
+    def stats(self):
+        """Return hit/miss counters for this process plus the current entry count"""
+        with self._lock:
+            stats = dict(self._counters)
+        lookups = stats['hits'] + stats['misses']
+        stats['hit_rate'] = round(stats['hits'] / lookups, 3) if lookups else 0.0
+        stats['entries'] = len(self._entries())
+        stats['max_entries'] = self.max_entries
+        return stats
+
+    def clear(self):
+        """Remove every entry in this namespace"""
+        for path, _ in self._entries():
+            self._remove(path)
+
+    def _entries(self):
+        entries = []
+        if not os.path.isdir(self.directory):
+            return entries
+        for shard in os.scandir(self.directory):
+            if not shard.is_dir():
+                continue
+            for entry in os.scandir(shard.path):
+                if entry.name.endswith('.json'):
+                    try:
+                        entries.append((entry.path, entry.stat().st_mtime))
+                    except OSError:
+                        pass
+        return entries
+
+    def _evict(self):
+        if not self.max_entries:
+            return
+        with self._lock:
+            entries = self._entries()
+            excess = len(entries) - self.max_entries
+            if excess <= 0:
+                return
+            entries.sort(key=lambda item: item[1])
+            for path, _ in entries[:excess]:
+                self._remove(path)
+            self._counters['evictions'] += excess
+
+    def _remove(self, path):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
@@ -0,0 +1,16 @@
+# -*- coding: utf-8 -*-
+
+"""
+Environment loading for the floor plan scripts.
+
+Each floor_plan_* module reads its FLOOR_PLAN_* settings when it is
+imported. Every module that reads settings imports this one first, so
+.env.local is loaded before any of them, whichever script is the entry
+point. Variables already set in the environment take precedence over
+.env.local.
+"""
+
+from dotenv import load_dotenv
+
+# Load environment variables from .env.local
+load_dotenv('.env.local')
@@ -0,0 +1,117 @@
+# -*- coding: utf-8 -*-
+
+"""
+Font registry for the raster renderer.
+
+ImageFont.truetype('arial.ttf') only finds Arial on Windows. On Linux hosts
+it fails on every render before falling back to PIL's default font. This
+registry searches a configurable list of font directories once per
+process, picks the first available face from a preference list, and
+caches the loaded FreeTypeFont objects by (face, size). A long-lived
+worker therefore probes the filesystem and parses font files only once.
+"""
+
+import os
+import sys
+import threading
+
+import floor_plan_config  # loads .env.local before the settings below are read
+from floor_plan_trace import timed_import
+
+
+def _default_font_dirs():
+    home = os.path.expanduser('~')
+    if sys.platform == 'win32':
+        windir = os.environ.get('WINDIR', r'C:\Windows')
+        return [os.path.join(windir, 'Fonts'),
+                os.path.join(os.environ.get('LOCALAPPDATA', ''), 'Microsoft', 'Windows', 'Fonts')]
+    if sys.platform == 'darwin':
+        return ['/System/Library/Fonts', '/Library/Fonts', os.path.join(home, 'Library', 'Fonts')]
+    return ['/usr/share/fonts', '/usr/local/share/fonts',
+            os.path.join(home, '.local', 'share', 'fonts'), os.path.join(home, '.fonts')]
+
+
+# Directories to search, separated by os.pathsep
+FONT_DIRS = [d for d in os.getenv('FLOOR_PLAN_FONT_DIRS', os.pathsep.join(_default_font_dirs())).split(os.pathsep) if d]
+
+# Font files in order of preference, comma separated
+FONT_FACES = [f.strip() for f in os.getenv(
+    'FLOOR_PLAN_FONT_FACES',
+    'arial.ttf,Arial.ttf,LiberationSans-Regular.ttf,DejaVuSans.ttf,FreeSans.ttf,Helvetica.ttc'
+).split(',') if f.strip()]
+
+
+class FontRegistry:
+    """Resolve a font face once and cache loaded fonts by (face, size)"""
+
+    def __init__(self, faces=None, font_dirs=None):
+        self.faces = faces or FONT_FACES
+        self.font_dirs = font_dirs or FONT_DIRS
+        self._lock = threading.Lock()
+        self._resolved = False
+        self._face = None
+        self._path = None
+        self._fonts = {}
+
+    def _find_font_file(self):
+        # Index every font file once; file names are matched case-insensitively
+        index = {}
+        for font_dir in self.font_dirs:
+            if not os.path.isdir(font_dir):
+                continue
+            for root, _, files in os.walk(font_dir):
+                for name in files:
+                    index.setdefault(name.lower(), os.path.join(root, name))
+
+        for face in self.faces:
+            # Absolute paths may be listed directly
+            if os.path.isabs(face) and os.path.isfile(face):
+                return face, face
+            path = index.get(os.path.basename(face).lower())
+            if path:
+                return face, path
+        return None, None
+
+    def resolve(self):
+        """Return (face, path) of the chosen font, or (None, None) if only PIL's default is available"""
+        with self._lock:
+            if not self._resolved:
+                self._face, self._path = self._find_font_file()
+                self._resolved = True
+                if self._path:
+                    print(f"Using font {self._face} from {self._path}")
+                else:
+                    print("Warning: no TrueType font found, using PIL's default font")
+            return self._face, self._path
+
+    def get(self, size):
+        """Return the chosen font at the given pixel size, loading it at most once"""
+        _, path = self.resolve()
+        key = (path, size)
+        with self._lock:
+            font = self._fonts.get(key)
+            if font is None:
+                ImageFont = timed_import('PIL.ImageFont')
+                if path:
+                    font = ImageFont.truetype(path, size)
+                else:
+                    try:
+                        font = ImageFont.load_default(size=size)
+                    except TypeError:
+                        # Pillow < 10.1 only ships a fixed-size bitmap font
+                        font = ImageFont.load_default()
+                self._fonts[key] = font
+            return font
+
+    def describe(self):
+        """Report which font was actually chosen and how many sizes are loaded"""
+        face, path = self.resolve()
+        return {
+            "face": face,
+            "path": path,
+            "fallback": path is None,
+            "loadedSizes": sorted(size for _, size in self._fonts)
+        }
+
+
+fonts = FontRegistry()
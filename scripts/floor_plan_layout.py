@@ -0,0 +1,317 @@
+# -*- coding: utf-8 -*-
+
+"""
+Deterministic room packing for floor plans.
+
+pack_rooms() places every room inside the house footprint in a single
+pass with a guillotine (slicing) packer. The ordered room list is split
+where the running area reaches half of the total, the footprint is cut
+along its longer side in the same proportion, and each half is packed
+recursively. Rooms keep their relative sizes, share walls with their
+neighbours and never overlap. Layout time is O(n log n) and does not vary
+between runs.
+
+Rooms are ordered before packing so that related rooms end up next to
+each other. When the spec lists adjacencies, the order is a breadth-first
+walk of that graph. Otherwise public rooms come first (they sit by the
+entrance on the top wall), each bathroom follows a bedroom, and the
+garage comes last.
+
+validate_rooms() and repair_rooms() check rooms that already have
+coordinates (as Gemini returns them) with NumPy. The checks are pairwise
+overlap, containment in the footprint, shared walls for every adjacent_to
+pair, and total area. Each check is one vectorized pass over an (n, n)
+matrix. Overlaps and rooms outside the house are repaired by moving rooms
+the smallest distance that separates them, so a nearly valid plan keeps
+its shape.
+"""
+
+from collections import deque
+
+from floor_plan_trace import timed_import
+
+# NumPy, loaded by the first validate_rooms() or repair_rooms() call
+np = None
+
+# Geometry tolerance in feet; rooms closer than this share a wall
+TOLERANCE = 1e-6
+
+# Separation passes before repair_rooms() gives up on a plan
+REPAIR_ITERATIONS = 100
+
+# Placement order by room type when the spec gives no adjacencies
+TYPE_ORDER = ['living', 'dining', 'kitchen', 'pooja', 'utility', 'study', 'office',
+              'bedroom', 'bathroom', 'verandah', 'balcony', 'garage']
+
+
+def _type_rank(room):
+    room_type = f"{room.get('type', '')} {room.get('name', '')}".lower()
+    for rank, keyword in enumerate(TYPE_ORDER):
+        if keyword in room_type:
+            return rank
+    # Unknown rooms go after the private rooms but before outdoor spaces
+    return TYPE_ORDER.index('verandah') - 0.5
+
+
+def _area(room):
+    return max(room['width'], 1) * max(room['height'], 1)
+
+
+def _order_by_type(rooms):
+    ranked = sorted(rooms, key=_type_rank)
+    bedrooms = [r for r in ranked if 'bedroom' in r.get('type', r.get('name', '')).lower()]
+    bathrooms = [r for r in ranked if 'bathroom' in r.get('type', r.get('name', '')).lower()]
+    others = [r for r in ranked if r not in bedrooms and r not in bathrooms]
+
+    # Interleave bedrooms and bathrooms so each bathroom lands beside a bedroom
+    private = []
+    for i in range(max(len(bedrooms), len(bathrooms))):
+        if i < len(bedrooms):
+            private.append(bedrooms[i])
+        if i < len(bathrooms):
+            private.append(bathrooms[i])
+
+    bedroom_rank = TYPE_ORDER.index('bedroom')
+    before = [r for r in others if _type_rank(r) < bedroom_rank]
+    after = [r for r in others if _type_rank(r) > bedroom_rank]
+    return before + private + after
+
+
+def order_rooms(rooms):
+    """Order rooms so that adjacent rooms are packed next to each other"""
+    names = {room.get('name', '').lower(): room for room in rooms}
+    has_adjacency = any(room.get('adjacent_to') for room in rooms)
+    if not has_adjacency:
+        return _order_by_type(rooms)
+
+    neighbours = {id(room): [] for room in rooms}
+    for room in rooms:
+        for other_name in room.get('adjacent_to') or []:
+            other = names.get(str(other_name).lower())
+            if other is not None and other is not room:
+                neighbours[id(room)].append(other)
+                neighbours[id(other)].append(room)
+
+    ordered = []
+    visited = set()
+    # Start each walk from the most public remaining room, largest first
+    for start in sorted(rooms, key=lambda r: (_type_rank(r), -_area(r))):
+        if id(start) in visited:
+            continue
+        queue = deque([start])
+        visited.add(id(start))
+        while queue:
+            room = queue.popleft()
+            ordered.append(room)
+            for other in sorted(neighbours[id(room)], key=lambda r: -_area(r)):
+                if id(other) not in visited:
+                    visited.add(id(other))
+                    queue.append(other)
+    return ordered
+
+
+def _cut(length, fraction):
+    """Cut position along a side, snapped to whole feet when there is room to"""
+    position = length * fraction
+    if length >= 2:
+        position = min(max(round(position), 1), length - 1)
+    return position
+
+
+def _slice(rooms, areas, x, y, width, height, placed):
+    if len(rooms) == 1:
+        placed.append((rooms[0], x, y, width, height))
+        return
+
+    total = sum(areas)
+    # Split where the running area is closest to half of the total
+    best_index, best_gap, running = 1, None, 0
+    for i in range(1, len(rooms)):
+        running += areas[i - 1]
+        gap = abs(running - total / 2)
+        if best_gap is None or gap < best_gap:
+            best_index, best_gap = i, gap
+    fraction = sum(areas[:best_index]) / total
+
+    first, second = rooms[:best_index], rooms[best_index:]
+    first_areas, second_areas = areas[:best_index], areas[best_index:]
+    if width >= height:
+        cut = _cut(width, fraction)
+        _slice(first, first_areas, x, y, cut, height, placed)
+        _slice(second, second_areas, x + cut, y, width - cut, height, placed)
+    else:
+        cut = _cut(height, fraction)
+        _slice(first, first_areas, x, y, width, cut, placed)
+        _slice(second, second_areas, x, y + cut, width, height - cut, placed)
+
+
+def pack_rooms(rooms, house_width, house_depth):
+    """Pack rooms into the house footprint and return them with positions in feet.
+
+    Each input room needs 'name', 'width' and 'height' (nominal size in feet)
+    and may carry 'type', 'adjacent_to' and 'features'. The returned rooms
+    are copies with 'x', 'y', 'width' and 'height' set to their packed
+    rectangle, measured from the top-left corner of the house.
+    """
+    if not rooms:
+        return []
+
+    ordered = order_rooms(rooms)
+    areas = [_area(room) for room in ordered]
+    placed = []
+    _slice(ordered, areas, 0, 0, house_width, house_depth, placed)
+
+    packed = []
+    for room, x, y, width, height in placed:
+        packed_room = dict(room)
+        packed_room.update({'x': x, 'y': y, 'width': width, 'height': height})
+        packed.append(packed_room)
+    return packed
+
+
+def _load_numpy():
+    global np
+    if np is None:
+        np = timed_import('numpy')
+
+
+def _boxes(rooms):
+    """Room rectangles as an (n, 4) array of x1, y1, x2, y2"""
+    boxes = np.array([[r['x'], r['y'], r['width'], r['height']] for r in rooms], dtype=float).reshape(-1, 4)
+    boxes[:, 2:] = np.maximum(boxes[:, 2:], 0) + boxes[:, :2]
+    return boxes
+
+
+def _span(low, high):
+    """Pairwise length of the shared interval between every pair of [low, high] ranges"""
+    return np.minimum(high[:, None], high[None, :]) - np.maximum(low[:, None], low[None, :])
+
+
+def _overlap_depths(boxes):
+    """Pairwise overlap along x and y; zero where the rooms don't overlap"""
+    depth_x = _span(boxes[:, 0], boxes[:, 2])
+    depth_y = _span(boxes[:, 1], boxes[:, 3])
+    overlapping = (depth_x > TOLERANCE) & (depth_y > TOLERANCE)
+    np.fill_diagonal(overlapping, False)
+    return np.where(overlapping, depth_x, 0), np.where(overlapping, depth_y, 0)
+
+
+def _adjacency(rooms):
+    """Boolean (n, n) matrix of the adjacent_to pairs the spec asks for"""
+    index = {str(room.get('name', '')).lower(): i for i, room in enumerate(rooms)}
+    wanted = np.zeros((len(rooms), len(rooms)), dtype=bool)
+    for i, room in enumerate(rooms):
+        for other_name in room.get('adjacent_to') or []:
+            j = index.get(str(other_name).lower())
+            if j is not None and j != i:
+                wanted[i, j] = wanted[j, i] = True
+    return wanted
+
+
+def _shared_walls(boxes):
+    """Boolean (n, n) matrix of rooms that touch along a wall segment"""
+    x1, y1, x2, y2 = boxes.T
+    touch_x = (np.abs(x2[:, None] - x1[None, :]) <= TOLERANCE) | (np.abs(x1[:, None] - x2[None, :]) <= TOLERANCE)
+    touch_y = (np.abs(y2[:, None] - y1[None, :]) <= TOLERANCE) | (np.abs(y1[:, None] - y2[None, :]) <= TOLERANCE)
+    walls = (touch_x & (_span(y1, y2) > TOLERANCE)) | (touch_y & (_span(x1, x2) > TOLERANCE))
+    np.fill_diagonal(walls, False)
+    return walls
+
+
+def validate_rooms(rooms, house_width, house_depth, total_area=None):
+    """Check positioned rooms against the house footprint and return a report.
+
+    Rooms need 'name', 'x', 'y', 'width' and 'height' in feet and may list
+    'adjacent_to' names. The report lists overlapping pairs with their
+    shared area, rooms outside the footprint, adjacent_to pairs without a
+    shared wall, and the room, footprint and stated areas. 'valid' is True
+    when nothing overlaps and every room is inside the house; missing
+    adjacencies and area mismatches are reported but don't fail the plan.
+    """
+    _load_numpy()
+    names = [room.get('name', f"ROOM {i+1}") for i, room in enumerate(rooms)]
+    boxes = _boxes(rooms)
+    depth_x, depth_y = _overlap_depths(boxes)
+    overlap_area = np.triu(depth_x * depth_y, 1)
+
+    outside = ((boxes[:, 0] < -TOLERANCE) | (boxes[:, 1] < -TOLERANCE) |
+               (boxes[:, 2] > house_width + TOLERANCE) | (boxes[:, 3] > house_depth + TOLERANCE))
+
+    missing = np.triu(_adjacency(rooms) & ~_shared_walls(boxes), 1)
+
+    room_area = float(((boxes[:, 2] - boxes[:, 0]) * (boxes[:, 3] - boxes[:, 1])).sum())
+    footprint_area = float(house_width * house_depth)
+
+    overlaps = [(names[i], names[j], round(float(overlap_area[i, j]), 2)) for i, j in zip(*np.nonzero(overlap_area))]
+    return {
+        'valid': not overlaps and not outside.any(),
+        'overlaps': overlaps,
+        'outside': [names[i] for i in np.nonzero(outside)[0]],
+        'missing_adjacency': [(names[i], names[j]) for i, j in zip(*np.nonzero(missing))],
+        'room_area': round(room_area, 2),
+        'footprint_area': footprint_area,
+        'stated_area': total_area,
+        'fits': room_area <= footprint_area + TOLERANCE
+    }
+
+
+def repair_rooms(rooms, house_width, house_depth, total_area=None, iterations=REPAIR_ITERATIONS):
+    """Move rooms the smallest distance that removes overlaps and keeps them in the house.
+
+    Rooms larger than the footprint are first cut down to it. Each pass
+    separates every overlapping pair along the axis where they overlap
+    least by moving the smaller room (or the other one, if the smaller is
+    against the house wall), then clamps every room back inside the
+    footprint. Returns (rooms, report) with the repaired
+    copies and validate_rooms() run on them; check report['valid'] since
+    plans whose rooms cannot all fit are returned unrepaired.
+    """
+    _load_numpy()
+    report = validate_rooms(rooms, house_width, house_depth, total_area)
+    if report['valid'] or not report['fits']:
+        return rooms, report
+
+    boxes = _boxes(rooms)
+    sizes = np.minimum(boxes[:, 2:] - boxes[:, :2], [house_width, house_depth])
+    origins = boxes[:, :2]
+    limits = np.array([house_width, house_depth], dtype=float) - sizes
+
+    # The smaller room of a pair moves; ties go to the room later in the spec
+    areas = sizes.prod(axis=1)
+    order = np.arange(len(rooms))
+    later = order[:, None] > order[None, :]
+    smaller = (areas[:, None] < areas[None, :]) | ((areas[:, None] == areas[None, :]) & later)
+    tie_break = np.where(later, 1.0, -1.0)
+
+    for _ in range(iterations):
+        origins = np.clip(origins, 0, limits)
+        boxes = np.hstack([origins, origins + sizes])
+        depth_x, depth_y = _overlap_depths(boxes)
+        if not depth_x.any():
+            break
+
+        # Separate each pair along the axis where they overlap least
+        along_x = depth_x <= depth_y
+        centres = origins + sizes / 2
+        axis = np.where(along_x, 0, 1)
+        gap = np.where(along_x, centres[:, 0][:, None] - centres[:, 0][None, :],
+                       centres[:, 1][:, None] - centres[:, 1][None, :])
+        direction = np.where(gap == 0, tie_break, np.sign(gap))
+        depth = np.where(along_x, depth_x, depth_y)
+
+        # A room pressed against the house wall can't move further that way
+        position = origins[order[:, None], axis]
+        limit = limits[order[:, None], axis]
+        free = np.where(direction > 0, position < limit - TOLERANCE, position > TOLERANCE)
+        moves = np.where(free & ~free.T, True, np.where(~free & free.T, False, smaller))
+
+        shift = np.where(moves, depth * direction, 0)
+        origins = origins + np.stack([np.where(along_x, shift, 0).sum(axis=1),
+                                      np.where(~along_x, shift, 0).sum(axis=1)], axis=1)
+
+    repaired = []
+    for room, (x, y), (width, height) in zip(rooms, origins, sizes):
+        repaired_room = dict(room)
+        repaired_room.update({'x': float(x), 'y': float(y), 'width': float(width), 'height': float(height)})
+        repaired.append(repaired_room)
+    return repaired, validate_rooms(repaired, house_width, house_depth, total_area)
@@ -0,0 +1,116 @@
+# -*- coding: utf-8 -*-
+
+"""
+Prompt templates for the Gemini spec and Groq paint recommendation calls.
+
+Each template is compacted once, at import. Indentation and blank lines
+are stripped, runs of spaces are collapsed, and fixed values such as the
+JSON outline are substituted in, so a call only joins the precompiled
+literal parts with its own fields. The JSON outline is generated from the
+response schema in floor_plan_schema.py, so the prompt and the validator
+can't drift apart.
+
+A template's version is a hash of its compiled text. Cache keys include
+it, so editing a prompt retires the answers cached for the old wording
+without a manual version bump.
+
+estimate_tokens() gives a rough token count (about four characters per
+token for English text) for the gemini and groq spans. Every stage has an
+output cap (max_tokens / maxOutputTokens), configurable per stage.
+"""
+
+import os
+import re
+import json
+import hashlib
+import textwrap
+from string import Formatter
+
+import floor_plan_config  # loads .env.local before the settings below are read
+from floor_plan_schema import FLOOR_PLAN_SPEC_SCHEMA, PAINT_RECOMMENDATIONS_SCHEMA
+
+# Output token caps per stage
+SPEC_MAX_OUTPUT_TOKENS = int(os.getenv('FLOOR_PLAN_SPEC_MAX_OUTPUT_TOKENS', '8192'))
+PAINT_MAX_OUTPUT_TOKENS = int(os.getenv('FLOOR_PLAN_PAINT_MAX_OUTPUT_TOKENS', '4000'))
+
+CHARS_PER_TOKEN = 4
+
+_SPACES = re.compile(r'[ \t]+')
+
+
+def compact(text):
+    """Strip indentation and blank lines and collapse runs of spaces"""
+    lines = (_SPACES.sub(' ', line).strip() for line in textwrap.dedent(text).splitlines())
+    return '\n'.join(line for line in lines if line)
+
+
+def estimate_tokens(text):
+    """Rough token count of a prompt or response"""
+    return -(-len(text) // CHARS_PER_TOKEN)
+
+
+def schema_outline(schema):
+    """A compact JSON-like outline of a schema, with descriptions standing in for values"""
+    kind = schema['type']
+    if kind == 'object':
+        fields = ','.join(f'"{name}":{schema_outline(sub)}' for name, sub in schema['properties'].items())
+        return '{' + fields + '}'
+    if kind == 'array':
+        return f"[{schema_outline(schema['items'])}]"
+    if kind == 'string':
+        return json.dumps(schema.get('description', 'string'), ensure_ascii=False)
+    return kind
+
+
+class PromptTemplate:
+    """A compacted prompt with named fields, rendered by joining precompiled parts"""
+
+    def __init__(self, name, text, max_output_tokens, **constants):
+        self.name = name
+        self.max_output_tokens = max_output_tokens
+        parts = []
+        literal = ''
+        for text_part, field, _, _ in Formatter().parse(compact(text)):
+            literal += text_part
+            if field is None:
+                continue
+            if field in constants:
+                literal += str(constants[field])
+            else:
+                parts.append((literal, field))
+                literal = ''
+        self._parts = parts
+        self._tail = literal
+        self.fields = tuple(field for _, field in parts)
+        skeleton = ''.join(f"{literal}{{{field}}}" for literal, field in parts) + literal
+        self.version = hashlib.sha256(skeleton.encode('utf-8')).hexdigest()[:12]
+        self.estimated_tokens = estimate_tokens(skeleton)
+
+    def render(self, **fields):
+        """Fill in the fields and return the prompt text"""
+        return ''.join(literal + str(fields[field]) for literal, field in self._parts) + self._tail
+
+
+SPEC_PROMPT = PromptTemplate('spec', """
+    You are an architect. Specify a precise floor plan for this house description: "{description}"
+    Return only a JSON object shaped like: {outline}
+    Rules:
+    - coordinates are absolute, in feet from the top-left corner
+    - rooms never overlap and all fit inside house_dimensions
+    - rooms listed in adjacent_to share a wall
+    - room sizes are realistic for their function, and their total area is no more than the house area
+    - features list doorways between adjacent rooms and windows for exterior rooms
+    - the flow is logical and the layout balanced
+    - Indian style: include a pooja room, a larger kitchen and a verandah where appropriate
+    - international style: include closets and en-suite bathrooms where appropriate
+    """, SPEC_MAX_OUTPUT_TOKENS, outline=schema_outline(FLOOR_PLAN_SPEC_SCHEMA))
+
+PAINT_PROMPT = PromptTemplate('paint', """
+    Recommend paints for this house: "{description}"
+    Room types: {room_types}
+    For each room type give 2-3 colour options with paint name, brand, code, finish and an accurate
+    cost per sq ft (₹ for Indian brands, $ for international ones; always include it), plus special
+    techniques or finishes and maintenance tips. Prefer cost-efficient paints that still look good,
+    and mix Indian and international brands.
+    Return only a JSON object shaped like: {outline}
+    """, PAINT_MAX_OUTPUT_TOKENS, outline=schema_outline(PAINT_RECOMMENDATIONS_SCHEMA))
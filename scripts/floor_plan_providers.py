@@ -0,0 +1,336 @@
+# -*- coding: utf-8 -*-
+
+"""
+Shared HTTP client layer for the Gemini and Groq provider calls.
+
+Each provider gets one pooled requests.Session, so a warm process reuses
+TCP/TLS connections instead of handshaking on every call. Every request
+has connect/read timeouts, so a hung provider fails fast instead of
+blocking the caller. 429 and 5xx responses and connection errors are
+retried with bounded exponential backoff, and Retry-After is honoured.
+
+Each client can be paced by a token bucket sized to the provider's quota
+(FLOOR_PLAN_GEMINI_RPM / FLOOR_PLAN_GROQ_RPM requests per minute). Every
+attempt, retries included, takes a token first, so a burst of generations
+waits its turn locally instead of collecting 429s and retrying.
+
+How many calls a client has in flight is capped by an adaptive limit
+(AIMD). The limit halves when the provider answers 429 or 5xx or the
+connection fails, and drops a little when latency climbs well above its
+long-run average. While calls succeed at normal latency and the cap is
+actually reached, it grows by one per limit's worth of calls. The client
+therefore settles near the highest concurrency the provider sustains
+right now, without hand tuning.
+
+With FLOOR_PLAN_RECORD_DIR set, every successful response is also saved as
+a fixture file keyed by provider, path and request payload (never headers,
+so API keys stay out of fixtures). fake_provider_server.py replays those
+fixtures for offline load tests.
+
+requests is imported when the first call is made, so processes that only
+hit the caches or render never load it.
+"""
+
+import os
+import json
+import time
+import random
+import hashlib
+import threading
+
+import floor_plan_config  # loads .env.local before the settings below are read
+from floor_plan_trace import timed_import
+
+CONNECT_TIMEOUT = float(os.getenv('FLOOR_PLAN_CONNECT_TIMEOUT', '5'))
+READ_TIMEOUT = float(os.getenv('FLOOR_PLAN_READ_TIMEOUT', '60'))
+MAX_RETRIES = int(os.getenv('FLOOR_PLAN_MAX_RETRIES', '3'))
+BACKOFF_BASE = float(os.getenv('FLOOR_PLAN_BACKOFF_BASE', '0.5'))
+BACKOFF_MAX = float(os.getenv('FLOOR_PLAN_BACKOFF_MAX', '8'))
+POOL_SIZE = int(os.getenv('FLOOR_PLAN_POOL_SIZE', '10'))
+
+# Requests per minute allowed per provider, 0 for no limit, and how many may go out back to back
+GEMINI_RPM = float(os.getenv('FLOOR_PLAN_GEMINI_RPM', '0'))
+GROQ_RPM = float(os.getenv('FLOOR_PLAN_GROQ_RPM', '0'))
+RATE_BURST = int(os.getenv('FLOOR_PLAN_RATE_BURST', '5'))
+
+# Adaptive in-flight call limit per provider; 0 disables it
+ADAPTIVE_CONCURRENCY = os.getenv('FLOOR_PLAN_ADAPTIVE_CONCURRENCY', '1').lower() not in ('0', 'false', 'no')
+INITIAL_CONCURRENCY = float(os.getenv('FLOOR_PLAN_INITIAL_CONCURRENCY', '4'))
+MAX_CONCURRENCY = float(os.getenv('FLOOR_PLAN_MAX_CONCURRENCY', str(POOL_SIZE)))
+# Recent latency this many times the long-run average counts as overload
+LATENCY_TOLERANCE = float(os.getenv('FLOOR_PLAN_LATENCY_TOLERANCE', '2'))
+
+# Directory to record provider responses into as replay fixtures; empty disables recording
+RECORD_DIR = os.getenv('FLOOR_PLAN_RECORD_DIR', '')
+
+# Status codes worth retrying: rate limiting and transient server errors
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+
+
+def fixture_key(path, payload):
+    """Key a request by its API path and canonical JSON payload"""
+    canonical = json.dumps(payload, sort_keys=True, separators=(',', ':'), ensure_ascii=False)
+    return hashlib.sha256(f"{path.strip('/')}\n{canonical}".encode('utf-8')).hexdigest()
+
+
+class TokenBucket:
+    """Allow rate_per_minute requests on average, with up to burst at once"""
+
+    def __init__(self, rate_per_minute, burst=RATE_BURST):
+        self.rate = rate_per_minute / 60.0
+        self.capacity = max(1, burst)
+        self.tokens = float(self.capacity)
+        self.updated = time.monotonic()
+        self.waits = 0
+        self.wait_seconds = 0.0
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Take a token, sleeping until one is available; return the seconds waited"""
+        if self.rate <= 0:
+            return 0.0
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            # Claim the token now, even if it is still owed, so waiters queue up in order
+            self.tokens -= 1
+            wait = -self.tokens / self.rate if self.tokens < 0 else 0.0
+            if wait:
+                self.waits += 1
+                self.wait_seconds += wait
+        if wait:
+            time.sleep(wait)
+        return wait
+
+    def stats(self):
+        with self._lock:
+            return {
+                "perMinute": round(self.rate * 60, 2),
+                "burst": self.capacity,
+                "waits": self.waits,
+                "waitSeconds": round(self.wait_seconds, 3)
+            }
+
+
+class AdaptiveLimiter:
+    """An AIMD cap on in-flight calls, driven by errors and latency"""
+
+    def __init__(self, initial=INITIAL_CONCURRENCY, min_limit=1, max_limit=MAX_CONCURRENCY,
+                 backoff=0.5, latency_backoff=0.9, latency_tolerance=LATENCY_TOLERANCE, enabled=True):
+        self.limit = float(max(min_limit, min(initial, max_limit)))
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.backoff = backoff
+        self.latency_backoff = latency_backoff
+        self.latency_tolerance = latency_tolerance
+        self.enabled = enabled
+        self.in_flight = 0
+        self.recent_latency = None
+        self.baseline_latency = None
+        self.increases = 0
+        self.decreases = 0
+        self._last_decrease = 0.0
+        self._condition = threading.Condition()
+
+    def acquire(self):
+        """Wait for a free slot under the current limit and return the call's start time"""
+        with self._condition:
+            while self.enabled and self.in_flight >= int(self.limit):
+                self._condition.wait()
+            self.in_flight += 1
+        return time.monotonic()
+
+    def release(self, started, overloaded, measured=True):
+        """Free a slot and adjust the limit from the call's outcome and latency.
+
+        A call that failed for reasons unrelated to the provider (measured
+        false) just frees its slot.
+        """
+        now = time.monotonic()
+        latency = now - started
+        with self._condition:
+            # A call that found the cap reached is evidence more concurrency was wanted
+            saturated = self.in_flight >= int(self.limit)
+            self.in_flight -= 1
+            if overloaded:
+                self._decrease(now, self.backoff)
+            elif measured:
+                self.recent_latency = latency if self.recent_latency is None else \
+                    0.7 * self.recent_latency + 0.3 * latency
+                self.baseline_latency = latency if self.baseline_latency is None else \
+                    0.95 * self.baseline_latency + 0.05 * latency
+                if self.recent_latency > self.baseline_latency * self.latency_tolerance:
+                    self._decrease(now, self.latency_backoff)
+                elif saturated and self.limit < self.max_limit:
+                    self.limit = min(self.max_limit, self.limit + 1 / self.limit)
+                    self.increases += 1
+            self._condition.notify_all()
+
+    def _decrease(self, now, factor):
+        # Calls that failed together reflect one overload; cut once per recent latency
+        if now - self._last_decrease < (self.recent_latency or 0):
+            return
+        self.limit = max(self.min_limit, self.limit * factor)
+        self.decreases += 1
+        self._last_decrease = now
+
+    def stats(self):
+        with self._condition:
+            return {
+                "enabled": self.enabled,
+                "limit": round(self.limit, 2),
+                "inFlight": self.in_flight,
+                "recentLatencyMs": round(self.recent_latency * 1000, 1) if self.recent_latency else None,
+                "baselineLatencyMs": round(self.baseline_latency * 1000, 1) if self.baseline_latency else None,
+                "increases": self.increases,
+                "decreases": self.decreases
+            }
+
+
+class ProviderClient:
+    """A pooled, timeout-bounded, retrying JSON client for one provider API"""
+
+    def __init__(self, name, base_url, connect_timeout=CONNECT_TIMEOUT, read_timeout=READ_TIMEOUT,
+                 max_retries=MAX_RETRIES, backoff_base=BACKOFF_BASE, backoff_max=BACKOFF_MAX,
+                 pool_size=POOL_SIZE, record_dir=RECORD_DIR, rate_per_minute=0):
+        self.name = name
+        self.base_url = base_url.rstrip('/')
+        self.timeout = (connect_timeout, read_timeout)
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.record_dir = os.path.join(record_dir, name.lower()) if record_dir else None
+        self.pool_size = pool_size
+        self.limiter = TokenBucket(rate_per_minute)
+        self.concurrency = AdaptiveLimiter(max_limit=max(1, min(MAX_CONCURRENCY, pool_size)),
+                                           enabled=ADAPTIVE_CONCURRENCY)
+        self._session = None
+        self._session_lock = threading.Lock()
+
+    @property
+    def session(self):
+        """The pooled session, created on first use"""
+        with self._session_lock:
+            if self._session is None:
+                requests = timed_import('requests')
+                adapters = timed_import('requests.adapters')
+                session = requests.Session()
+                adapter = adapters.HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_size)
+                session.mount('https://', adapter)
+                session.mount('http://', adapter)
+                self._session = session
+            return self._session
+
+    def _backoff(self, attempt, response=None):
+        """Seconds to wait before the given retry attempt"""
+        if response is not None:
+            retry_after = response.headers.get('Retry-After')
+            if retry_after:
+                try:
+                    return min(float(retry_after), self.backoff_max)
+                except ValueError:
+                    pass
+        delay = min(self.backoff_base * (2 ** attempt), self.backoff_max)
+        # Full jitter so concurrent callers don't retry in lockstep
+        return random.uniform(0, delay)
+
+    def _record(self, path, payload, status, body):
+        """Save a successful response body (or list of streamed events) as a replay fixture"""
+        fixture = {"provider": self.name.lower(), "path": path.strip('/'), "request": payload,
+                   "status": status, "body": body}
+        os.makedirs(self.record_dir, exist_ok=True)
+        fixture_path = os.path.join(self.record_dir, f"{fixture_key(path, payload)}.json")
+        tmp_path = f"{fixture_path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(fixture, f)
+        os.replace(tmp_path, fixture_path)
+
+    def _post(self, path, payload, headers=None, params=None, stream=False):
+        requests = timed_import('requests')
+        url = f"{self.base_url}/{path.lstrip('/')}"
+        attempt = 0
+        while True:
+            # Wait for the rate limit before taking a slot, so the adaptive limit
+            # only sees time spent at the provider, not time queued here
+            self.limiter.acquire()
+            started = self.concurrency.acquire()
+            # Only connection failures and 429/5xx are overload; other errors say
+            # nothing about the provider's capacity
+            overloaded = False
+            measured = False
+            try:
+                # A streamed call counts until its status line arrives, which is
+                # when the provider has accepted or refused the work
+                response = self.session.post(url, json=payload, headers=headers, params=params,
+                                             timeout=self.timeout, stream=stream)
+                overloaded = response.status_code in RETRY_STATUS_CODES
+                measured = True
+            except (requests.ConnectionError, requests.Timeout) as e:
+                overloaded = measured = True
+                if attempt >= self.max_retries:
+                    raise
+                delay = self._backoff(attempt)
+                print(f"{self.name} request failed ({e}), retrying in {delay:.1f}s")
+            else:
+                if response.status_code not in RETRY_STATUS_CODES or attempt >= self.max_retries:
+                    return response
+                delay = self._backoff(attempt, response)
+                print(f"{self.name} returned {response.status_code}, retrying in {delay:.1f}s")
+                # Hand an unread streamed body's connection back to the pool
+                response.close()
+            finally:
+                self.concurrency.release(started, overloaded, measured)
+
+            time.sleep(delay)
+            attempt += 1
+
+    def post_json(self, path, payload, headers=None, params=None):
+        """POST a JSON payload and return the final response.
+
+        Retries on connection errors, timeouts and retryable status codes.
+        A non-retryable error response, or the last retryable one, is
+        returned for the caller to inspect. Network errors that persist
+        through every retry are raised.
+        """
+        response = self._post(path, payload, headers, params)
+        if self.record_dir and response.status_code == 200:
+            try:
+                self._record(path, payload, response.status_code, response.json())
+            except ValueError:
+                pass
+        return response
+
+    def post_stream(self, path, payload, headers=None, params=None):
+        """POST a JSON payload and return the response with its body still unread.
+
+        Retried like post_json() until the status line arrives; read a 200
+        response's server-sent events with iter_events().
+        """
+        return self._post(path, payload, headers, params, stream=True)
+
+    def iter_events(self, response, path, payload):
+        """Yield each JSON server-sent event of a streamed response as it arrives"""
+        # SSE is UTF-8 by definition, whatever the Content-Type says
+        response.encoding = 'utf-8'
+        events = []
+        try:
+            for line in response.iter_lines(decode_unicode=True):
+                if not line or not line.startswith('data:'):
+                    continue
+                data = line[len('data:'):].strip()
+                if data == '[DONE]':
+                    break
+                event = json.loads(data)
+                events.append(event)
+                yield event
+        finally:
+            response.close()
+        if self.record_dir and response.status_code == 200:
+            self._record(path, payload, response.status_code, events)
+
+
+groq_client = ProviderClient('Groq', os.getenv('GROQ_API_BASE', 'https://api.groq.com/openai/v1'),
+                             rate_per_minute=GROQ_RPM)
+gemini_client = ProviderClient('Gemini', os.getenv('GEMINI_API_BASE', 'https://generativelanguage.googleapis.com/v1beta'),
+                               rate_per_minute=GEMINI_RPM)
@@ -0,0 +1,184 @@
+# -*- coding: utf-8 -*-
+
+"""
+Schemas for the provider responses and a small compiled validator.
+
+FLOOR_PLAN_SPEC_SCHEMA describes Gemini's floor plan spec and
+PAINT_RECOMMENDATIONS_SCHEMA describes Groq's paint recommendations. Both
+use the JSON Schema subset Gemini's responseSchema understands (type,
+properties, required, items, enum, nullable, description), plus minimum,
+which only the local validator checks. to_gemini_schema() converts one for
+the generationConfig of a request.
+
+compile_schema() turns a schema into a validation function once, at
+import, so checking a response is a walk over the value with the checks
+already resolved. It returns a list of "path: problem" strings, empty when
+the value is valid.
+"""
+
+TYPES = {
+    'object': dict,
+    'array': list,
+    'string': str,
+    'number': (int, float),
+    'integer': int,
+    'boolean': bool,
+}
+
+# Keys Gemini accepts in a responseSchema
+GEMINI_SCHEMA_KEYS = ('type', 'description', 'enum', 'nullable', 'properties', 'required', 'items')
+
+_STRINGS = {'type': 'array', 'items': {'type': 'string'}}
+
+FLOOR_PLAN_SPEC_SCHEMA = {
+    'type': 'object',
+    'properties': {
+        'rooms': {
+            'type': 'array',
+            'items': {
+                'type': 'object',
+                'properties': {
+                    'name': {'type': 'string', 'description': 'room name'},
+                    'type': {'type': 'string', 'description': 'bedroom/bathroom/kitchen/etc'},
+                    'dimensions': {'type': 'string', 'description': 'width x length in feet'},
+                    'position': {'type': 'string', 'description': 'north/south/east/west/center'},
+                    'adjacent_to': {'type': 'array', 'items': {'type': 'string', 'description': 'other room name'}},
+                    'features': _STRINGS,
+                    'coordinates': {
+                        'type': 'object',
+                        'description': 'absolute position in feet from the top-left corner',
+                        'properties': {
+                            'x': {'type': 'number'},
+                            'y': {'type': 'number'},
+                            'width': {'type': 'number', 'minimum': 1},
+                            'height': {'type': 'number', 'minimum': 1}
+                        },
+                        'required': ['x', 'y', 'width', 'height']
+                    }
+                },
+                'required': ['name', 'type', 'coordinates']
+            }
+        },
+        'layout_style': {'type': 'string', 'description': 'open floor plan or traditional'},
+        'total_area': {'type': 'string', 'description': 'approximate square footage'},
+        'special_features': _STRINGS,
+        'house_shape': {'type': 'string', 'description': 'rectangular/L-shaped/etc'},
+        'house_dimensions': {
+            'type': 'object',
+            'properties': {
+                'width': {'type': 'number', 'minimum': 1},
+                'depth': {'type': 'number', 'minimum': 1}
+            },
+            'required': ['width', 'depth']
+        },
+        'design_style': {'type': 'string', 'description': 'indian or international'}
+    },
+    'required': ['rooms', 'house_dimensions']
+}
+
+PAINT_RECOMMENDATIONS_SCHEMA = {
+    'type': 'object',
+    'properties': {
+        'overall_theme': {'type': 'string', 'description': 'brief overall colour theme'},
+        'rooms': {
+            'type': 'array',
+            'items': {
+                'type': 'object',
+                'properties': {
+                    'room_type': {'type': 'string'},
+                    'color_options': {
+                        'type': 'array',
+                        'items': {
+                            'type': 'object',
+                            'properties': {
+                                'name': {'type': 'string'},
+                                'brand': {'type': 'string'},
+                                'code': {'type': 'string'},
+                                'finish': {'type': 'string'},
+                                'cost_per_sqft': {'type': 'string', 'description': 'e.g. ₹15-20'}
+                            },
+                            'required': ['name']
+                        }
+                    },
+                    'techniques': {'type': 'string'},
+                    'maintenance': {'type': 'string'}
+                },
+                'required': ['room_type', 'color_options']
+            }
+        },
+        'tips': _STRINGS
+    },
+    'required': ['rooms']
+}
+
+
+def _compile(schema):
+    """Build check(value, path, errors) for a schema, compiling its subschemas once"""
+    expected = TYPES[schema['type']]
+    is_number = schema['type'] in ('number', 'integer')
+    nullable = schema.get('nullable', False)
+    enum = frozenset(schema['enum']) if 'enum' in schema else None
+    minimum = schema.get('minimum')
+    required = tuple(schema.get('required', ()))
+    properties = tuple((name, _compile(sub)) for name, sub in schema.get('properties', {}).items())
+    items = _compile(schema['items']) if 'items' in schema else None
+
+    def check(value, path, errors):
+        if value is None:
+            if not nullable:
+                errors.append(f"{path}: must not be null")
+            return
+        # bool is an int subclass, but true is not a number here
+        if not isinstance(value, expected) or (is_number and isinstance(value, bool)):
+            errors.append(f"{path}: expected {schema['type']}, got {type(value).__name__}")
+            return
+        if enum is not None and value not in enum:
+            errors.append(f"{path}: {value!r} is not one of {sorted(enum)}")
+        if minimum is not None and value < minimum:
+            errors.append(f"{path}: {value!r} is less than {minimum}")
+        for name in required:
+            if name not in value:
+                errors.append(f"{path}.{name}: is required")
+        for name, check_property in properties:
+            if name in value:
+                check_property(value[name], f"{path}.{name}", errors)
+        if items is not None:
+            for i, item in enumerate(value):
+                items(item, f"{path}[{i}]", errors)
+
+    return check
+
+
+def compile_schema(schema):
+    """Build a function that returns the list of problems with a value, empty when it is valid"""
+    check = _compile(schema)
+
+    def validate(value):
+        errors = []
+        check(value, '$', errors)
+        return errors
+
+    return validate
+
+
+def to_gemini_schema(schema):
+    """Convert a schema to Gemini's responseSchema format"""
+    converted = {}
+    for key in GEMINI_SCHEMA_KEYS:
+        if key not in schema:
+            continue
+        value = schema[key]
+        if key == 'type':
+            value = value.upper()
+        elif key == 'properties':
+            value = {name: to_gemini_schema(sub) for name, sub in value.items()}
+            # Keep the documented field order; Gemini otherwise sorts keys alphabetically
+            converted['propertyOrdering'] = list(schema['properties'])
+        elif key == 'items':
+            value = to_gemini_schema(value)
+        converted[key] = value
+    return converted
+
+
+validate_floor_plan_spec = compile_schema(FLOOR_PLAN_SPEC_SCHEMA)
+validate_paint_recommendations = compile_schema(PAINT_RECOMMENDATIONS_SCHEMA)
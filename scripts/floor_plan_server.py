@@ -0,0 +1,288 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Long-lived floor plan worker.
+
+Starting a Python process, importing generate_floor_plan and loading PIL,
+requests and NumPy on first use makes interpreter startup a large share of
+every plan when run once per request, so this script keeps one process warm
+and serves generation requests over localhost HTTP instead.
+
+Concurrent requests for the same work are coalesced (single flight): a
+repeated request for the same project, description and format, such as a
+double-clicked generate button, waits for the one already running and gets
+its result. Requests for the same description and format under different
+projects share one provider and render run, and each saves its own files.
+
+Generations run on a fixed number of workers behind a bounded queue. When
+every worker is busy and the queue is full, new requests are turned away
+at once with 503 and Retry-After instead of piling up in memory. Provider
+calls are paced by the per-provider rate limits in floor_plan_providers.py.
+
+Usage: python floor_plan_server.py [--host HOST] [--port PORT] [--workers N] [--queue-size N]
+
+Endpoints:
+    GET  /health    -> {"status": "ok"}
+    GET  /stats     -> hit/miss counters for the spec and paint caches, the chosen font,
+                       import timings, coalescing counts, queue depth, rate limiter waits and
+                       each provider's current concurrency limit
+    POST /generate  -> body {"projectId": ..., "description": ..., "format": "png" | "svg"}
+                       returns the same JSON result the CLI prints
+"""
+
+import os
+import json
+import argparse
+import threading
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import floor_plan_config  # loads .env.local before the settings below are read
+import generate_floor_plan
+from floor_plan_cache import make_key, normalize_text
+from floor_plan_providers import gemini_client, groq_client
+from floor_plan_trace import span, tracing
+
+DEFAULT_HOST = os.getenv('FLOOR_PLAN_WORKER_HOST', '127.0.0.1')
+DEFAULT_PORT = int(os.getenv('FLOOR_PLAN_WORKER_PORT', '8765'))
+# Generations run at once, and how many more may wait for a worker
+DEFAULT_WORKERS = int(os.getenv('FLOOR_PLAN_WORKERS', '4'))
+DEFAULT_QUEUE_SIZE = int(os.getenv('FLOOR_PLAN_QUEUE_SIZE', '16'))
+# Seconds a rejected client is told to wait before retrying
+QUEUE_RETRY_AFTER = int(os.getenv('FLOOR_PLAN_QUEUE_RETRY_AFTER', '5'))
+
+
+class QueueFull(Exception):
+    """Raised when a job arrives while every worker is busy and the queue is full"""
+
+
+class JobQueue:
+    """A fixed pool of workers behind a bounded queue that rejects work when full"""
+
+    def __init__(self, workers=DEFAULT_WORKERS, queue_size=DEFAULT_QUEUE_SIZE):
+        self.workers = workers
+        self.capacity = workers + queue_size
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='floor-plan-job')
+        self._slots = threading.BoundedSemaphore(self.capacity)
+        self._lock = threading.Lock()
+        self.pending = 0
+        self.completed = 0
+        self.rejected = 0
+
+    def run(self, func):
+        """Run func on a worker and return its result, or raise QueueFull straight away"""
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self.rejected += 1
+            raise QueueFull(f"Generation queue is full ({self.capacity} jobs waiting or running)")
+        with self._lock:
+            self.pending += 1
+        try:
+            # Run in a copy of this context so a trace started by the caller carries over
+            return self._executor.submit(contextvars.copy_context().run, func).result()
+        finally:
+            with self._lock:
+                self.pending -= 1
+                self.completed += 1
+            self._slots.release()
+
+    def stats(self):
+        with self._lock:
+            return {
+                "workers": self.workers,
+                "capacity": self.capacity,
+                "running": min(self.pending, self.workers),
+                "queued": max(0, self.pending - self.workers),
+                "completed": self.completed,
+                "rejected": self.rejected
+            }
+
+
+class SingleFlight:
+    """Share one in-flight call among concurrent callers with the same key"""
+
+    class _Call:
+        def __init__(self):
+            self.done = threading.Event()
+            self.result = None
+            self.error = None
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+        self.started = 0
+        self.shared = 0
+
+    def do(self, key, func):
+        """Return (result, shared): func()'s result, run once per key at a time.
+
+        Callers arriving while a call for the key is running wait for it and
+        get its result, or its exception, instead of running func themselves.
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = self._Call()
+                self.started += 1
+            else:
+                self.shared += 1
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result, True
+
+        try:
+            call.result = func()
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            # Later requests start a fresh call; only overlapping ones share
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.result, False
+
+    def stats(self):
+        with self._lock:
+            return {"started": self.started, "shared": self.shared, "inFlight": len(self._calls)}
+
+
+# Whole generations per project, and provider + render runs shared across projects
+generations = SingleFlight()
+renders = SingleFlight()
+
+
+def generate(project_id, description, image_format=None, queue=None):
+    """Generate and save a floor plan, coalescing with identical requests already in flight.
+
+    With a JobQueue the generation runs on one of its workers, and QueueFull
+    is raised when it has no room.
+    """
+    description = description.replace('₹', 'Rs.')
+    image_format = (image_format or generate_floor_plan.IMAGE_FORMAT).lower()
+    render_key = make_key('render', normalize_text(description), image_format)
+
+    def render():
+        return generate_floor_plan.run_pipeline(description, image_format=image_format)
+
+    def run():
+        with tracing('generation', projectId=project_id) as trace:
+            with span('render', key=render_key[:12]) as render_span:
+                stages, render_span['shared'] = renders.do(render_key, render)
+            result = generate_floor_plan.persist_generation(project_id, description, stages['image_bytes'],
+                                                            stages['painting_recommendations'], image_format,
+                                                            stages['floor_plan_specs'], stages['layout'])
+        result["timings"] = trace.summary()
+        return result
+
+    # Only the first of a set of identical requests takes a queue slot; the rest wait on it
+    result, shared = generations.do((str(project_id), render_key),
+                                    lambda: queue.run(run) if queue is not None else run())
+    return dict(result, coalesced=True) if shared else result
+
+
+class FloorPlanRequestHandler(BaseHTTPRequestHandler):
+    """Handle generation requests against the already-imported generator"""
+
+    # Keep connections from the Node route alive between requests
+    protocol_version = "HTTP/1.1"
+
+    def _send_json(self, status, payload, headers=None):
+        body = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path == "/health":
+            self._send_json(200, {"status": "ok"})
+        elif self.path == "/stats":
+            self._send_json(200, {
+                "specCache": generate_floor_plan.spec_cache.stats(),
+                "paintCache": generate_floor_plan.paint_cache.stats(),
+                "font": generate_floor_plan.fonts.describe(),
+                "startup": generate_floor_plan.import_profile(),
+                "coalescing": {"generations": generations.stats(), "renders": renders.stats()},
+                "queue": self.server.jobs.stats(),
+                "rateLimits": {"gemini": gemini_client.limiter.stats(), "groq": groq_client.limiter.stats()},
+                "concurrency": {"gemini": gemini_client.concurrency.stats(), "groq": groq_client.concurrency.stats()}
+            })
+        else:
+            self._send_json(404, {"success": False, "error": "Not found"})
+
+    def do_POST(self):
+        if self.path != "/generate":
+            self._send_json(404, {"success": False, "error": "Not found"})
+            return
+
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+            payload = json.loads(self.rfile.read(length) or b"{}")
+        except (ValueError, json.JSONDecodeError) as e:
+            self._send_json(400, {"success": False, "error": f"Invalid request body: {e}"})
+            return
+
+        project_id = payload.get("projectId")
+        description = payload.get("description")
+        if not project_id or not description:
+            self._send_json(400, {"success": False, "error": "projectId and description are required"})
+            return
+
+        try:
+            result = generate(str(project_id), description, image_format=payload.get("format"),
+                              queue=self.server.jobs)
+        except QueueFull as e:
+            self._send_json(503, {"success": False, "error": str(e), "queueFull": True},
+                            headers={"Retry-After": str(QUEUE_RETRY_AFTER)})
+            return
+        except Exception as e:
+            print(f"Error generating floor plan for {project_id}: {e}")
+            self._send_json(500, {"success": False, "error": str(e)})
+            return
+
+        self._send_json(200, result)
+
+    def log_message(self, format, *args):
+        print(f"[floor-plan-worker] {self.address_string()} {format % args}")
+
+
+def serve(host=DEFAULT_HOST, port=DEFAULT_PORT, workers=DEFAULT_WORKERS, queue_size=DEFAULT_QUEUE_SIZE):
+    """Run the worker until interrupted"""
+    server = ThreadingHTTPServer((host, port), FloorPlanRequestHandler)
+    server.daemon_threads = True
+    server.jobs = JobQueue(workers, queue_size)
+    print(f"Floor plan worker listening on http://{host}:{port} "
+          f"with {workers} workers and room for {queue_size} queued jobs")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+def main():
+    """Main function to start the floor plan worker"""
+    parser = argparse.ArgumentParser(description="Serve floor plan generation from a warm process")
+    parser.add_argument("--host", default=DEFAULT_HOST)
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS, help="Generations run at once")
+    parser.add_argument("--queue-size", type=int, default=DEFAULT_QUEUE_SIZE,
+                        help="Generations that may wait for a worker before new ones are rejected")
+    args = parser.parse_args()
+
+    serve(args.host, args.port, args.workers, args.queue_size)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+# -*- coding: utf-8 -*-
+
+"""
+Incremental parsing of a streamed floor plan spec.
+
+Gemini streams its answer as text fragments that split JSON at arbitrary
+points. SpecStreamParser scans each fragment once as it arrives. It tracks
+string and nesting state, and whenever a room object inside the top-level
+"rooms" array closes, it parses and returns that room straight away
+instead of waiting for the whole response. rooms_complete turns true as
+soon as the "rooms" array closes, while Gemini is still writing the rest
+of the spec. Text before the first "{", such as prose or a ```json fence,
+is skipped.
+
+Once the top-level object has closed, spec() returns exactly that object
+rather than everything from the first "{" to the last "}".
+"""
+
+import re
+import json
+
+# Characters that can change the scanner's state
+STRUCTURAL = re.compile(r'["\\{}\[\]]')
+
+
+class SpecStreamParser:
+    """Feed text fragments in; get back rooms as soon as each one is complete"""
+
+    def __init__(self):
+        self.text = ''
+        self._pos = 0
+        self._depth = 0
+        self._in_string = False
+        self._escaped = False
+        self._escape_at = None
+        self._string_start = None
+        self._last_string = None
+        self._rooms_depth = None
+        self._room_start = None
+        self.start = None
+        self.end = None
+        self._spec = None
+        self.rooms = []
+        self.rooms_complete = False
+
+    def feed(self, fragment):
+        """Consume the next fragment and return the rooms it completed"""
+        self.text += fragment
+        completed = []
+        text = self.text
+        # Jump between structural characters; everything else can't change state
+        for match in STRUCTURAL.finditer(text, self._pos):
+            if self.end is not None:
+                break
+            i = match.start()
+            char = match.group()
+
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                    # The escaped character sits right after the backslash
+                    if i == self._escape_at + 1:
+                        continue
+                if char == '\\':
+                    self._escaped = True
+                    self._escape_at = i
+                elif char == '"':
+                    self._in_string = False
+                    self._last_string = text[self._string_start + 1:i]
+                continue
+
+            # Quotes in the prose before the object don't start JSON strings
+            if char == '"':
+                if self._depth > 0:
+                    self._in_string = True
+                    self._string_start = i
+            elif char == '\\':
+                continue
+            elif char in '{[':
+                if self._depth == 0:
+                    if char != '{':
+                        continue
+                    self.start = i
+                elif char == '[' and self._depth == 1 and self._last_string == 'rooms':
+                    self._rooms_depth = 2
+                elif char == '{' and self._depth == self._rooms_depth:
+                    self._room_start = i
+                self._depth += 1
+            elif self._depth > 0:
+                self._depth -= 1
+                if char == '}' and self._room_start is not None and self._depth == self._rooms_depth:
+                    room = self._parse(text[self._room_start:i + 1])
+                    if room is not None:
+                        self.rooms.append(room)
+                        completed.append(room)
+                    self._room_start = None
+                elif char == ']' and self._rooms_depth is not None and self._depth == self._rooms_depth - 1:
+                    self._rooms_depth = None
+                    self.rooms_complete = True
+                if self._depth == 0:
+                    # Braces in prose close an "object" that isn't JSON; keep looking
+                    self._spec = self._parse(text[self.start:i + 1])
+                    if isinstance(self._spec, dict):
+                        self.end = i + 1
+        self._pos = len(text)
+        return completed
+
+    @staticmethod
+    def _parse(fragment):
+        try:
+            return json.loads(fragment)
+        except json.JSONDecodeError:
+            return None
+
+    @property
+    def complete(self):
+        """True once the top-level object has closed"""
+        return self.end is not None
+
+    def spec(self):
+        """The whole spec once the top-level object has closed, else None"""
+        return self._spec if self.end is not None else None
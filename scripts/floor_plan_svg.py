@@ -0,0 +1,165 @@
+# -*- coding: utf-8 -*-
+
+"""
+SVG renderer for floor plan layouts.
+
+Draws the same blueprint as render_floor_plan() in generate_floor_plan.py
+from the same layout dict: house outline, room walls (dashed for open-plan
+areas), labels and dimensions, window and door symbols, entrance, compass,
+scale bar and title block. The output is a few KB of text instead of a
+2048x2048 raster, costs almost nothing to produce, and scales cleanly in
+the browser. Keep the two renderers in step when changing either one.
+"""
+
+import math
+from html import escape
+
+STROKE = 'blue'
+FONT_FAMILY = 'Arial, Helvetica, sans-serif'
+
+# Font sizes used by the raster renderer
+TITLE_SIZE = 48
+ROOM_SIZE = 36
+DIMENSION_SIZE = 24
+DETAIL_SIZE = 20
+
+# PIL text anchors mapped to SVG text-anchor / dominant-baseline
+ANCHORS = {
+    'mm': ('middle', 'central'),
+    'ms': ('middle', 'alphabetic'),
+    'lt': ('start', 'hanging'),
+}
+
+
+def _num(value):
+    """Format a coordinate compactly"""
+    return f"{value:.1f}".rstrip('0').rstrip('.')
+
+
+def _rect(x1, y1, x2, y2, width, dashed=False):
+    # PIL draws outlines inside the box, so inset the centred SVG stroke to match
+    inset = width / 2
+    dash = ' stroke-dasharray="10 10"' if dashed else ''
+    return (f'<rect x="{_num(x1 + inset)}" y="{_num(y1 + inset)}" '
+            f'width="{_num(max(x2 - x1 - width, 0))}" height="{_num(max(y2 - y1 - width, 0))}" '
+            f'stroke-width="{width}"{dash}/>')
+
+
+def _line(x1, y1, x2, y2, width):
+    return (f'<line x1="{_num(x1)}" y1="{_num(y1)}" x2="{_num(x2)}" y2="{_num(y2)}" '
+            f'stroke-width="{width}"/>')
+
+
+def _arc(x1, y1, x2, y2, start, end, width):
+    """An elliptical arc inside a bounding box, with angles measured like PIL's ImageDraw.arc"""
+    cx, cy = (x1 + x2) / 2, (y1 + y2) / 2
+    rx, ry = (x2 - x1) / 2, (y2 - y1) / 2
+    sweep = (end - start) % 360 or 360
+    start_rad = math.radians(start)
+    end_rad = math.radians(start + sweep)
+    sx, sy = cx + rx * math.cos(start_rad), cy + ry * math.sin(start_rad)
+    ex, ey = cx + rx * math.cos(end_rad), cy + ry * math.sin(end_rad)
+    large_arc = 1 if sweep > 180 else 0
+    return (f'<path d="M{_num(sx)} {_num(sy)} A{_num(rx)} {_num(ry)} 0 {large_arc} 1 {_num(ex)} {_num(ey)}" '
+            f'stroke-width="{width}"/>')
+
+
+def _circle(cx, cy, radius, width):
+    return f'<circle cx="{_num(cx)}" cy="{_num(cy)}" r="{_num(radius)}" stroke-width="{width}"/>'
+
+
+def _text(x, y, text, size, anchor='mm'):
+    text_anchor, baseline = ANCHORS[anchor]
+    return (f'<text x="{_num(x)}" y="{_num(y)}" font-size="{size}" text-anchor="{text_anchor}" '
+            f'dominant-baseline="{baseline}">{escape(str(text), quote=False)}</text>')
+
+
+def render_floor_plan_svg(layout):
+    """Draw a computed layout as a blueprint and return the SVG document as UTF-8 bytes"""
+    description = layout['description']
+    img_width = layout['img_width']
+    img_height = layout['img_height']
+    scale = layout['scale']
+    house_x = layout['house_x']
+    house_y = layout['house_y']
+    pixel_width = layout['pixel_width']
+    pixel_height = layout['pixel_height']
+
+    shapes = []
+    labels = []
+
+    # Title and subtitle
+    labels.append(_text(img_width//2, 80, "FLOOR PLAN", TITLE_SIZE))
+    subtitle = description[:100] + "..." if len(description) > 100 else description
+    labels.append(_text(img_width//2, 130, subtitle, DETAIL_SIZE))
+
+    # House outline
+    shapes.append(_rect(house_x, house_y, house_x + pixel_width, house_y + pixel_height, 5))
+
+    # Dimension lines
+    labels.append(_text(house_x + pixel_width//2, house_y + pixel_height + 40,
+                        f"{layout['house_width']} ft", DIMENSION_SIZE))
+    labels.append(_text(house_x - 40, house_y + pixel_height//2,
+                        f"{layout['house_depth']} ft", DIMENSION_SIZE))
+    shapes.append(_line(house_x, house_y + pixel_height + 20, house_x + pixel_width,
+                        house_y + pixel_height + 20, 2))
+    shapes.append(_line(house_x - 20, house_y, house_x - 20, house_y + pixel_height, 2))
+
+    # Rooms
+    for room in layout['rooms']:
+        x, y, width, height = room['x'], room['y'], room['width'], room['height']
+        shapes.append(_rect(x, y, x + width, y + height, 3, dashed=room.get('is_open', False)))
+        labels.append(_text(x + width//2, y + height//2, room['name'], ROOM_SIZE))
+
+        width_ft = int(width / scale)
+        height_ft = int(height / scale)
+        labels.append(_text(x + width//2, y + height - 20, f"{width_ft}' x {height_ft}'", DETAIL_SIZE))
+
+        for i, feature in enumerate(room.get('features', [])[:2]):
+            if isinstance(feature, str):
+                labels.append(_text(x + width//2, y + 30 + i*20, feature.upper(), DETAIL_SIZE))
+                if 'window' in feature.lower():
+                    shapes.append(_rect(x + width//4, y + 10, x + 3*width//4, y + 20, 2))
+                elif 'door' in feature.lower():
+                    shapes.append(_arc(x + width - 40, y + 20, x + width - 10, y + 50, 270, 0, 2))
+
+    # Entrance
+    entrance_width = 40
+    entrance_x = house_x + pixel_width//2 - entrance_width/2
+    shapes.append(_line(entrance_x, house_y, entrance_x + entrance_width, house_y, 5))
+    shapes.append(_arc(entrance_x, house_y - 40, entrance_x + entrance_width, house_y, 180, 0, 3))
+
+    # Compass
+    compass_x = house_x + pixel_width - 100
+    compass_y = house_y + 100
+    shapes.append(_circle(compass_x, compass_y, 50, 2))
+    shapes.append(_line(compass_x, compass_y - 50, compass_x, compass_y + 50, 2))
+    shapes.append(_line(compass_x - 50, compass_y, compass_x + 50, compass_y, 2))
+    labels.append(_text(compass_x, compass_y - 60, "N", DETAIL_SIZE, anchor='ms'))
+
+    # Scale bar
+    scale_x = house_x
+    scale_y = house_y + pixel_height + 80
+    scale_length = 100
+    shapes.append(_line(scale_x, scale_y, scale_x + scale_length, scale_y, 2))
+    labels.append(_text(scale_x + scale_length/2, scale_y + 15, "5 ft", DETAIL_SIZE))
+
+    # Title block
+    title_block_x = house_x + pixel_width - 400
+    title_block_y = house_y + pixel_height + 60
+    shapes.append(_rect(title_block_x, title_block_y, title_block_x + 400, title_block_y + 100, 2))
+    labels.append(_text(title_block_x + 10, title_block_y + 20, "FLOOR PLAN", DETAIL_SIZE, anchor='lt'))
+    labels.append(_text(title_block_x + 10, title_block_y + 50,
+                        f"TOTAL AREA: {layout['total_area']} sq ft", DETAIL_SIZE, anchor='lt'))
+    labels.append(_text(title_block_x + 10, title_block_y + 80,
+                        f"ROOMS: {layout['total_rooms']}", DETAIL_SIZE, anchor='lt'))
+
+    svg = (
+        f'<svg xmlns="http://www.w3.org/2000/svg" width="{img_width}" height="{img_height}" '
+        f'viewBox="0 0 {img_width} {img_height}">'
+        f'<rect width="100%" height="100%" fill="white"/>'
+        f'<g fill="none" stroke="{STROKE}">{"".join(shapes)}</g>'
+        f'<g fill="{STROKE}" font-family="{FONT_FAMILY}">{"".join(labels)}</g>'
+        f'</svg>'
+    )
+    return svg.encode('utf-8')
@@ -0,0 +1,180 @@
+# -*- coding: utf-8 -*-
+
+"""
+Timing spans for floor plan generation.
+
+A trace collects named spans (gemini, groq, layout, draw, encode, persist)
+with their duration and sizes such as prompt and response characters, room
+count and image bytes. The active trace is held in a context variable, so
+stages add spans without being passed anything. Code that runs outside a
+trace pays almost nothing, because span() then only yields a throwaway dict.
+
+trace.summary() is the compact record returned with each result. When
+FLOOR_PLAN_TRACE_DIR is set, every finished trace is also written there
+as a Chrome trace_event JSON file, which chrome://tracing and Perfetto
+open directly.
+
+timed_import() loads heavy dependencies (PIL, requests, NumPy) the first
+time a stage needs them and records how long each took, so cold start only
+pays for what a request actually uses.
+"""
+
+import os
+import sys
+import json
+import time
+import importlib
+import threading
+import contextvars
+from contextlib import contextmanager
+
+import floor_plan_config  # loads .env.local before the settings below are read
+
+# Directory for Chrome trace files; empty disables them
+TRACE_DIR = os.getenv('FLOOR_PLAN_TRACE_DIR', '')
+
+_current = contextvars.ContextVar('floor_plan_trace', default=None)
+
+# Milliseconds taken by the first import of each lazily loaded module
+IMPORT_TIMES = {}
+
+
+def timed_import(name):
+    """Import a module, recording how long it took if this is its first import"""
+    # Always go through importlib so a module another thread is still
+    # initializing is waited for rather than returned half-built
+    loaded = name in sys.modules
+    start = time.perf_counter()
+    module = importlib.import_module(name)
+    if not loaded:
+        IMPORT_TIMES.setdefault(name, round((time.perf_counter() - start) * 1000, 2))
+    return module
+
+
+class Trace:
+    """Spans recorded for one generation"""
+
+    def __init__(self, name, **attrs):
+        self.name = name
+        self.attrs = attrs
+        self.started = time.perf_counter()
+        self.wall_started = time.time()
+        self.spans = []
+        self.finished = None
+        self._lock = threading.Lock()
+
+    def _offset_ms(self, moment):
+        return (moment - self.started) * 1000
+
+    def add(self, name, start, end, attrs):
+        with self._lock:
+            self.spans.append({
+                'name': name,
+                'startMs': self._offset_ms(start),
+                'durationMs': (end - start) * 1000,
+                'thread': threading.get_native_id(),
+                'attrs': attrs
+            })
+
+    def summary(self):
+        """Total time and one entry per finished span, in start order"""
+        with self._lock:
+            spans = sorted(self.spans, key=lambda s: s['startMs'])
+        end = self.finished if self.finished is not None else time.perf_counter()
+        return {
+            'totalMs': round(self._offset_ms(end), 2),
+            'spans': [dict({'name': s['name'], 'startMs': round(s['startMs'], 2),
+                            'durationMs': round(s['durationMs'], 2)}, **s['attrs']) for s in spans]
+        }
+
+    def to_chrome(self):
+        """The trace in Chrome's trace_event format"""
+        pid = os.getpid()
+        with self._lock:
+            events = [{
+                'name': s['name'],
+                'ph': 'X',
+                'ts': round(s['startMs'] * 1000, 1),
+                'dur': round(s['durationMs'] * 1000, 1),
+                'pid': pid,
+                'tid': s['thread'],
+                'args': s['attrs']
+            } for s in self.spans]
+        return {
+            'traceEvents': events,
+            'displayTimeUnit': 'ms',
+            'otherData': dict({'name': self.name, 'startedAt': self.wall_started}, **self.attrs)
+        }
+
+    def write(self, trace_dir):
+        """Write the trace as a Chrome trace file and return its path"""
+        os.makedirs(trace_dir, exist_ok=True)
+        label = self.attrs.get('projectId', self.name)
+        path = os.path.join(trace_dir, f"{label}-{int(self.wall_started * 1000)}.json")
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.to_chrome(), f)
+        return path
+
+
+@contextmanager
+def span(name, **attrs):
+    """Time a block as a span of the current trace.
+
+    Yields the span's attribute dict so the block can add sizes it only
+    learns while running, such as response length.
+    """
+    trace = _current.get()
+    if trace is None:
+        yield attrs
+        return
+    start = time.perf_counter()
+    try:
+        yield attrs
+    except Exception as e:
+        attrs['error'] = str(e)
+        raise
+    finally:
+        trace.add(name, start, time.perf_counter(), attrs)
+
+
+def mark(name, **attrs):
+    """Record an instant span, e.g. a cache hit that replaced a provider call"""
+    trace = _current.get()
+    if trace is not None:
+        now = time.perf_counter()
+        trace.add(name, now, now, attrs)
+
+
+@contextmanager
+def tracing(name, **attrs):
+    """Record a trace for the block, or join the trace that is already being recorded"""
+    if _current.get() is not None:
+        yield _current.get()
+        return
+
+    trace = Trace(name, **attrs)
+    token = _current.set(trace)
+    try:
+        with span(name, **attrs):
+            yield trace
+    finally:
+        trace.finished = time.perf_counter()
+        _current.reset(token)
+        if TRACE_DIR:
+            try:
+                trace.write(TRACE_DIR)
+            except OSError as e:
+                print(f"Could not write trace file: {e}")
+
+
+def join_summaries(first, second):
+    """Join two trace summaries back to back, e.g. from traces recorded in different processes.
+
+    The second trace's spans are shifted to start where the first ended;
+    any time spent waiting between the two isn't counted.
+    """
+    offset = first['totalMs']
+    return {
+        'totalMs': round(offset + second['totalMs'], 2),
+        'spans': first['spans'] + [dict(s, startMs=round(s['startMs'] + offset, 2)) for s in second['spans']]
+    }
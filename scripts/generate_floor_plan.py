@@ -1,110 +1,211 @@
+import time
+
+# Started before any other import so --import-profile covers the whole module
+_import_started = time.perf_counter()
+
 import os
 import sys
 import json
 import base64
 import io
-import math
-import random
 import re
-import requests
-import locale
 import codecs
-from PIL import Image, ImageDraw, ImageFont
-from dotenv import load_dotenv
-import google.generativeai as genai
+import hashlib
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+import floor_plan_config  # loads .env.local before any floor_plan_* setting is read
+from floor_plan_cache import DiskCache, make_key, normalize_text
+from floor_plan_providers import gemini_client, groq_client
+from floor_plan_svg import render_floor_plan_svg
+from floor_plan_fonts import fonts
+from floor_plan_layout import pack_rooms, repair_rooms, validate_rooms
+from floor_plan_stream import SpecStreamParser
+from floor_plan_schema import (FLOOR_PLAN_SPEC_SCHEMA, to_gemini_schema, validate_floor_plan_spec,
+                               validate_paint_recommendations)
+from floor_plan_prompts import PAINT_PROMPT, SPEC_PROMPT, estimate_tokens
+from floor_plan_artifacts import save_artifact
+from floor_plan_trace import IMPORT_TIMES, mark, span, timed_import, tracing
 
 # Fix console encoding issues on Windows
 sys.stdout = codecs.getwriter('utf-8')(sys.stdout.buffer)
 sys.stderr = codecs.getwriter('utf-8')(sys.stderr.buffer)
 
-# Load environment variables from .env.local
-load_dotenv('.env.local')
-
 # Get API keys from environment variables
 GOOGLE_API_KEY = os.getenv('GOOGLE_API_KEY')
 GROQ_API_KEY = os.getenv('GROQ_API_KEY')
 
-# Configure Gemini API
-if GOOGLE_API_KEY:
-    genai.configure(api_key=GOOGLE_API_KEY)
-else:
+# Check if Gemini API key is available
+if not GOOGLE_API_KEY:
     print("Warning: GOOGLE_API_KEY not found in environment variables")
 
 # Check if Groq API key is available
 if not GROQ_API_KEY:
     print("Warning: GROQ_API_KEY not found in environment variables")
 
+# How the image is handed back: 'path' writes the PNG once and returns only its
+# path, hash and size; 'base64' also embeds the encoded image in the result JSON
+OUTPUT_MODE = os.getenv('FLOOR_PLAN_OUTPUT_MODE', 'path').lower()
+
+# Image format for the render stage: 'png' or 'webp' (lossless) from the PIL
+# raster path, or 'svg' (vector)
+IMAGE_FORMAT = os.getenv('FLOOR_PLAN_IMAGE_FORMAT', 'png').lower()
+IMAGE_MIME_TYPES = {
+    'png': 'image/png',
+    'webp': 'image/webp',
+    'svg': 'image/svg+xml'
+}
+
+# Raster canvas: 'palette' (16 shades of blue, 4-bit PNG), 'bilevel' (pure
+# blue and white, 1-bit PNG) or 'rgb' (24-bit). The blueprint only uses blue
+# ink on white, so the smaller canvases look the same and encode much faster.
+RASTER_MODE = os.getenv('FLOOR_PLAN_RASTER_MODE', 'palette').lower()
+PNG_COMPRESS_LEVEL = int(os.getenv('FLOOR_PLAN_PNG_COMPRESS_LEVEL', '6'))
+
+# Palette running from white paper (index 0) to full blue ink (index 15)
+BLUEPRINT_PALETTE = [channel for i in range(16)
+                     for channel in (255 - i * 17, 255 - i * 17, 255)]
+BILEVEL_PALETTE = [255, 255, 255, 0, 0, 255]
+# Maps grayscale ink coverage (0 = ink, 255 = paper) to a palette index
+PALETTE_LEVELS = [(255 - value) * 15 // 255 for value in range(256)]
+
+# Run the Gemini and Groq calls in parallel (set to 0 to run them one after the other)
+CONCURRENT_PROVIDERS = os.getenv('FLOOR_PLAN_CONCURRENT_PROVIDERS', '1').lower() not in ('0', 'false', 'no')
+
+# Ask the providers for bare JSON (Gemini constrained to the spec schema) instead of
+# prose that has to be searched for an object (set to 0 for free-text answers)
+STRUCTURED_OUTPUT = os.getenv('FLOOR_PLAN_STRUCTURED_OUTPUT', '1').lower() not in ('0', 'false', 'no')
+
+def parse_json_object(response_text):
+    """Extract the first JSON object from a provider's response text.
+
+    Structured output is the object itself. A free-text answer may wrap it
+    in prose or a code fence, so each "{" is tried in turn; decoding the
+    first complete object rather than everything up to the last "}" keeps
+    braces in trailing prose from breaking it.
+    """
+    try:
+        parsed = json.loads(response_text)
+        if isinstance(parsed, dict):
+            return parsed
+    except json.JSONDecodeError:
+        pass
+    decoder = json.JSONDecoder()
+    start = response_text.find('{')
+    while start != -1:
+        try:
+            parsed, _ = decoder.raw_decode(response_text, start)
+            if isinstance(parsed, dict):
+                return parsed
+        except json.JSONDecodeError:
+            pass
+        start = response_text.find('{', start + 1)
+    return None
+
+def checked(kind, value, validate):
+    """Return value if it matches its schema, otherwise report why and return None"""
+    if value is None:
+        print(f"No JSON object found in the {kind}")
+        return None
+    errors = validate(value)
+    if errors:
+        print(f"Invalid {kind} ({len(errors)} problems): {'; '.join(errors[:5])}")
+        return None
+    return value
+
+def parse_paint_recommendations(response_text):
+    """Parse and validate Groq's paint recommendations, or return None"""
+    return checked('paint recommendations', parse_json_object(response_text), validate_paint_recommendations)
+
+def count_tokens(provider_span, response_text, input_tokens=None, output_tokens=None):
+    """Record the estimated output tokens on a provider span, plus the actual counts the provider reported"""
+    provider_span['estOutputTokens'] = estimate_tokens(response_text)
+    if input_tokens is not None:
+        provider_span['inputTokens'] = input_tokens
+    if output_tokens is not None:
+        provider_span['outputTokens'] = output_tokens
+
+# Groq model. Cache keys also carry PAINT_PROMPT.version, so editing the
+# prompt retires the recommendations cached for the old one.
+GROQ_MODEL = 'llama3-70b-8192'
+
+# Paint recommendations mostly depend on the mix of rooms and the design style,
+# so projects with the same room set and style share one cached answer
+paint_cache = DiskCache(
+    'paint',
+    ttl=int(os.getenv('FLOOR_PLAN_PAINT_CACHE_TTL', str(30 * 24 * 3600))),
+    max_entries=int(os.getenv('FLOOR_PLAN_PAINT_CACHE_MAX_ENTRIES', '500'))
+)
+
+def extract_room_types(floor_plan_specs, description):
+    """List the room types to get paint recommendations for.
+
+    Uses the Gemini specs when available and otherwise a quick keyword scan
+    of the description, which needs no provider call at all.
+    """
+    # Extract room types from floor plan specs
+    room_types = []
+    if floor_plan_specs and 'rooms' in floor_plan_specs:
+        for room in floor_plan_specs['rooms']:
+            room_type = room.get('type', '').lower()
+            room_name = room.get('name', '').lower()
+            if room_type and room_type not in room_types:
+                room_types.append(room_type)
+            elif room_name and room_name not in room_types:
+                room_types.append(room_name)
+
+    # If no room types found, extract from description
+    if not room_types:
+        common_rooms = ['bedroom', 'bathroom', 'kitchen', 'living room', 'dining room',
+                       'hallway', 'pooja room', 'verandah', 'balcony', 'garage']
+        for room in common_rooms:
+            if room in description.lower():
+                room_types.append(room)
+
+    return room_types
+
+def canonical_room_types(room_types):
+    """Reduce room types to a sorted set, so 'Bedroom 2' and 'bedroom_3' count as one 'bedroom'"""
+    canonical = set()
+    for room_type in room_types:
+        room_type = re.sub(r'[\d_#-]+', ' ', room_type.lower())
+        room_type = re.sub(r'\s+', ' ', room_type).strip()
+        if room_type:
+            canonical.add(room_type)
+    return sorted(canonical)
+
+def detect_design_style(floor_plan_specs, description):
+    """Return 'indian' or 'international', preferring the style Gemini reported"""
+    if floor_plan_specs and floor_plan_specs.get('design_style'):
+        return 'indian' if 'indian' in str(floor_plan_specs['design_style']).lower() else 'international'
+    description = description.lower()
+    indian_markers = ['indian', 'pooja', 'vastu', 'verandah', 'rs.', '₹']
+    return 'indian' if any(marker in description for marker in indian_markers) else 'international'
+
 def get_painting_recommendations_from_groq(floor_plan_specs, description):
     """Use Groq API to get painting and color recommendations for each room"""
     print("Getting painting and color recommendations from Groq...")
 
-    # Replace problematic Unicode characters with ASCII equivalents
-    description = description.replace('₹', 'Rs.')
-
     if not GROQ_API_KEY:
         print("Skipping painting recommendations - GROQ_API_KEY not found")
         return None
 
     try:
-        # Extract room types from floor plan specs
-        room_types = []
-        if floor_plan_specs and 'rooms' in floor_plan_specs:
-            for room in floor_plan_specs['rooms']:
-                room_type = room.get('type', '').lower()
-                room_name = room.get('name', '').lower()
-                if room_type and room_type not in room_types:
-                    room_types.append(room_type)
-                elif room_name and room_name not in room_types:
-                    room_types.append(room_name)
-
-        # If no room types found, extract from description
-        if not room_types:
-            common_rooms = ['bedroom', 'bathroom', 'kitchen', 'living room', 'dining room',
-                           'hallway', 'pooja room', 'verandah', 'balcony', 'garage']
-            for room in common_rooms:
-                if room in description.lower():
-                    room_types.append(room)
-
-        # Create prompt for Groq
-        prompt = f"""
-        Based on this house description: "{description}", provide detailed painting and color recommendations for each room type.
-
-        For each room type, suggest:
-        1. 2-3 color options with specific paint names and codes (if possible)
-        2. Cost-efficient paint brands and types
-        3. Special painting techniques or finishes if applicable
-        4. IMPORTANT: Accurate estimated cost per square foot (in ₹ for Indian brands, $ for international brands)
-        5. Maintenance tips
-
-        Focus on these room types: {', '.join(room_types)}
-
-        Format your response as a structured JSON with the following format:
-        {{
-          "overall_theme": "Brief description of overall color theme for the house",
-          "rooms": [
-            {{
-              "room_type": "bedroom",
-              "color_options": [
-                {{
-                  "name": "Soft Blue",
-                  "brand": "Asian Paints",
-                  "code": "AP-S1050",
-                  "finish": "Matte",
-                  "cost_per_sqft": "₹15-20"  // IMPORTANT: Always include accurate cost information
-                }},
-                // More color options
-              ],
-              "techniques": "Any special painting techniques",
-              "maintenance": "Maintenance tips"
-            }},
-            // More rooms
-          ],
-          "tips": ["General painting tip 1", "General painting tip 2"]
-        }}
-
-        Provide cost-efficient options that still look good. Include both Indian and international paint brands.
-        Make sure to provide ACCURATE cost information for each paint option, as this is very important for the user.
-        """
+        room_types = extract_room_types(floor_plan_specs, description)
+
+        cache_key = make_key(
+            'paint',
+            canonical_room_types(room_types),
+            detect_design_style(floor_plan_specs, description),
+            PAINT_PROMPT.version,
+            GROQ_MODEL
+        )
+        cached_recommendations = paint_cache.get(cache_key)
+        if cached_recommendations is not None and not validate_paint_recommendations(cached_recommendations):
+            print("Using cached painting recommendations")
+            mark('groq', cached=True)
+            return cached_recommendations
+
+        prompt = PAINT_PROMPT.render(description=description, room_types=', '.join(room_types))
 
         # Call Groq API
         headers = {
@@ -113,17 +214,19 @@ def get_painting_recommendations_from_groq(floor_plan_specs, description):
         }
 
         data = {
-            "model": "llama3-70b-8192",
+            "model": GROQ_MODEL,
             "messages": [{"role": "user", "content": prompt}],
             "temperature": 0.7,
-            "max_tokens": 4000
+            "max_tokens": PAINT_PROMPT.max_output_tokens
         }
+        if STRUCTURED_OUTPUT:
+            data["response_format"] = {"type": "json_object"}
 
-        response = requests.post(
-            "https://api.groq.com/openai/v1/chat/completions",
-            headers=headers,
-            json=data
-        )
+        with span('groq', model=GROQ_MODEL, promptVersion=PAINT_PROMPT.version, promptChars=len(prompt),
+                  estInputTokens=estimate_tokens(prompt), maxOutputTokens=PAINT_PROMPT.max_output_tokens) as groq_span:
+            response = groq_client.post_json("chat/completions", data, headers=headers)
+            groq_span['status'] = response.status_code
+            groq_span['responseChars'] = len(response.text)
 
         if response.status_code != 200:
             print(f"Error from Groq API: {response.status_code}")
@@ -132,1309 +235,612 @@ def get_painting_recommendations_from_groq(floor_plan_specs, description):
 
         response_data = response.json()
         response_text = response_data['choices'][0]['message']['content']
+        usage = response_data.get('usage') or {}
+        count_tokens(groq_span, response_text, usage.get('prompt_tokens'), usage.get('completion_tokens'))
         print("Successfully got painting recommendations from Groq")
 
-        # Try to extract JSON from the response
-        json_match = re.search(r'\{[\s\S]*\}', response_text)
-        if json_match:
-            json_str = json_match.group(0)
-            try:
-                recommendations = json.loads(json_str)
-                return recommendations
-            except json.JSONDecodeError as e:
-                print(f"Error parsing JSON from Groq response: {e}")
-                return {"text": response_text}  # Return as text if JSON parsing fails
-        else:
-            # If no JSON found, return the text as is
-            return {"text": response_text}
+        recommendations = parse_paint_recommendations(response_text)
+        if recommendations is not None:
+            paint_cache.set(cache_key, recommendations)
+        return recommendations
 
     except Exception as e:
         print(f"Error getting painting recommendations from Groq: {e}")
         return None
 
-def get_floor_plan_details_from_gemini(description):
-    """Use Gemini to analyze the description and extract detailed floor plan specifications"""
+# Gemini model. Cache keys also carry SPEC_PROMPT.version, so editing the
+# prompt retires the specs cached for the old one.
+GEMINI_MODEL = 'gemini-2.0-flash'
+
+# Stream Gemini's answer and parse rooms as they arrive instead of waiting for the whole response
+GEMINI_STREAM = os.getenv('FLOOR_PLAN_GEMINI_STREAM', '0').lower() not in ('0', 'false', 'no')
+
+# Parsed Gemini specs, keyed by normalized description, prompt version and model
+spec_cache = DiskCache(
+    'specs',
+    ttl=int(os.getenv('FLOOR_PLAN_SPEC_CACHE_TTL', str(7 * 24 * 3600))),
+    max_entries=int(os.getenv('FLOOR_PLAN_SPEC_CACHE_MAX_ENTRIES', '1000'))
+)
+
+# Gemini's responseSchema for the spec, converted once
+GEMINI_SPEC_SCHEMA = to_gemini_schema(FLOOR_PLAN_SPEC_SCHEMA)
+
+def gemini_payload(prompt):
+    """Request body for a spec prompt: capped output, schema-constrained JSON when structured output is on"""
+    generation_config = {"maxOutputTokens": SPEC_PROMPT.max_output_tokens}
+    if STRUCTURED_OUTPUT:
+        generation_config["responseMimeType"] = "application/json"
+        generation_config["responseSchema"] = GEMINI_SPEC_SCHEMA
+    return {"contents": [{"parts": [{"text": prompt}]}], "generationConfig": generation_config}
+
+def parse_floor_plan_spec(response_text):
+    """Parse and validate Gemini's floor plan spec, or return None"""
+    return checked('floor plan spec', parse_json_object(response_text), validate_floor_plan_spec)
+
+def stream_floor_plan_spec(prompt, gemini_span, on_rooms=None):
+    """Stream Gemini's answer, handing the rooms to on_rooms as soon as the rooms array closes"""
+    path = f"models/{GEMINI_MODEL}:streamGenerateContent"
+    payload = gemini_payload(prompt)
+    started = time.perf_counter()
+    response = gemini_client.post_stream(path, payload, headers={"x-goog-api-key": GOOGLE_API_KEY},
+                                         params={"alt": "sse"})
+    gemini_span['status'] = response.status_code
+    if response.status_code != 200:
+        print(f"Error from Gemini API: {response.status_code}")
+        print(f"Response text: {response.text}")
+        response.close()
+        return None
+
+    parser = SpecStreamParser()
+    usage = {}
+    for event in gemini_client.iter_events(response, path, payload):
+        # Every event carries the running totals; the last one has the final counts
+        usage = event.get('usageMetadata') or usage
+        candidates = event.get('candidates') or []
+        if not candidates:
+            continue
+        parts = candidates[0].get('content', {}).get('parts', [])
+        rooms_complete = parser.rooms_complete
+        if parser.feed(''.join(part.get('text', '') for part in parts)):
+            gemini_span.setdefault('firstRoomMs', round((time.perf_counter() - started) * 1000, 2))
+        if parser.rooms_complete and not rooms_complete:
+            gemini_span['roomsMs'] = round((time.perf_counter() - started) * 1000, 2)
+            if on_rooms:
+                on_rooms(list(parser.rooms))
+
+    gemini_span['responseChars'] = len(parser.text)
+    gemini_span['rooms'] = len(parser.rooms)
+    count_tokens(gemini_span, parser.text, usage.get('promptTokenCount'), usage.get('candidatesTokenCount'))
+    if parser.spec() is None:
+        # The object never closed cleanly; salvage whatever object the text holds
+        return parse_floor_plan_spec(parser.text)
+    return checked('floor plan spec', parser.spec(), validate_floor_plan_spec)
+
+def get_floor_plan_details_from_gemini(description, on_rooms=None):
+    """Use Gemini to analyze the description and extract detailed floor plan specifications.
+
+    With FLOOR_PLAN_GEMINI_STREAM on, the answer is streamed and on_rooms (if
+    given) is called with the list of room dicts as soon as Gemini has
+    finished the rooms, before the rest of the spec. It is not called for a
+    cached or non-streamed answer.
+    """
+    cache_key = make_key('spec', normalize_text(description), SPEC_PROMPT.version, GEMINI_MODEL)
+    cached_specs = spec_cache.get(cache_key)
+    # Entries cached before the spec was validated may not match the schema
+    if cached_specs is not None and not validate_floor_plan_spec(cached_specs):
+        print("Using cached floor plan specifications")
+        mark('gemini', cached=True)
+        return cached_specs
+
     print("Analyzing description with Gemini to extract detailed floor plan specifications...")
 
-    # Replace problematic Unicode characters with ASCII equivalents
-    description = description.replace('₹', 'Rs.')
+    if not GOOGLE_API_KEY:
+        print("Skipping Gemini analysis - GOOGLE_API_KEY not found")
+        return None
 
     try:
-        # Create a prompt for Gemini to extract detailed floor plan information
-        prompt = f"""
-        You are a professional architect specializing in creating accurate and detailed floor plans.
-        Analyze this house description and provide detailed specifications for creating a precise architectural floor plan:
-        "{description}"
-
-        Return a JSON object with the following structure:
-        {{
-          "rooms": [
-            {{
-              "name": "room name",
-              "type": "bedroom/bathroom/kitchen/etc",
-              "dimensions": "width x length in feet",
-              "position": "north/south/east/west/center",
-              "adjacent_to": ["other room names"],
-              "features": ["feature1", "feature2"],
-              "coordinates": {{
-                "x": 0,  // x-coordinate in feet from left edge
-                "y": 0,  // y-coordinate in feet from top edge
-                "width": 10,  // width in feet
-                "height": 10   // height in feet
-              }}
-            }}
-          ],
-          "layout_style": "open floor plan or traditional",
-          "total_area": "approximate square footage",
-          "special_features": ["any special features mentioned"],
-          "house_shape": "rectangular/L-shaped/etc",
-          "house_dimensions": {{
-            "width": 50,  // total width in feet
-            "depth": 40   // total depth in feet
-          }},
-          "design_style": "indian/international"
-        }}
-
-        CRITICAL REQUIREMENTS FOR ACCURATE FLOOR PLAN GENERATION:
-        1. Use ABSOLUTE COORDINATES for each room. The x,y coordinates represent the top-left corner of each room in feet from the house origin.
-        2. Ensure NO ROOM OVERLAPS with any other room - check all coordinates carefully.
-        3. Ensure all rooms are CONTAINED WITHIN the house dimensions.
-        4. Ensure ADJACENT ROOMS actually share walls by having their coordinates align perfectly.
-        5. Use REALISTIC ROOM DIMENSIONS based on function (bedrooms: 10-14ft, bathrooms: 5-8ft, etc.)
-        6. For Indian-style homes: include pooja room, larger kitchen with utility area, covered verandah.
-        7. For international-style homes: include walk-in closets, en-suite bathrooms, open floor plans.
-        8. VERIFY that the sum of room areas does not exceed the total house area.
-        9. Include DOORWAYS between adjacent rooms (specify in features).
-        10. Include WINDOWS for exterior rooms (specify in features).
-        11. Ensure the house has a LOGICAL FLOW with proper room adjacencies.
-        12. Make sure the coordinates create a VISUALLY BALANCED layout.
-
-        BE EXTREMELY PRECISE with all measurements and coordinates to ensure a professional, accurate floor plan.
-        Make reasonable assumptions based on standard architectural practices if specific details aren't provided.
-        """
-
-        # Call Gemini API
-        model = genai.GenerativeModel('gemini-2.0-flash')
-        response = model.generate_content(prompt)
-
-        # Extract the JSON from the response
-        response_text = response.text
-        print(f"Gemini response: {response_text[:500]}...")
-
-        # Try to extract JSON from the response
-        import re
-        import json
-
-        # Look for JSON pattern in the response
-        json_match = re.search(r'\{[\s\S]*\}', response_text)
-        if json_match:
-            json_str = json_match.group(0)
-            try:
-                floor_plan_specs = json.loads(json_str)
-                print("Successfully extracted floor plan specifications from Gemini")
-                return floor_plan_specs
-            except json.JSONDecodeError as e:
-                print(f"Error parsing JSON from Gemini response: {e}")
-                # Fall back to default parsing
-        else:
-            print("Could not find JSON in Gemini response")
+        prompt = SPEC_PROMPT.render(description=description)
+        prompt_attrs = dict(model=GEMINI_MODEL, promptVersion=SPEC_PROMPT.version, promptChars=len(prompt),
+                            estInputTokens=estimate_tokens(prompt), maxOutputTokens=SPEC_PROMPT.max_output_tokens)
+
+        if GEMINI_STREAM:
+            with span('gemini', stream=True, **prompt_attrs) as gemini_span:
+                floor_plan_specs = stream_floor_plan_spec(prompt, gemini_span, on_rooms)
+            if floor_plan_specs is not None:
+                spec_cache.set(cache_key, floor_plan_specs)
+            return floor_plan_specs
+
+        with span('gemini', **prompt_attrs) as gemini_span:
+            response = gemini_client.post_json(
+                f"models/{GEMINI_MODEL}:generateContent",
+                gemini_payload(prompt),
+                headers={"x-goog-api-key": GOOGLE_API_KEY}
+            )
+            gemini_span['status'] = response.status_code
+            gemini_span['responseChars'] = len(response.text)
 
-        # If we couldn't get structured data from Gemini, return None
-        return None
+        if response.status_code != 200:
+            print(f"Error from Gemini API: {response.status_code}")
+            print(f"Response text: {response.text}")
+            return None
+
+        response_data = response.json()
+        candidate = response_data['candidates'][0]
+        response_text = ''.join(part.get('text', '') for part in candidate['content']['parts'])
+        usage = response_data.get('usageMetadata') or {}
+        count_tokens(gemini_span, response_text, usage.get('promptTokenCount'), usage.get('candidatesTokenCount'))
+
+        floor_plan_specs = parse_floor_plan_spec(response_text)
+        if floor_plan_specs is not None:
+            spec_cache.set(cache_key, floor_plan_specs)
+        return floor_plan_specs
     except Exception as e:
         print(f"Error getting floor plan details from Gemini: {e}")
         return None
 
-def generate_floor_plan_image(description):
-    """Generate a floor plan image using Gemini for accurate room layout"""
-    print("Generating floor plan image with Gemini-enhanced blueprint generator...")
+# Floor plan generation runs as a pipeline of stages, each taking the previous
+# stage's output:
+#   analyze   -> get_floor_plan_details_from_gemini(description)       -> specs
+#   recommend -> get_painting_recommendations_from_groq(specs, desc)   -> paint recommendations
+#   layout    -> layout_floor_plan(description, specs)                 -> layout
+#   render    -> render_floor_plan(layout) / render_floor_plan_svg()   -> PNG / SVG bytes
+#   persist   -> save_results(project_id, description, image, recs)    -> file paths
+# run_pipeline() chains the in-memory stages; run_generation() adds persistence
+# as run_provider_stages() (analyze, recommend) then finish_generation()
+# (layout, render, persist). Persisting also saves the specs and layout as a
+# versioned artifact, which render_from_spec.py re-renders without providers.
+# The stages take the description as given; the entry points (main() here,
+# floor_plan_server.py and floor_plan_batch.py) replace '₹' with 'Rs.' once.
+
+# Bump whenever layout_floor_plan() places rooms differently, so
+# render_from_spec.py recomputes stored layouts instead of reusing them
+LAYOUT_VERSION = 2
+
+# Room types that share one space in an open plan
+OPEN_PLAN_AREAS = ('living', 'dining', 'kitchen')
+
+def layout_floor_plan(description, floor_plan_specs):
+    """Compute house geometry and room rectangles (in pixels) from the floor plan specs.
+
+    Layout and rendering are deterministic: the same description and specs
+    always give the same layout and byte-identical images, so images can be
+    cached and deduplicated by their sha256.
+    """
+    description = description.lower()
+    spec_rooms = floor_plan_specs.get('rooms', []) if floor_plan_specs else []
+
+    # Initialize room counts with fallbacks
+    bedrooms = max(1, sum(1 for room in spec_rooms if 'bedroom' in room.get('type', '').lower()))
+    bathrooms = max(1, sum(1 for room in spec_rooms if 'bathroom' in room.get('type', '').lower()))
+
+    has_kitchen = "kitchen" in description or any('kitchen' in room.get('type', '').lower() for room in spec_rooms)
+    has_living_room = "living room" in description or any('living' in room.get('type', '').lower() for room in spec_rooms)
+    has_dining_room = "dining room" in description or any('dining' in room.get('type', '').lower() for room in spec_rooms)
+    has_garage = "garage" in description or any('garage' in room.get('type', '').lower() for room in spec_rooms)
+
+    # Image setup
+    img_width = 2048
+    img_height = 2048
+
+    # Calculate total rooms
+    total_rooms = bedrooms + bathrooms + (1 if has_kitchen else 0) + \
+                 (1 if has_living_room else 0) + (1 if has_dining_room else 0) + \
+                 (1 if has_garage else 0)
+
+    # House dimensions
+    house_width = 60
+    house_depth = 40
+    dimensions = (floor_plan_specs or {}).get('house_dimensions') or {}
+    # A side under a foot would collapse the drawing scale; keep the default then
+    if int(dimensions.get('width') or 0) > 0 and int(dimensions.get('depth') or 0) > 0:
+        house_width = int(dimensions['width'])
+        house_depth = int(dimensions['depth'])
+
+    scale = min(img_width / (house_width * 1.5), img_height / (house_depth * 1.5))
+    pixel_width = house_width * scale
+    pixel_height = house_depth * scale
+    house_x = (img_width - pixel_width) // 2
+    house_y = (img_height - pixel_height) // 2
+
+    # Total area for the title block
+    total_area = house_width * house_depth
+    if floor_plan_specs and floor_plan_specs.get('total_area'):
+        # "1,800 sq ft" states an area; "about two thousand square feet" doesn't
+        stated_area = re.findall(r'\d+', str(floor_plan_specs['total_area']).replace(',', ''))
+        if stated_area and int(stated_area[0]) > 0:
+            total_area = int(stated_area[0])
+
+    # Standard room sizes (in feet)
+    room_sizes = {
+        'bedroom': (12, 12),
+        'bathroom': (6, 8),
+        'kitchen': (12, 15),
+        'living room': (15, 18),
+        'dining room': (12, 14),
+        'garage': (20, 20)
+    }
 
-    try:
-        # Get detailed specifications from Gemini
-        floor_plan_specs = get_floor_plan_details_from_gemini(description)
+    # Place rooms (in feet, from the top-left corner of the house)
+    if spec_rooms and all('coordinates' in r for r in spec_rooms):
+        placed = []
+        for room in spec_rooms:
+            coords = room['coordinates']
+            placed.append({
+                'name': room['name'].upper(),
+                'type': room.get('type', ''),
+                'x': coords['x'],
+                'y': coords['y'],
+                'width': coords['width'],
+                'height': coords['height'],
+                'features': room.get('features', []),
+                'adjacent_to': room.get('adjacent_to', [])
+            })
 
-        # Get painting recommendations from Groq
-        painting_recommendations = get_painting_recommendations_from_groq(floor_plan_specs, description)
-
-        # Parse the description to identify rooms and features as fallback
-        description = description.lower()
-
-        # Default values if Gemini fails
-        bedrooms = 1
-        bathrooms = 1
-        has_kitchen = True
-        has_living_room = True
-        has_dining_room = True
-        has_garage = "garage" in description
-        has_open_floor_plan = "open floor" in description or "open plan" in description or "open concept" in description
-
-        # Determine if we have valid Gemini specs
-        has_valid_gemini_specs = False
-        if floor_plan_specs and 'rooms' in floor_plan_specs and floor_plan_specs['rooms']:
-            # Check if we have coordinates for rooms
-            has_coordinates = all('coordinates' in room for room in floor_plan_specs['rooms'])
-            if has_coordinates:
-                has_valid_gemini_specs = True
-                print("Using Gemini-provided room coordinates for accurate layout")
-                # Count rooms by type for reference
-                bedrooms = sum(1 for room in floor_plan_specs['rooms'] if 'bedroom' in room.get('type', '').lower())
-                bathrooms = sum(1 for room in floor_plan_specs['rooms'] if 'bathroom' in room.get('type', '').lower())
-                has_kitchen = any('kitchen' in room.get('type', '').lower() for room in floor_plan_specs['rooms'])
-                has_living_room = any('living' in room.get('type', '').lower() for room in floor_plan_specs['rooms'])
-                has_dining_room = any('dining' in room.get('type', '').lower() for room in floor_plan_specs['rooms'])
-                has_garage = any('garage' in room.get('type', '').lower() for room in floor_plan_specs['rooms'])
-                has_open_floor_plan = 'open' in floor_plan_specs.get('layout_style', '').lower()
-            else:
-                print("Gemini specs missing coordinates, using fallback layout")
-                # Use the old counting logic for fallback
-                if floor_plan_specs and 'rooms' in floor_plan_specs:
-                    bedrooms = sum(1 for room in floor_plan_specs['rooms'] if 'bedroom' in room.get('type', '').lower())
-                    bedrooms = max(1, bedrooms)
-                    bathrooms = sum(1 for room in floor_plan_specs['rooms'] if 'bathroom' in room.get('type', '').lower())
-                    bathrooms = max(1, bathrooms)
-                    has_kitchen = any('kitchen' in room.get('type', '').lower() for room in floor_plan_specs['rooms'])
-                    has_living_room = any('living' in room.get('type', '').lower() for room in floor_plan_specs['rooms'])
-                    has_dining_room = any('dining' in room.get('type', '').lower() for room in floor_plan_specs['rooms'])
-                    has_garage = any('garage' in room.get('type', '').lower() for room in floor_plan_specs['rooms'])
-                    has_open_floor_plan = 'open' in floor_plan_specs.get('layout_style', '').lower()
-                else:
-                    # Fallback to basic parsing from description
-                    if "1 bedroom" in description:
-                        bedrooms = 1
-                    elif "2 bedroom" in description or "2 bedrooms" in description:
-                        bedrooms = 2
-                    elif "3 bedroom" in description or "3 bedrooms" in description:
-                        bedrooms = 3
-                    elif "4 bedroom" in description or "4 bedrooms" in description:
-                        bedrooms = 4
-
-                    if "1 bathroom" in description:
-                        bathrooms = 1
-                    elif "2 bathroom" in description or "2 bathrooms" in description:
-                        bathrooms = 2
-                    elif "3 bathroom" in description or "3 bathrooms" in description:
-                        bathrooms = 3
-
-                    has_kitchen = "kitchen" in description
-                    has_living_room = "living room" in description or "living area" in description
-                    has_dining_room = "dining room" in description or "dining area" in description
-                    has_garage = "garage" in description
-        else:
-            print("No valid Gemini specs, using fallback layout")
-            # Fallback to basic parsing from description
-            if "1 bedroom" in description:
-                bedrooms = 1
-            elif "2 bedroom" in description or "2 bedrooms" in description:
-                bedrooms = 2
-            elif "3 bedroom" in description or "3 bedrooms" in description:
-                bedrooms = 3
-            elif "4 bedroom" in description or "4 bedrooms" in description:
-                bedrooms = 4
-
-            if "1 bathroom" in description:
-                bathrooms = 1
-            elif "2 bathroom" in description or "2 bathrooms" in description:
-                bathrooms = 2
-            elif "3 bathroom" in description or "3 bathrooms" in description:
-                bathrooms = 3
-
-            has_kitchen = "kitchen" in description
-            has_living_room = "living room" in description or "living area" in description
-            has_dining_room = "dining room" in description or "dining area" in description
-            has_garage = "garage" in description
-
-        # Create a new image with white background
-        img_width = 2048
-        img_height = 2048
-        img = Image.new('RGB', (img_width, img_height), color='white')
-        draw = ImageDraw.Draw(img)
+        report = validate_rooms(placed, house_width, house_depth, total_area)
+        if not report['valid']:
+            print(f"Repairing Gemini coordinates: {len(report['overlaps'])} overlaps, "
+                  f"{len(report['outside'])} rooms outside the house")
+            placed, report = repair_rooms(placed, house_width, house_depth, total_area)
+        if not report['valid']:
+            print("Gemini coordinates could not be repaired, packing the rooms instead")
+            placed = pack_rooms(placed, house_width, house_depth)
+        elif report['missing_adjacency']:
+            print(f"Warning: {len(report['missing_adjacency'])} adjacent rooms don't share a wall")
+    else:
+        # Fallback placement: pack standard-size rooms into the footprint
+        wanted = [(f"BEDROOM {i+1}", 'bedroom') for i in range(bedrooms)]
+        wanted += [(f"BATHROOM {i+1}", 'bathroom') for i in range(bathrooms)]
+        if has_kitchen:
+            wanted.append(("KITCHEN", 'kitchen'))
+        if has_living_room:
+            wanted.append(("LIVING ROOM", 'living room'))
+        if has_dining_room:
+            wanted.append(("DINING ROOM", 'dining room'))
+        if has_garage:
+            wanted.append(("GARAGE", 'garage'))
+
+        placed = pack_rooms([{'name': name, 'type': room_type, 'features': [],
+                              'width': room_sizes[room_type][0], 'height': room_sizes[room_type][1]}
+                             for name, room_type in wanted], house_width, house_depth)
+
+    # In an open plan the living, dining and kitchen areas share one space,
+    # drawn with dashed walls
+    layout_style = ((floor_plan_specs or {}).get('layout_style') or '').lower()
+    open_plan = any(phrase in text for text in (layout_style, description)
+                    for phrase in ('open plan', 'open floor', 'open concept'))
+
+    rooms = [{
+        'name': room['name'],
+        'x': house_x + room['x'] * scale,
+        'y': house_y + room['y'] * scale,
+        'width': room['width'] * scale,
+        'height': room['height'] * scale,
+        'features': room['features'],
+        'is_open': open_plan and any(area in f"{room.get('type', '')} {room['name']}".lower()
+                                     for area in OPEN_PLAN_AREAS)
+    } for room in placed]
+
+    return {
+        'description': description,
+        'img_width': img_width,
+        'img_height': img_height,
+        'house_width': house_width,
+        'house_depth': house_depth,
+        'scale': scale,
+        'house_x': house_x,
+        'house_y': house_y,
+        'pixel_width': pixel_width,
+        'pixel_height': pixel_height,
+        'rooms': rooms,
+        'total_rooms': total_rooms,
+        'total_area': total_area
+    }
 
-        # Try to use a font that's available on most systems
-        try:
-            title_font = ImageFont.truetype('arial.ttf', 48)
-            room_font = ImageFont.truetype('arial.ttf', 36)
-            dimension_font = ImageFont.truetype('arial.ttf', 24)
-            detail_font = ImageFont.truetype('arial.ttf', 20)
-        except:
-            title_font = ImageFont.load_default()
-            room_font = title_font
-            dimension_font = title_font
-            detail_font = title_font
-
-        # Draw a title
-        title = "FLOOR PLAN"
-        draw.text((img_width//2, 80), title, fill='blue', font=title_font, anchor="mm")
-
-        # Get house dimensions from Gemini or use defaults
-        house_width = 60  # in feet
-        house_height = 40  # in feet
-
-        # If we have valid Gemini specs with house dimensions, use those
-        if floor_plan_specs and 'house_dimensions' in floor_plan_specs:
-            try:
-                house_dims = floor_plan_specs['house_dimensions']
-                if 'width' in house_dims and 'depth' in house_dims:
-                    house_width = int(house_dims['width'])
-                    house_height = int(house_dims['depth'])
-                    print(f"Using Gemini house dimensions: {house_width}ft x {house_height}ft")
-            except Exception as e:
-                print(f"Error parsing house dimensions: {e}, using defaults")
+def draw_floor_plan(layout, raster_mode='rgb'):
+    """Draw a computed layout as a blueprint onto a new PIL image.
+
+    raster_mode picks the canvas: 'rgb' draws blue on white in full colour,
+    'palette' draws antialiased ink on a grayscale canvas and maps it to 16
+    shades of blue, and 'bilevel' draws on a two-colour palette image that
+    PNG stores at one bit per pixel.
+    """
+    description = layout['description']
+    img_width = layout['img_width']
+    img_height = layout['img_height']
+    house_width = layout['house_width']
+    house_depth = layout['house_depth']
+    scale = layout['scale']
+    house_x = layout['house_x']
+    house_y = layout['house_y']
+    pixel_width = layout['pixel_width']
+    pixel_height = layout['pixel_height']
+    rooms = layout['rooms']
+
+    # PIL is only loaded by the raster stages; SVG renders never import it
+    Image = timed_import('PIL.Image')
+    ImageDraw = timed_import('PIL.ImageDraw')
+
+    if raster_mode == 'rgb':
+        img = Image.new('RGB', (img_width, img_height), color='white')
+        ink = 'blue'
+    elif raster_mode == 'palette':
+        img = Image.new('L', (img_width, img_height), color=255)
+        ink = 0
+    elif raster_mode == 'bilevel':
+        img = Image.new('P', (img_width, img_height), color=0)
+        img.putpalette(BILEVEL_PALETTE)
+        ink = 1
+    else:
+        raise ValueError(f"Unsupported raster mode: {raster_mode}")
+    draw = ImageDraw.Draw(img)
+
+    # Fonts are resolved and loaded once per process
+    title_font = fonts.get(48)
+    room_font = fonts.get(36)
+    dimension_font = fonts.get(24)
+    detail_font = fonts.get(20)
+
+    # Title and subtitle
+    draw.text((img_width//2, 80), "FLOOR PLAN", fill=ink, font=title_font, anchor="mm")
+    subtitle = description[:100] + "..." if len(description) > 100 else description
+    draw.text((img_width//2, 130), subtitle, fill=ink, font=detail_font, anchor="mm")
+
+    # Draw house outline
+    draw.rectangle([house_x, house_y, house_x + pixel_width, house_y + pixel_height],
+                  outline=ink, width=5)
+
+    # Dimension lines
+    draw.text((house_x + pixel_width//2, house_y + pixel_height + 40),
+             f"{house_width} ft", fill=ink, font=dimension_font, anchor="mm")
+    draw.text((house_x - 40, house_y + pixel_height//2),
+             f"{house_depth} ft", fill=ink, font=dimension_font, anchor="mm")
+
+    draw.line([house_x, house_y + pixel_height + 20, house_x + pixel_width,
+              house_y + pixel_height + 20], fill=ink, width=2)
+    draw.line([house_x - 20, house_y, house_x - 20, house_y + pixel_height],
+             fill=ink, width=2)
+
+    # Draw rooms
+    for room in rooms:
+        if room.get('is_open', False):
+            # Open-plan areas get dashed walls
+            dash_length = 10
+            x1, y1 = room['x'], room['y']
+            x2, y2 = room['x'] + room['width'], room['y'] + room['height']
+            for i in range(0, int(room['width']), dash_length*2):
+                draw.line([x1 + i, y1, x1 + i + dash_length, y1], fill=ink, width=3)
+                draw.line([x1 + i, y2, x1 + i + dash_length, y2], fill=ink, width=3)
+            for i in range(0, int(room['height']), dash_length*2):
+                draw.line([x1, y1 + i, x1, y1 + i + dash_length], fill=ink, width=3)
+                draw.line([x2, y1 + i, x2, y1 + i + dash_length], fill=ink, width=3)
         else:
-            # Calculate house dimensions based on number of rooms
-            total_rooms = bedrooms + bathrooms + (1 if has_kitchen else 0) + (1 if has_living_room else 0) + \
-                         (1 if has_dining_room else 0) + (1 if has_garage else 0)
-            house_width = 60 + (total_rooms * 10)  # in feet
-            house_height = 40 + (total_rooms * 8)  # in feet
-
-        # Draw a subtitle with the description
-        subtitle = description[:100] + "..." if len(description) > 100 else description
-        draw.text((img_width//2, 130), subtitle, fill='blue', font=detail_font, anchor="mm")
-
-        # Scale factor (pixels per foot)
-        scale = 20
-
-        # Calculate pixel dimensions
-        pixel_width = house_width * scale
-        pixel_height = house_height * scale
-
-        # Position the house in the center of the image
-        house_x = (img_width - pixel_width) // 2
-        house_y = (img_height - pixel_height) // 2
-
-        # Draw the outer walls of the house
-        draw.rectangle([house_x, house_y, house_x + pixel_width, house_y + pixel_height], outline='blue', width=5)
-
-        # Add dimensions to the floor plan
-        draw.text((house_x + pixel_width//2, house_y + pixel_height + 40), f"{house_width} ft", fill='blue', font=dimension_font, anchor="mm")
-        draw.text((house_x - 40, house_y + pixel_height//2), f"{house_height} ft", fill='blue', font=dimension_font, anchor="mm")
-
-        # Draw dimension lines
-        # Horizontal
-        draw.line([house_x, house_y + pixel_height + 20, house_x + pixel_width, house_y + pixel_height + 20], fill='blue', width=2)
-        draw.line([house_x, house_y + pixel_height + 10, house_x, house_y + pixel_height + 30], fill='blue', width=2)
-        draw.line([house_x + pixel_width, house_y + pixel_height + 10, house_x + pixel_width, house_y + pixel_height + 30], fill='blue', width=2)
-
-        # Vertical
-        draw.line([house_x - 20, house_y, house_x - 20, house_y + pixel_height], fill='blue', width=2)
-        draw.line([house_x - 10, house_y, house_x - 30, house_y], fill='blue', width=2)
-        draw.line([house_x - 10, house_y + pixel_height, house_x - 30, house_y + pixel_height], fill='blue', width=2)
-
-        # Create a list to store rooms
-        rooms = []
-
-        # Check if we have valid Gemini specs with coordinates
-        if floor_plan_specs and 'rooms' in floor_plan_specs and floor_plan_specs['rooms']:
-            has_coordinates = all('coordinates' in room for room in floor_plan_specs['rooms'])
-            if has_coordinates:
-                print(f"Drawing {len(floor_plan_specs['rooms'])} rooms using Gemini coordinates")
-
-                # Process all rooms from Gemini
-                for gemini_room in floor_plan_specs['rooms']:
-                    room_name = gemini_room.get('name', '').upper()
-                    room_type = gemini_room.get('type', '').lower()
-
-                    # Get coordinates
-                    coords = gemini_room.get('coordinates', {})
-                    if not coords:
-                        continue
-
-                    # Convert feet to pixels and adjust to house position
-                    room_x = house_x + (coords.get('x', 0) * scale)
-                    room_y = house_y + (coords.get('y', 0) * scale)
-                    room_width = coords.get('width', 10) * scale
-                    room_height = coords.get('height', 10) * scale
-
-                    # Add the room
-                    rooms.append({
-                        'name': room_name,
-                        'type': room_type,
-                        'x': room_x,
-                        'y': room_y,
-                        'width': room_width,
-                        'height': room_height,
-                        'features': gemini_room.get('features', [])
-                    })
-
-                    print(f"Added room: {room_name} at ({coords.get('x', 0)}ft, {coords.get('y', 0)}ft) with dimensions {coords.get('width', 10)}ft x {coords.get('height', 10)}ft")
-            else:
-                # Fallback to traditional layout if no coordinates
-                print("No coordinates found in Gemini specs, using traditional layout")
-                # This will be implemented in the fallback section
-
-        # Draw all rooms
-        for room in rooms:
-            # Draw room rectangle
-            draw.rectangle([room['x'], room['y'], room['x'] + room['width'], room['y'] + room['height']], outline='blue', width=3)
-
-            # Add room name
-            draw.text((room['x'] + room['width']//2, room['y'] + room['height']//2), room['name'], fill='blue', font=room_font, anchor="mm")
-
-            # Add room dimensions
-            room_width_ft = int(room['width'] / scale)
-            room_height_ft = int(room['height'] / scale)
-            dimension_text = f"{room_width_ft}' x {room_height_ft}'"
-            draw.text((room['x'] + room['width']//2, room['y'] + room['height'] - 20), dimension_text, fill='blue', font=detail_font, anchor="mm")
-
-            # Add special features if provided
-            if 'features' in room and room['features']:
-                features = room['features']
-                feature_y = room['y'] + 30
-
-                # Draw up to 2 features to avoid cluttering
-                for i, feature in enumerate(features[:2]):
-                    if isinstance(feature, str):
-                        feature_text = feature.upper()
-                        draw.text(
-                            (room['x'] + room['width']//2, feature_y + i*20),
-                            feature_text,
-                            fill='blue',
-                            font=detail_font,
-                            anchor="mm"
-                        )
-
-                        # Draw feature icons based on type
-                        if 'window' in feature.lower():
-                            # Draw a window symbol
-                            window_x = room['x'] + room['width']//4
-                            window_y = room['y'] + 30
-                            window_width = 30
-                            draw.rectangle([window_x, window_y, window_x + window_width, window_y + 10], outline='blue', width=2)
-                        elif 'door' in feature.lower():
-                            # Draw a door symbol
-                            door_x = room['x'] + room['width'] - 40
-                            door_y = room['y'] + 30
-                            door_width = 30
-                            draw.arc([door_x, door_y, door_x + door_width, door_y + 30], 270, 0, fill='blue', width=2)
-
-        # Draw dimension lines
-        # Horizontal
-        draw.line([house_x, house_y + pixel_height + 20, house_x + pixel_width, house_y + pixel_height + 20], fill='blue', width=2)
-        draw.line([house_x, house_y + pixel_height + 10, house_x, house_y + pixel_height + 30], fill='blue', width=2)
-        draw.line([house_x + pixel_width, house_y + pixel_height + 10, house_x + pixel_width, house_y + pixel_height + 30], fill='blue', width=2)
-
-        # Vertical
-        draw.line([house_x - 20, house_y, house_x - 20, house_y + pixel_height], fill='blue', width=2)
-        draw.line([house_x - 10, house_y, house_x - 30, house_y], fill='blue', width=2)
-        draw.line([house_x - 10, house_y + pixel_height, house_x - 30, house_y + pixel_height], fill='blue', width=2)
-
-        # Determine layout based on Gemini specs or fallback to basic logic
-        house_shape = "rectangular"
-        if floor_plan_specs and 'house_shape' in floor_plan_specs:
-            house_shape = floor_plan_specs['house_shape'].lower()
-            print(f"Using Gemini-provided house shape: {house_shape}")
-
-        # Determine layout based on open floor plan or not
-        if has_open_floor_plan:
-            # Create an open floor plan layout
-            rooms = []
-
-            # Create the open area first (living, dining, kitchen combined)
-            open_area_width = pixel_width * 0.6
-            open_area_height = pixel_height * 0.5
-            open_area_x = house_x
-            open_area_y = house_y
-
-            # Add the open area
-            rooms.append({
-                'name': 'OPEN FLOOR PLAN',
-                'x': open_area_x,
-                'y': open_area_y,
-                'width': open_area_width,
-                'height': open_area_height,
-                'is_open': True
-            })
+            draw.rectangle([room['x'], room['y'], room['x'] + room['width'],
+                          room['y'] + room['height']], outline=ink, width=3)
+
+        draw.text((room['x'] + room['width']//2, room['y'] + room['height']//2),
+                 room['name'], fill=ink, font=room_font, anchor="mm")
+
+        width_ft = int(room['width'] / scale)
+        height_ft = int(room['height'] / scale)
+        draw.text((room['x'] + room['width']//2, room['y'] + room['height'] - 20),
+                 f"{width_ft}' x {height_ft}'", fill=ink, font=detail_font, anchor="mm")
+
+        for i, feature in enumerate(room.get('features', [])[:2]):
+            if isinstance(feature, str):
+                draw.text((room['x'] + room['width']//2, room['y'] + 30 + i*20),
+                        feature.upper(), fill=ink, font=detail_font, anchor="mm")
+                if 'window' in feature.lower():
+                    draw.rectangle([room['x'] + room['width']//4, room['y'] + 10,
+                                  room['x'] + 3*room['width']//4, room['y'] + 20],
+                                 outline=ink, width=2)
+                elif 'door' in feature.lower():
+                    draw.arc([room['x'] + room['width'] - 40, room['y'] + 20,
+                            room['x'] + room['width'] - 10, room['y'] + 50],
+                           270, 0, fill=ink, width=2)
+
+    # Add entrance
+    entrance_width = 40
+    entrance_x = house_x + pixel_width//2 - entrance_width/2
+    draw.line([entrance_x, house_y, entrance_x + entrance_width, house_y],
+             fill=ink, width=5)
+    draw.arc([entrance_x, house_y - 40, entrance_x + entrance_width, house_y],
+            180, 0, fill=ink, width=3)
+
+    # Add compass
+    compass_x = house_x + pixel_width - 100
+    compass_y = house_y + 100
+    draw.ellipse([compass_x - 50, compass_y - 50, compass_x + 50, compass_y + 50],
+                outline=ink, width=2)
+    draw.line([compass_x, compass_y - 50, compass_x, compass_y + 50], fill=ink, width=2)
+    draw.line([compass_x - 50, compass_y, compass_x + 50, compass_y], fill=ink, width=2)
+    draw.text((compass_x, compass_y - 60), "N", fill=ink, font=detail_font, anchor="ms")
+
+    # Scale bar
+    scale_x = house_x
+    scale_y = house_y + pixel_height + 80
+    scale_length = 100
+    draw.line([scale_x, scale_y, scale_x + scale_length, scale_y], fill=ink, width=2)
+    draw.text((scale_x + scale_length/2, scale_y + 15), "5 ft", fill=ink,
+             font=detail_font, anchor="mm")
+
+    # Title block
+    title_block_x = house_x + pixel_width - 400
+    title_block_y = house_y + pixel_height + 60
+    draw.rectangle([title_block_x, title_block_y, title_block_x + 400, title_block_y + 100],
+                  outline=ink, width=2)
+    draw.text((title_block_x + 10, title_block_y + 20), "FLOOR PLAN", fill=ink,
+             font=detail_font, anchor="lt")
+    draw.text((title_block_x + 10, title_block_y + 50), f"TOTAL AREA: {layout['total_area']} sq ft",
+             fill=ink, font=detail_font, anchor="lt")
+    draw.text((title_block_x + 10, title_block_y + 80), f"ROOMS: {layout['total_rooms']}",
+             fill=ink, font=detail_font, anchor="lt")
+
+    if raster_mode == 'palette':
+        # Quantize the grayscale coverage to 16 levels, index 0 being white paper
+        img = img.point(PALETTE_LEVELS)
+        img.putpalette(BLUEPRINT_PALETTE)
+
+    return img
+
+def encode_raster(img, image_format='png', compress_level=None):
+    """Encode a drawn floor plan as PNG (at the given zlib level) or lossless WebP"""
+    if compress_level is None:
+        compress_level = PNG_COMPRESS_LEVEL
+
+    buffer = io.BytesIO()
+    if image_format == 'webp':
+        img.convert('RGB').save(buffer, format="WEBP", lossless=True)
+    else:
+        img.save(buffer, format="PNG", compress_level=compress_level)
+    return buffer.getvalue()
+
+def render_floor_plan(layout, image_format='png', raster_mode=None, compress_level=None):
+    """Draw a computed layout as a blueprint and return the encoded image bytes"""
+    if raster_mode is None:
+        raster_mode = RASTER_MODE
+    with span('draw', rasterMode=raster_mode, rooms=len(layout['rooms'])):
+        img = draw_floor_plan(layout, raster_mode)
+    with span('encode', format=image_format) as encode_span:
+        image_bytes = encode_raster(img, image_format, compress_level)
+        encode_span['bytes'] = len(image_bytes)
+    return image_bytes
+
+def render_image(layout, image_format='png'):
+    """Render a layout with the raster or vector backend"""
+    if image_format == 'svg':
+        with span('draw', format='svg', rooms=len(layout['rooms'])) as draw_span:
+            image_bytes = render_floor_plan_svg(layout)
+            draw_span['bytes'] = len(image_bytes)
+        return image_bytes
+    if image_format not in ('png', 'webp'):
+        raise ValueError(f"Unsupported image format: {image_format}")
+    return render_floor_plan(layout, image_format)
+
+def layout_and_render(description, floor_plan_specs, image_format='png'):
+    """Lay out and render a floor plan and return (layout, encoded image bytes).
+
+    floor_plan_specs are the specs from get_floor_plan_details_from_gemini;
+    None (no usable answer) gives the fallback layout. Nothing here calls a
+    provider, so it is safe to run on a CPU worker.
+    """
+    print("Generating floor plan image with enhanced blueprint generator...")
 
-            # Add kitchen area within the open floor plan
-            if has_kitchen:
-                kitchen_width = open_area_width * 0.4
-                kitchen_height = open_area_height * 0.5
-                kitchen_x = open_area_x + open_area_width - kitchen_width
-                kitchen_y = open_area_y
-
-                # Add kitchen label and island
-                draw.text((kitchen_x + kitchen_width//2, kitchen_y + kitchen_height//2), "KITCHEN", fill='blue', font=room_font, anchor="mm")
-
-                # Draw kitchen island
-                island_width = kitchen_width * 0.6
-                island_height = kitchen_height * 0.3
-                island_x = kitchen_x + (kitchen_width - island_width) // 2
-                island_y = kitchen_y + (kitchen_height - island_height) // 2
-                draw.rectangle([island_x, island_y, island_x + island_width, island_y + island_height], outline='blue', width=3)
-                draw.text((island_x + island_width//2, island_y + island_height//2), "ISLAND", fill='blue', font=detail_font, anchor="mm")
-
-            # Add living room area within the open floor plan
-            if has_living_room:
-                living_width = open_area_width * 0.6
-                living_height = open_area_height * 0.5
-                living_x = open_area_x
-                living_y = open_area_y + open_area_height - living_height
-
-                # Add living room label
-                draw.text((living_x + living_width//2, living_y + living_height//2), "LIVING ROOM", fill='blue', font=room_font, anchor="mm")
-
-            # Add dining area within the open floor plan
-            if has_dining_room:
-                dining_width = open_area_width * 0.4
-                dining_height = open_area_height * 0.5
-                dining_x = open_area_x + open_area_width - dining_width
-                dining_y = open_area_y + open_area_height - dining_height
-
-                # Add dining room label
-                draw.text((dining_x + dining_width//2, dining_y + dining_height//2), "DINING", fill='blue', font=room_font, anchor="mm")
-
-            # Calculate remaining space for bedrooms and bathrooms
-            remaining_width = pixel_width
-            remaining_height = pixel_height - open_area_height
-            remaining_x = house_x
-            remaining_y = house_y + open_area_height
-
-            # Add bedrooms
-            bedroom_width = remaining_width / (bedrooms + (1 if has_garage else 0))
-            bedroom_height = remaining_height
-
-            for i in range(bedrooms):
-                bedroom_x = remaining_x + (i * bedroom_width)
-                bedroom_y = remaining_y
-
-                rooms.append({
-                    'name': f"BEDROOM {i+1}",
-                    'x': bedroom_x,
-                    'y': bedroom_y,
-                    'width': bedroom_width,
-                    'height': bedroom_height
-                })
-
-            # Add garage if needed
-            if has_garage:
-                garage_x = remaining_x + (bedrooms * bedroom_width)
-                garage_y = remaining_y
-
-                rooms.append({
-                    'name': "GARAGE",
-                    'x': garage_x,
-                    'y': garage_y,
-                    'width': bedroom_width,
-                    'height': bedroom_height
-                })
-
-            # Add bathrooms (inside bedrooms)
-            bathroom_width = bedroom_width * 0.4
-            bathroom_height = bedroom_height * 0.3
-
-            for i in range(min(bathrooms, bedrooms)):
-                bedroom_x = remaining_x + (i * bedroom_width)
-                bedroom_y = remaining_y
-
-                bathroom_x = bedroom_x + bedroom_width - bathroom_width
-                bathroom_y = bedroom_y
-
-                rooms.append({
-                    'name': f"BATH {i+1}",
-                    'x': bathroom_x,
-                    'y': bathroom_y,
-                    'width': bathroom_width,
-                    'height': bathroom_height
-                })
-        else:
-            # Create a traditional layout with separate rooms
-            rooms = []
-
-            # Calculate grid dimensions based on number of rooms
-            grid_size = math.ceil(math.sqrt(total_rooms))
-            cell_width = pixel_width / grid_size
-            cell_height = pixel_height / grid_size
-
-            # Add rooms in a grid pattern
-            room_index = 0
-
-            # Add bedrooms
-            for i in range(bedrooms):
-                row = room_index // grid_size
-                col = room_index % grid_size
-
-                room_x = house_x + (col * cell_width)
-                room_y = house_y + (row * cell_height)
-
-                rooms.append({
-                    'name': f"BEDROOM {i+1}",
-                    'x': room_x,
-                    'y': room_y,
-                    'width': cell_width,
-                    'height': cell_height
-                })
-
-                room_index += 1
-
-            # Add bathrooms
-            for i in range(bathrooms):
-                row = room_index // grid_size
-                col = room_index % grid_size
-
-                room_x = house_x + (col * cell_width)
-                room_y = house_y + (row * cell_height)
-
-                rooms.append({
-                    'name': f"BATHROOM {i+1}",
-                    'x': room_x,
-                    'y': room_y,
-                    'width': cell_width,
-                    'height': cell_height
-                })
-
-                room_index += 1
-
-            # Add kitchen
-            if has_kitchen:
-                row = room_index // grid_size
-                col = room_index % grid_size
-
-                room_x = house_x + (col * cell_width)
-                room_y = house_y + (row * cell_height)
-
-                rooms.append({
-                    'name': "KITCHEN",
-                    'x': room_x,
-                    'y': room_y,
-                    'width': cell_width,
-                    'height': cell_height
-                })
-
-                room_index += 1
-
-            # Add living room
-            if has_living_room:
-                row = room_index // grid_size
-                col = room_index % grid_size
-
-                room_x = house_x + (col * cell_width)
-                room_y = house_y + (row * cell_height)
-
-                rooms.append({
-                    'name': "LIVING ROOM",
-                    'x': room_x,
-                    'y': room_y,
-                    'width': cell_width,
-                    'height': cell_height
-                })
-
-                room_index += 1
-
-            # Add dining room
-            if has_dining_room:
-                row = room_index // grid_size
-                col = room_index % grid_size
-
-                room_x = house_x + (col * cell_width)
-                room_y = house_y + (row * cell_height)
-
-                rooms.append({
-                    'name': "DINING ROOM",
-                    'x': room_x,
-                    'y': room_y,
-                    'width': cell_width,
-                    'height': cell_height
-                })
-
-                room_index += 1
-
-            # Add garage
-            if has_garage:
-                row = room_index // grid_size
-                col = room_index % grid_size
-
-                room_x = house_x + (col * cell_width)
-                room_y = house_y + (row * cell_height)
-
-                rooms.append({
-                    'name': "GARAGE",
-                    'x': room_x,
-                    'y': room_y,
-                    'width': cell_width,
-                    'height': cell_height
-                })
-
-                room_index += 1
-
-        # Add rooms from Gemini specifications if available
-        if floor_plan_specs and 'rooms' in floor_plan_specs and floor_plan_specs['rooms']:
-            # If we have Gemini room specs, use the grid-based layout for more accurate placement
-            gemini_rooms = floor_plan_specs['rooms']
-            print(f"Adding {len(gemini_rooms)} rooms from Gemini specifications")
-
-            # Get grid size from Gemini or use default
-            grid_rows = 3
-            grid_cols = 3
-            if 'grid_size' in floor_plan_specs:
-                grid_rows = floor_plan_specs['grid_size'].get('rows', 3)
-                grid_cols = floor_plan_specs['grid_size'].get('cols', 3)
-                print(f"Using grid size: {grid_rows}x{grid_cols}")
-
-            # Calculate cell dimensions
-            cell_width = pixel_width / grid_cols
-            cell_height = pixel_height / grid_rows
-
-            # Clear any existing rooms if we're using Gemini's grid layout
-            rooms = []
-
-            # Process all rooms from Gemini
-            for gemini_room in gemini_rooms:
-                room_name = gemini_room.get('name', '').upper()
-                room_type = gemini_room.get('type', '').lower()
-
-                # Try to parse dimensions
-                dimensions = gemini_room.get('dimensions', '')
-                room_width_ft = 0
-                room_height_ft = 0
-
-                try:
-                    # Try to extract width x height
-                    import re
-                    dim_match = re.search(r'(\d+)\s*x\s*(\d+)', dimensions)
-                    if dim_match:
-                        room_width_ft = int(dim_match.group(1))
-                        room_height_ft = int(dim_match.group(2))
-                    else:
-                        # Just get any numbers
-                        numbers = re.findall(r'\d+', dimensions)
-                        if len(numbers) >= 2:
-                            room_width_ft = int(numbers[0])
-                            room_height_ft = int(numbers[1])
-                        elif len(numbers) == 1:
-                            # Square room
-                            room_width_ft = int(numbers[0])
-                            room_height_ft = int(numbers[0])
-                except Exception as e:
-                    print(f"Error parsing room dimensions for {room_name}: {e}")
-
-                # Use reasonable defaults if parsing failed
-                if room_width_ft < 5 or room_height_ft < 5:
-                    if 'bedroom' in room_type:
-                        room_width_ft = 12
-                        room_height_ft = 12
-                    elif 'bathroom' in room_type:
-                        room_width_ft = 8
-                        room_height_ft = 10
-                    elif 'kitchen' in room_type:
-                        room_width_ft = 15
-                        room_height_ft = 12
-                    elif 'living' in room_type:
-                        room_width_ft = 18
-                        room_height_ft = 15
-                    elif 'dining' in room_type:
-                        room_width_ft = 14
-                        room_height_ft = 12
-                    elif 'garage' in room_type:
-                        room_width_ft = 20
-                        room_height_ft = 20
-                    elif 'pooja' in room_type:  # For Indian homes
-                        room_width_ft = 8
-                        room_height_ft = 8
-                    elif 'utility' in room_type:  # For Indian homes
-                        room_width_ft = 8
-                        room_height_ft = 10
-                    elif 'verandah' in room_type or 'balcony' in room_type:  # For Indian homes
-                        room_width_ft = 10
-                        room_height_ft = 6
-                    else:
-                        room_width_ft = 10
-                        room_height_ft = 10
-
-                # Get grid position from Gemini or use default placement
-                grid_position = gemini_room.get('grid_position', {})
-                row = grid_position.get('row', 0)
-                col = grid_position.get('col', 0)
-                rowspan = grid_position.get('rowspan', 1)
-                colspan = grid_position.get('colspan', 1)
-
-                # Ensure grid position is within bounds
-                row = min(max(0, row), grid_rows - 1)
-                col = min(max(0, col), grid_cols - 1)
-                rowspan = min(max(1, rowspan), grid_rows - row)
-                colspan = min(max(1, colspan), grid_cols - col)
-
-                # Calculate room position and size based on grid
-                room_x = house_x + (col * cell_width)
-                room_y = house_y + (row * cell_height)
-                room_width_px = cell_width * colspan
-                room_height_px = cell_height * rowspan
-
-                # Add some margin between rooms for clarity
-                margin = 5
-                room_x += margin
-                room_y += margin
-                room_width_px -= margin * 2
-                room_height_px -= margin * 2
-
-                # Add the room with grid-based positioning
-                rooms.append({
-                    'name': room_name,
-                    'x': room_x,
-                    'y': room_y,
-                    'width': room_width_px,
-                    'height': room_height_px,
-                    'features': gemini_room.get('features', []),
-                    'type': room_type,
-                    'grid': {'row': row, 'col': col, 'rowspan': rowspan, 'colspan': colspan}
-                })
-
-                print(f"Added room: {room_name} at grid position ({row},{col}) spanning {rowspan}x{colspan} cells")
-
-        # Use the prevent_room_overlaps function to ensure no overlaps
-        rooms = prevent_room_overlaps(rooms, house_x, house_y, pixel_width, pixel_height)
-        print("SUCCESS: Fixed position layout applied with 100% guaranteed NO overlaps")
-
-        # Draw all rooms
-        for room in rooms:
-            if room.get('is_open', False):
-                # For open floor plan, draw a dashed line
-                dash_length = 10
-                x1, y1 = room['x'], room['y']
-                x2, y2 = room['x'] + room['width'], room['y'] + room['height']
-
-                # Draw dashed lines for open floor plan
-                for i in range(0, int(room['width']), dash_length*2):
-                    draw.line([x1 + i, y1, x1 + i + dash_length, y1], fill='blue', width=3)
-
-                for i in range(0, int(room['height']), dash_length*2):
-                    draw.line([x1, y1 + i, x1, y1 + i + dash_length], fill='blue', width=3)
-
-                for i in range(0, int(room['width']), dash_length*2):
-                    draw.line([x1 + i, y2, x1 + i + dash_length, y2], fill='blue', width=3)
-
-                for i in range(0, int(room['height']), dash_length*2):
-                    draw.line([x2, y1 + i, x2, y1 + i + dash_length], fill='blue', width=3)
-
-                # Add room label
-                draw.text((room['x'] + room['width']//2, room['y'] + 30), room['name'], fill='blue', font=room_font, anchor="mm")
-            else:
-                # Draw solid walls for regular rooms
-                draw.rectangle([room['x'], room['y'], room['x'] + room['width'], room['y'] + room['height']], outline='blue', width=3)
-
-                # Add room label
-                draw.text((room['x'] + room['width']//2, room['y'] + room['height']//2), room['name'], fill='blue', font=room_font, anchor="mm")
-
-                # Add room dimensions
-                room_width_ft = int(room['width'] / scale)
-                room_height_ft = int(room['height'] / scale)
-                dimension_text = f"{room_width_ft}' x {room_height_ft}'"
-                draw.text((room['x'] + room['width']//2, room['y'] + room['height'] - 20), dimension_text, fill='blue', font=detail_font, anchor="mm")
-
-                # Add special features if provided by Gemini
-                if 'features' in room and room['features']:
-                    features = room['features']
-                    feature_y = room['y'] + room['height'] - 50
-
-                    # Draw up to 2 features to avoid cluttering
-                    for i, feature in enumerate(features[:2]):
-                        if isinstance(feature, str):
-                            feature_text = feature.upper()
-                            draw.text(
-                                (room['x'] + room['width']//2, feature_y - i*20),
-                                feature_text,
-                                fill='blue',
-                                font=detail_font,
-                                anchor="mm"
-                            )
-
-                            # Draw feature icons based on type
-                            if 'window' in feature.lower():
-                                # Draw a window symbol
-                                window_x = room['x'] + room['width']//4
-                                window_y = room['y'] + 30
-                                window_width = 30
-                                draw.rectangle([window_x, window_y, window_x + window_width, window_y + 10], outline='blue', width=2)
-                            elif 'closet' in feature.lower():
-                                # Draw a closet symbol
-                                closet_x = room['x'] + room['width'] - 40
-                                closet_y = room['y'] + 30
-                                closet_width = 30
-                                closet_height = 20
-                                draw.rectangle([closet_x, closet_y, closet_x + closet_width, closet_y + closet_height], outline='blue', width=2)
-                                draw.line([closet_x, closet_y, closet_x + closet_width, closet_y + closet_height], fill='blue', width=1)
-                                draw.line([closet_x + closet_width, closet_y, closet_x, closet_y + closet_height], fill='blue', width=1)
-
-                # Add doors (50% chance on each wall)
-                door_width = 30
-                door_positions = []
-
-                # Top wall
-                if random.random() > 0.5:
-                    door_x = room['x'] + random.uniform(0.3, 0.7) * room['width']
-                    door_positions.append((door_x, room['y'], door_x + door_width, room['y']))
-
-                # Right wall
-                if random.random() > 0.5:
-                    door_y = room['y'] + random.uniform(0.3, 0.7) * room['height']
-                    door_positions.append((room['x'] + room['width'], door_y, room['x'] + room['width'], door_y + door_width))
-
-                # Bottom wall
-                if random.random() > 0.5:
-                    door_x = room['x'] + random.uniform(0.3, 0.7) * room['width']
-                    door_positions.append((door_x, room['y'] + room['height'], door_x + door_width, room['y'] + room['height']))
-
-                # Left wall
-                if random.random() > 0.5:
-                    door_y = room['y'] + random.uniform(0.3, 0.7) * room['height']
-                    door_positions.append((room['x'], door_y, room['x'], door_y + door_width))
-
-                # If no doors were added, add at least one
-                if not door_positions:
-                    door_x = room['x'] + random.uniform(0.3, 0.7) * room['width']
-                    door_positions.append((door_x, room['y'], door_x + door_width, room['y']))
-
-                # Draw doors
-                for door in door_positions:
-                    x1, y1, x2, y2 = door
-                    if x1 == x2:  # Vertical door
-                        # Draw door arc
-                        if x1 == room['x']:  # Left wall
-                            draw.arc([x1 - 30, y1, x1, y2], 270, 0, fill='blue', width=2)
-                        else:  # Right wall
-                            draw.arc([x2, y1, x2 + 30, y2], 90, 180, fill='blue', width=2)
-                    else:  # Horizontal door
-                        if y1 == room['y']:  # Top wall
-                            draw.arc([x1, y1 - 30, x2, y1], 0, 90, fill='blue', width=2)
-                        else:  # Bottom wall
-                            draw.arc([x1, y2, x2, y2 + 30], 270, 360, fill='blue', width=2)
-
-        # Add a main entrance
-        entrance_width = 40
-        entrance_x = house_x + random.uniform(0.3, 0.7) * pixel_width - entrance_width/2
-
-        # Draw the entrance door
-        draw.line([entrance_x, house_y, entrance_x + entrance_width, house_y], fill='blue', width=5)
-        draw.arc([entrance_x, house_y - 40, entrance_x + entrance_width, house_y], 180, 0, fill='blue', width=3)
-
-        # Add a compass rose
-        compass_x = house_x + pixel_width - 100
-        compass_y = house_y + 100
-        compass_radius = 50
-
-        # Draw compass circle
-        draw.ellipse([compass_x - compass_radius, compass_y - compass_radius,
-                     compass_x + compass_radius, compass_y + compass_radius], outline='blue', width=2)
-
-        # Draw compass directions
-        draw.line([compass_x, compass_y - compass_radius, compass_x, compass_y + compass_radius], fill='blue', width=2)
-        draw.line([compass_x - compass_radius, compass_y, compass_x + compass_radius, compass_y], fill='blue', width=2)
-
-        # Add direction labels
-        draw.text((compass_x, compass_y - compass_radius - 10), "N", fill='blue', font=detail_font, anchor="ms")
-        draw.text((compass_x, compass_y + compass_radius + 10), "S", fill='blue', font=detail_font, anchor="ms")
-        draw.text((compass_x - compass_radius - 10, compass_y), "W", fill='blue', font=detail_font, anchor="rm")
-        draw.text((compass_x + compass_radius + 10, compass_y), "E", fill='blue', font=detail_font, anchor="lm")
-
-        # Calculate total rooms count for reference
-        total_rooms = len(rooms) if rooms else (bedrooms + bathrooms + (1 if has_kitchen else 0) +
-                                              (1 if has_living_room else 0) + (1 if has_dining_room else 0) +
-                                              (1 if has_garage else 0))
-
-        # Add a scale bar
-        scale_x = house_x
-        scale_y = house_y + pixel_height + 80
-        scale_length = 100  # 5 feet at 20 pixels per foot
-
-        draw.line([scale_x, scale_y, scale_x + scale_length, scale_y], fill='blue', width=2)
-        draw.line([scale_x, scale_y - 5, scale_x, scale_y + 5], fill='blue', width=2)
-        draw.line([scale_x + scale_length, scale_y - 5, scale_x + scale_length, scale_y + 5], fill='blue', width=2)
-        draw.text((scale_x + scale_length/2, scale_y + 15), "5 ft", fill='blue', font=detail_font, anchor="mm")
-
-
-
-        # Add a title block at the bottom
-        title_block_x = house_x + pixel_width - 400
-        title_block_y = house_y + pixel_height + 60
-        title_block_width = 400
-        title_block_height = 100
-
-        draw.rectangle([title_block_x, title_block_y, title_block_x + title_block_width, title_block_y + title_block_height], outline='blue', width=2)
-
-        # Add title block content with Gemini-enhanced information
-        draw.text((title_block_x + 10, title_block_y + 20), "FLOOR PLAN", fill='blue', font=detail_font, anchor="lt")
-
-        # Use Gemini's total area if available
-        total_area = house_width * house_height
-        if floor_plan_specs and 'total_area' in floor_plan_specs:
-            try:
-                area_str = floor_plan_specs['total_area']
-                area_numbers = re.findall(r'\d+', area_str)
-                if area_numbers:
-                    total_area = int(area_numbers[0])
-            except:
-                pass  # Use calculated area if parsing fails
-
-        draw.text((title_block_x + 10, title_block_y + 50), f"TOTAL AREA: {total_area} sq ft", fill='blue', font=detail_font, anchor="lt")
-        draw.text((title_block_x + 10, title_block_y + 80), "SCALE: 1/4\" = 1'", fill='blue', font=detail_font, anchor="lt")
-
-        # Add special features from Gemini if available
-        if floor_plan_specs and 'special_features' in floor_plan_specs and floor_plan_specs['special_features']:
-            special_features = floor_plan_specs['special_features']
-            if special_features and len(special_features) > 0:
-                # Draw a special features box
-                features_x = house_x
-                features_y = house_y + pixel_height + 150
-                features_width = 300
-                features_height = 80
-
-                draw.rectangle([features_x, features_y, features_x + features_width, features_y + features_height], outline='blue', width=2)
-                draw.text((features_x + 10, features_y + 20), "SPECIAL FEATURES:", fill='blue', font=detail_font, anchor="lt")
-
-                # List up to 2 special features
-                for i, feature in enumerate(special_features[:2]):
-                    if isinstance(feature, str):
-                        draw.text(
-                            (features_x + 20, features_y + 45 + i*20),
-                            f"• {feature}",
-                            fill='blue',
-                            font=detail_font,
-                            anchor="lt"
-                        )
-
-        # Save the image to a buffer
-        buffer = io.BytesIO()
-        img.save(buffer, format="PNG")
-        buffer.seek(0)
-
-        # Convert to base64
-        image_data = base64.b64encode(buffer.getvalue()).decode('utf-8')
-        print("Successfully generated floor plan image")
-        return image_data
+    try:
+        with span('layout') as layout_span:
+            layout = layout_floor_plan(description, floor_plan_specs)
+            layout_span['rooms'] = len(layout['rooms'])
+        return layout, render_image(layout, image_format)
 
     except Exception as e:
-        print(f"Exception in generate_floor_plan_image: {e}")
+        print(f"Exception in layout_and_render: {e}")
         raise Exception(f"Failed to generate floor plan image: {e}")
 
-import os
-import sys
-import json
-import base64
-import io
-import math
-import random
-import re
-from PIL import Image, ImageDraw, ImageFont
-from dotenv import load_dotenv
-import google.generativeai as genai
+# Default for callers that leave the analysis to generate_floor_plan_bytes; None
+# already means Gemini gave no usable answer
+ANALYZE = object()
 
-# Load environment variables from .env.local
-load_dotenv('.env.local')
-
-# Get API key from environment variables
-GOOGLE_API_KEY = os.getenv('GOOGLE_API_KEY')
-
-# Configure Gemini API
-if GOOGLE_API_KEY:
-    genai.configure(api_key=GOOGLE_API_KEY)
-else:
-    print("Warning: GOOGLE_API_KEY not found in environment variables")
-
-def get_floor_plan_details_from_gemini(description):
-    """Use Gemini to analyze the description and extract detailed floor plan specifications"""
-    print("Analyzing description with Gemini to extract detailed floor plan specifications...")
+def generate_floor_plan_bytes(description, floor_plan_specs=ANALYZE, image_format='png'):
+    """Generate a floor plan image with proper room placement and return the encoded bytes.
 
-    try:
-        prompt = f"""
-        You are a professional architect specializing in creating accurate and detailed floor plans.
-        Analyze this house description and provide detailed specifications for creating a precise architectural floor plan:
-        "{description}"
-
-        Return a JSON object with the following structure:
-        {{
-          "rooms": [
-            {{
-              "name": "room name",
-              "type": "bedroom/bathroom/kitchen/etc",
-              "dimensions": "width x length in feet",
-              "position": "north/south/east/west/center",
-              "adjacent_to": ["other room names"],
-              "features": ["feature1", "feature2"],
-              "coordinates": {{
-                "x": 0,
-                "y": 0,
-                "width": 10,
-                "height": 10
-              }}
-            }}
-          ],
-          "layout_style": "open floor plan or traditional",
-          "total_area": "approximate square footage",
-          "special_features": ["any special features mentioned"],
-          "house_shape": "rectangular/L-shaped/etc",
-          "house_dimensions": {{
-            "width": 50,
-            "depth": 40
-          }},
-          "design_style": "indian/international"
-        }}
-
-        CRITICAL REQUIREMENTS FOR ACCURATE FLOOR PLAN GENERATION:
-        1. Use ABSOLUTE COORDINATES for each room from the top-left corner.
-        2. Ensure NO ROOM OVERLAPS - check coordinates carefully.
-        3. Ensure all rooms are CONTAINED WITHIN house dimensions.
-        4. Ensure ADJACENT ROOMS share walls where specified.
-        5. Use REALISTIC ROOM DIMENSIONS based on function.
-        6. For Indian-style: include pooja room, larger kitchen, verandah if appropriate.
-        7. For international-style: include closets, en-suite bathrooms if appropriate.
-        8. Verify total room area doesn't exceed house area.
-        9. Include DOORWAYS between adjacent rooms in features.
-        10. Include WINDOWS for exterior rooms in features.
-        11. Ensure logical room flow.
-        12. Create a balanced layout.
-        """
-
-        model = genai.GenerativeModel('gemini-2.0-flash')
-        response = model.generate_content(prompt)
-        response_text = response.text
-
-        json_match = re.search(r'\{[\s\S]*\}', response_text)
-        if json_match:
-            return json.loads(json_match.group(0))
-        return None
-    except Exception as e:
-        print(f"Error getting floor plan details from Gemini: {e}")
-        return None
+    Gemini is only called when no specs are passed at all.
+    """
+    if floor_plan_specs is ANALYZE:
+        floor_plan_specs = get_floor_plan_details_from_gemini(description)
+    return layout_and_render(description, floor_plan_specs, image_format)[1]
+
+def generate_floor_plan_image(description, floor_plan_specs=ANALYZE):
+    """Generate a floor plan image and return it as a base64 encoded PNG"""
+    return base64.b64encode(generate_floor_plan_bytes(description, floor_plan_specs)).decode('utf-8')
+
+def describe_image(image_bytes, image_format='png'):
+    """Return the format, content hash and size used to hand an image over by path"""
+    return {
+        "imageFormat": image_format,
+        "imageMimeType": IMAGE_MIME_TYPES[image_format],
+        "imageSha256": hashlib.sha256(image_bytes).hexdigest(),
+        "imageBytes": len(image_bytes)
+    }
 
-def generate_floor_plan_image(description):
-    """Generate a floor plan image with proper room placement"""
-    print("Generating floor plan image with enhanced blueprint generator...")
+def run_provider_stages(description, concurrent_providers=None):
+    """Run the analyze and recommend stages, the only ones that call providers.
+
+    With concurrent_providers (default: FLOOR_PLAN_CONCURRENT_PROVIDERS) the
+    Groq recommendation starts right away from room types found in the
+    description and runs while Gemini analyzes the layout, so the two calls
+    cost roughly the slower of the two instead of their sum.
+
+    Otherwise Groq gets Gemini's room types. With FLOOR_PLAN_GEMINI_STREAM
+    on it starts as soon as the streamed rooms are complete, overlapping
+    the rest of Gemini's answer; without streaming it waits for the spec.
+    """
+    if concurrent_providers is None:
+        concurrent_providers = CONCURRENT_PROVIDERS
+
+    if concurrent_providers:
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            # Run in a copy of this context so the Groq span joins the current trace
+            recommendations_future = executor.submit(contextvars.copy_context().run,
+                                                     get_painting_recommendations_from_groq, None, description)
+            floor_plan_specs = get_floor_plan_details_from_gemini(description)
+            painting_recommendations = recommendations_future.result()
+    else:
+        # Captured here so the Groq span joins the trace beside the gemini span, not inside it
+        context = contextvars.copy_context()
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            recommendations_futures = []
+
+            def recommend_from_rooms(rooms):
+                recommendations_futures.append(executor.submit(
+                    context.run, get_painting_recommendations_from_groq, {'rooms': rooms}, description))
+
+            floor_plan_specs = get_floor_plan_details_from_gemini(description, recommend_from_rooms)
+            if recommendations_futures:
+                painting_recommendations = recommendations_futures[0].result()
+            else:
+                painting_recommendations = get_painting_recommendations_from_groq(floor_plan_specs, description)
 
-    # Replace problematic Unicode characters with ASCII equivalents
-    description = description.replace('₹', 'Rs.')
+    return {
+        'floor_plan_specs': floor_plan_specs,
+        'painting_recommendations': painting_recommendations
+    }
 
-    try:
-        floor_plan_specs = get_floor_plan_details_from_gemini(description)
-        description = description.lower()
-
-        # Initialize room counts with fallbacks
-        bedrooms = max(1, sum(1 for room in (floor_plan_specs.get('rooms', []) if floor_plan_specs else [])
-                            if 'bedroom' in room.get('type', '').lower()))
-        bathrooms = max(1, sum(1 for room in (floor_plan_specs.get('rooms', []) if floor_plan_specs else [])
-                             if 'bathroom' in room.get('type', '').lower()))
-
-        has_kitchen = "kitchen" in description or any('kitchen' in room.get('type', '').lower()
-                                                    for room in (floor_plan_specs.get('rooms', []) if floor_plan_specs else []))
-        has_living_room = "living room" in description or any('living' in room.get('type', '').lower()
-                                                            for room in (floor_plan_specs.get('rooms', []) if floor_plan_specs else []))
-        has_dining_room = "dining room" in description or any('dining' in room.get('type', '').lower()
-                                                            for room in (floor_plan_specs.get('rooms', []) if floor_plan_specs else []))
-        has_garage = "garage" in description or any('garage' in room.get('type', '').lower()
-                                                  for room in (floor_plan_specs.get('rooms', []) if floor_plan_specs else []))
-        has_open_floor_plan = "open floor" in description or "open plan" in description or "open concept" in description
-
-        # Image setup
-        img_width = 2048
-        img_height = 2048
-        img = Image.new('RGB', (img_width, img_height), color='white')
-        draw = ImageDraw.Draw(img)
+def run_pipeline(description, concurrent_providers=None, image_format=None):
+    """Run the analyze, recommend, layout and render stages and return every stage's output.
 
-        # Font setup
-        try:
-            title_font = ImageFont.truetype('arial.ttf', 48)
-            room_font = ImageFont.truetype('arial.ttf', 36)
-            dimension_font = ImageFont.truetype('arial.ttf', 24)
-            detail_font = ImageFont.truetype('arial.ttf', 20)
-        except:
-            title_font = ImageFont.load_default()
-            room_font = dimension_font = detail_font = title_font
-
-        # Title and subtitle
-        draw.text((img_width//2, 80), "FLOOR PLAN", fill='blue', font=title_font, anchor="mm")
-        subtitle = description[:100] + "..." if len(description) > 100 else description
-        draw.text((img_width//2, 130), subtitle, fill='blue', font=detail_font, anchor="mm")
-
-        # Calculate total rooms
-        total_rooms = bedrooms + bathrooms + (1 if has_kitchen else 0) + \
-                     (1 if has_living_room else 0) + (1 if has_dining_room else 0) + \
-                     (1 if has_garage else 0)
-
-        # House dimensions
-        house_width = 60
-        house_depth = 40
-        if floor_plan_specs and 'house_dimensions' in floor_plan_specs:
-            house_width = int(floor_plan_specs['house_dimensions'].get('width', 60))
-            house_depth = int(floor_plan_specs['house_dimensions'].get('depth', 40))
-
-        scale = min(img_width / (house_width * 1.5), img_height / (house_depth * 1.5))
-        pixel_width = house_width * scale
-        pixel_height = house_depth * scale
-        house_x = (img_width - pixel_width) // 2
-        house_y = (img_height - pixel_height) // 2
-
-        # Draw house outline
-        draw.rectangle([house_x, house_y, house_x + pixel_width, house_y + pixel_height],
-                      outline='blue', width=5)
-
-        # Dimension lines
-        draw.text((house_x + pixel_width//2, house_y + pixel_height + 40),
-                 f"{house_width} ft", fill='blue', font=dimension_font, anchor="mm")
-        draw.text((house_x - 40, house_y + pixel_height//2),
-                 f"{house_depth} ft", fill='blue', font=dimension_font, anchor="mm")
-
-        draw.line([house_x, house_y + pixel_height + 20, house_x + pixel_width,
-                  house_y + pixel_height + 20], fill='blue', width=2)
-        draw.line([house_x - 20, house_y, house_x - 20, house_y + pixel_height],
-                 fill='blue', width=2)
-
-        # Room placement utilities
-        rooms = []
-
-        def check_overlap(new_room, existing_rooms):
-            for room in existing_rooms:
-                if not (new_room['x'] + new_room['width'] <= room['x'] or
-                        new_room['x'] >= room['x'] + room['width'] or
-                        new_room['y'] + new_room['height'] <= room['y'] or
-                        new_room['y'] >= room['y'] + room['height']):
-                    return True
-            return False
-
-        def place_room(name, width_ft, height_ft, features=[]):
-            width = width_ft * scale
-            height = height_ft * scale
-            max_attempts = 50
-            attempt = 0
-
-            while attempt < max_attempts:
-                x = house_x + random.randint(0, int(pixel_width - width))
-                y = house_y + random.randint(0, int(pixel_height - height))
-
-                new_room = {'name': name, 'x': x, 'y': y, 'width': width,
-                          'height': height, 'features': features}
-
-                if (x + width <= house_x + pixel_width and
-                    y + height <= house_y + pixel_height and
-                    not check_overlap(new_room, rooms)):
-                    rooms.append(new_room)
-                    return True
-                attempt += 1
-            print(f"Warning: Could not place {name} without overlap")
-            return False
-
-        # Standard room sizes (in feet)
-        room_sizes = {
-            'bedroom': (12, 12),
-            'bathroom': (6, 8),
-            'kitchen': (12, 15),
-            'living room': (15, 18),
-            'dining room': (12, 14),
-            'garage': (20, 20)
-        }
+    Nothing here depends on the project, so floor_plan_server.py shares one
+    call among concurrent requests for the same description and format, then
+    saves the result for each project with persist_generation().
+    """
+    if image_format is None:
+        image_format = IMAGE_FORMAT
 
-        # Place rooms
-        if floor_plan_specs and 'rooms' in floor_plan_specs and all('coordinates' in r for r in floor_plan_specs['rooms']):
-            for room in floor_plan_specs['rooms']:
-                coords = room['coordinates']
-                rooms.append({
-                    'name': room['name'].upper(),
-                    'x': house_x + coords['x'] * scale,
-                    'y': house_y + coords['y'] * scale,
-                    'width': coords['width'] * scale,
-                    'height': coords['height'] * scale,
-                    'features': room.get('features', [])
-                })
-        else:
-            # Fallback placement
-            for i in range(bedrooms):
-                place_room(f"BEDROOM {i+1}", *room_sizes['bedroom'])
-            for i in range(bathrooms):
-                place_room(f"BATHROOM {i+1}", *room_sizes['bathroom'])
-            if has_kitchen:
-                place_room("KITCHEN", *room_sizes['kitchen'])
-            if has_living_room:
-                place_room("LIVING ROOM", *room_sizes['living room'])
-            if has_dining_room:
-                place_room("DINING ROOM", *room_sizes['dining room'])
-            if has_garage:
-                place_room("GARAGE", *room_sizes['garage'])
-
-        # Apply the prevent_room_overlaps function to ensure no overlaps
-        rooms = prevent_room_overlaps(rooms, house_x, house_y, pixel_width, pixel_height)
-
-        # Draw rooms
-        for room in rooms:
-            draw.rectangle([room['x'], room['y'], room['x'] + room['width'],
-                          room['y'] + room['height']], outline='blue', width=3)
-
-            draw.text((room['x'] + room['width']//2, room['y'] + room['height']//2),
-                     room['name'], fill='blue', font=room_font, anchor="mm")
-
-            width_ft = int(room['width'] / scale)
-            height_ft = int(room['height'] / scale)
-            draw.text((room['x'] + room['width']//2, room['y'] + room['height'] - 20),
-                     f"{width_ft}' x {height_ft}'", fill='blue', font=detail_font, anchor="mm")
-
-            for i, feature in enumerate(room.get('features', [])[:2]):
-                if isinstance(feature, str):
-                    draw.text((room['x'] + room['width']//2, room['y'] + 30 + i*20),
-                            feature.upper(), fill='blue', font=detail_font, anchor="mm")
-                    if 'window' in feature.lower():
-                        draw.rectangle([room['x'] + room['width']//4, room['y'] + 10,
-                                      room['x'] + 3*room['width']//4, room['y'] + 20],
-                                     outline='blue', width=2)
-                    elif 'door' in feature.lower():
-                        draw.arc([room['x'] + room['width'] - 40, room['y'] + 20,
-                                room['x'] + room['width'] - 10, room['y'] + 50],
-                               270, 0, fill='blue', width=2)
-
-        # Add entrance
-        entrance_width = 40
-        entrance_x = house_x + pixel_width//2 - entrance_width/2
-        draw.line([entrance_x, house_y, entrance_x + entrance_width, house_y],
-                 fill='blue', width=5)
-        draw.arc([entrance_x, house_y - 40, entrance_x + entrance_width, house_y],
-                180, 0, fill='blue', width=3)
-
-        # Add compass
-        compass_x = house_x + pixel_width - 100
-        compass_y = house_y + 100
-        draw.ellipse([compass_x - 50, compass_y - 50, compass_x + 50, compass_y + 50],
-                    outline='blue', width=2)
-        draw.line([compass_x, compass_y - 50, compass_x, compass_y + 50], fill='blue', width=2)
-        draw.line([compass_x - 50, compass_y, compass_x + 50, compass_y], fill='blue', width=2)
-        draw.text((compass_x, compass_y - 60), "N", fill='blue', font=detail_font, anchor="ms")
-
-        # Scale bar
-        scale_x = house_x
-        scale_y = house_y + pixel_height + 80
-        scale_length = 100
-        draw.line([scale_x, scale_y, scale_x + scale_length, scale_y], fill='blue', width=2)
-        draw.text((scale_x + scale_length/2, scale_y + 15), "5 ft", fill='blue',
-                 font=detail_font, anchor="mm")
-
-        # Title block
-        total_area = house_width * house_depth
-        if floor_plan_specs and 'total_area' in floor_plan_specs:
-            total_area = int(re.findall(r'\d+', floor_plan_specs['total_area'])[0] or total_area)
-
-        title_block_x = house_x + pixel_width - 400
-        title_block_y = house_y + pixel_height + 60
-        draw.rectangle([title_block_x, title_block_y, title_block_x + 400, title_block_y + 100],
-                      outline='blue', width=2)
-        draw.text((title_block_x + 10, title_block_y + 20), "FLOOR PLAN", fill='blue',
-                 font=detail_font, anchor="lt")
-        draw.text((title_block_x + 10, title_block_y + 50), f"TOTAL AREA: {total_area} sq ft",
-                 fill='blue', font=detail_font, anchor="lt")
-        draw.text((title_block_x + 10, title_block_y + 80), f"ROOMS: {total_rooms}",
-                 fill='blue', font=detail_font, anchor="lt")
-
-        # Save image
-        buffer = io.BytesIO()
-        img.save(buffer, format="PNG")
-        return base64.b64encode(buffer.getvalue()).decode('utf-8')
+    stages = run_provider_stages(description, concurrent_providers)
+    stages['image_format'] = image_format
+    stages['layout'], stages['image_bytes'] = layout_and_render(description, stages['floor_plan_specs'], image_format)
+    return stages
 
-    except Exception as e:
-        print(f"Exception in generate_floor_plan_image: {e}")
-        raise Exception(f"Failed to generate floor plan image: {e}")
-
-def save_results(project_id, description, image_data, painting_recommendations=None):
-    """Save the results to a JSON file"""
+def save_results(project_id, description, image_bytes, painting_recommendations=None,
+                 output_mode=None, image_info=None):
+    """Save the results to a JSON file and the image bytes to an image file"""
     output_dir = os.path.join("public", "floor-plans")
     os.makedirs(output_dir, exist_ok=True)
 
+    if output_mode is None:
+        output_mode = OUTPUT_MODE
+    if image_info is None:
+        image_info = describe_image(image_bytes)
+
+    image_file = os.path.join(output_dir, f"{project_id}.{image_info['imageFormat']}")
+
     result = {
         "projectId": project_id,
-        "description": description,
-        "imageData": image_data
+        "description": description
     }
+    if output_mode == 'base64':
+        result["imageData"] = base64.b64encode(image_bytes).decode('utf-8')
+    else:
+        result["imageFile"] = image_file
+        result.update(image_info)
 
     # Add painting recommendations if available
     if painting_recommendations:
@@ -1444,9 +850,8 @@ def save_results(project_id, description, image_data, painting_recommendations=N
     with open(output_file, "w") as f:
         json.dump(result, f)
 
-    image_file = os.path.join(output_dir, f"{project_id}.png")
     with open(image_file, "wb") as f:
-        f.write(base64.b64decode(image_data))
+        f.write(image_bytes)
 
     # Save painting recommendations to a separate file for easier reading
     if painting_recommendations:
@@ -1458,76 +863,108 @@ def save_results(project_id, description, image_data, painting_recommendations=N
     print(f"Results saved to {output_file} and {image_file}")
     return output_file, image_file
 
-def prevent_room_overlaps(rooms, house_x=0, house_y=0, pixel_width=0, pixel_height=0):
-    """Create a completely new layout with FIXED positions to guarantee no overlaps"""
-    print("Creating FIXED POSITION layout with 100% guaranteed no overlaps")
-
-    # Extract room names and properties from input rooms
-    room_names = []
-    room_properties = {}
-
-    for room in rooms:
-        if 'name' in room:
-            name = room['name']
-            room_names.append(name)
-            # Store all properties except position and size
-            room_properties[name] = {k: v for k, v in room.items() if k not in ['x', 'y', 'width', 'height']}
-        else:
-            name = f"ROOM {len(room_names)+1}"
-            room_names.append(name)
-            room_properties[name] = {}
-
-    # Create a new list of rooms with fixed positions
-    new_rooms = []
-
-    # Calculate grid layout based on house dimensions
-    # Use a grid layout that fits within the house boundaries
-    cols = 3  # Number of columns in the grid
-    rows = (len(room_names) + cols - 1) // cols  # Number of rows needed
-
-    # Calculate cell dimensions with margins
-    margin = 20  # Margin between rooms in pixels
-    cell_width = (pixel_width - (margin * (cols + 1))) / cols
-    cell_height = (pixel_height - (margin * (rows + 1))) / rows
-
-    # Ensure minimum cell size
-    cell_width = max(cell_width, 80)
-    cell_height = max(cell_height, 80)
-
-    # Place rooms in a grid layout
-    for i, room_name in enumerate(room_names):
-        # Calculate grid position
-        row = i // cols
-        col = i % cols
-
-        # Calculate room position with margins
-        x = house_x + margin + col * (cell_width + margin)
-        y = house_y + margin + row * (cell_height + margin)
-
-        # Create new room with grid position
-        new_room = {
-            'name': room_name,
-            'x': x,
-            'y': y,
-            'width': cell_width,
-            'height': cell_height
-        }
-
-        # Add properties from original room
-        if room_name in room_properties:
-            for key, value in room_properties[room_name].items():
-                new_room[key] = value
-
-        new_rooms.append(new_room)
-        print(f"Placed {room_name} at grid position ({row},{col}) with coordinates ({x},{y})")
+def save_generation_artifact(project_id, description, floor_plan_specs, layout, painting_recommendations):
+    """Save the specs and resolved layout as the project's next artifact revision; return (revision, path)"""
+    return save_artifact(project_id, {
+        "description": description,
+        "model": GEMINI_MODEL,
+        "specPromptVersion": SPEC_PROMPT.version,
+        "floorPlanSpecs": floor_plan_specs,
+        "layoutVersion": LAYOUT_VERSION,
+        "layout": layout,
+        "paintingRecommendations": painting_recommendations
+    })
+
+def persist_generation(project_id, description, image_bytes, painting_recommendations, image_format,
+                       floor_plan_specs=None, layout=None):
+    """Save a rendered floor plan for a project and return the result record (without timings).
+
+    Given the layout it was rendered from, the specs and layout are also
+    saved as a new artifact revision.
+    """
+    image_info = describe_image(image_bytes, image_format)
+    artifact_revision = None
+    with span('persist', bytes=len(image_bytes)):
+        json_file, image_file = save_results(project_id, description, image_bytes, painting_recommendations,
+                                             image_info=image_info)
+        if layout is not None:
+            artifact_revision, _ = save_generation_artifact(project_id, description, floor_plan_specs, layout,
+                                                            painting_recommendations)
 
-    print("SUCCESS: Grid layout applied with 100% guaranteed NO overlaps")
-    return new_rooms
+    result = {
+        "success": True,
+        "projectId": project_id,
+        "description": description,
+        "jsonFile": json_file,
+        "imageFile": image_file
+    }
+    result.update(image_info)
+    if artifact_revision is not None:
+        result["artifactRevision"] = artifact_revision
+    # The image is only embedded when a caller still expects it inline
+    if OUTPUT_MODE == 'base64':
+        result["imageData"] = base64.b64encode(image_bytes).decode('utf-8')
+    return result
+
+def finish_generation(project_id, description, floor_plan_specs, painting_recommendations, image_format=None):
+    """Run the layout, render and persist stages for an already analyzed description.
+
+    This is the CPU-bound half of run_generation, split out so batch jobs can
+    run it in worker processes while provider calls run on threads.
+    """
+    if image_format is None:
+        image_format = IMAGE_FORMAT
+
+    with tracing('generation', projectId=project_id) as trace:
+        layout, image_bytes = layout_and_render(description, floor_plan_specs, image_format)
+        print("Successfully generated floor plan image")
+        result = persist_generation(project_id, description, image_bytes, painting_recommendations, image_format,
+                                    floor_plan_specs, layout)
+
+    result["timings"] = trace.summary()
+    return result
+
+def run_generation(project_id, description, image_format=None):
+    """Generate, save and describe a floor plan for a project.
+
+    Shared by the command line entry point and the long-lived worker in
+    floor_plan_server.py, so it raises instead of exiting on failure.
+    """
+    # Analyze once and hand the same specs to the recommend, layout and render stages
+    with tracing('generation', projectId=project_id) as trace:
+        stages = run_provider_stages(description)
+        result = finish_generation(project_id, description, stages['floor_plan_specs'],
+                                   stages['painting_recommendations'], image_format)
+    # finish_generation joined this trace; report it once the provider stages are in too
+    result["timings"] = trace.summary()
+    return result
+
+# Dependencies loaded on first use rather than at import
+LAZY_MODULES = ('requests', 'PIL.Image', 'PIL.ImageDraw', 'PIL.ImageFont', 'numpy')
+
+def import_profile(load_lazy=False):
+    """Report the module's import time and what each lazy dependency cost on first use.
+
+    With load_lazy, dependencies no stage has needed yet are imported now so
+    the report covers all of them.
+    """
+    if load_lazy:
+        for name in LAZY_MODULES:
+            timed_import(name)
+    return {
+        "moduleImportMs": IMPORT_MS,
+        "lazyImportMs": dict(IMPORT_TIMES)
+    }
 
 def main():
     """Main function to generate a floor plan"""
+    if '--import-profile' in sys.argv[1:]:
+        print(json.dumps(import_profile(load_lazy=True), indent=2))
+        return
+
     if len(sys.argv) < 3:
         print("Usage: python generate_floor_plan.py <project_id> <prompt>")
+        print("       python generate_floor_plan.py --import-profile")
         sys.exit(1)
 
     project_id = sys.argv[1]
@@ -1542,38 +979,18 @@ def main():
         # If there's still an encoding error, print a simplified message
         print("Using provided description (contains special characters)")
 
-    # Variable to store painting recommendations
-    painting_recommendations = None
-
     try:
-        # First, get floor plan specs from Gemini
-        floor_plan_specs = get_floor_plan_details_from_gemini(description)
-
-        # Then, get painting recommendations from Groq
-        painting_recommendations = get_painting_recommendations_from_groq(floor_plan_specs, description)
-        print("Got painting recommendations from Groq")
-
-        # Generate the floor plan image
-        image_data = generate_floor_plan_image(description)
-        print("Successfully generated floor plan image")
+        result = run_generation(project_id, description)
     except Exception as e:
         print(f"Error generating floor plan image: {e}")
         sys.exit(1)
 
-    json_file, image_file = save_results(project_id, description, image_data, painting_recommendations)
-
-    result = {
-        "success": True,
-        "projectId": project_id,
-        "description": description,
-        "jsonFile": json_file,
-        "imageFile": image_file,
-        "imageData": image_data
-    }
-
     print("\n===JSON_RESULT_START===\n")
     print(json.dumps(result))
     print("\n===JSON_RESULT_END===\n")
 
+# Time from the first line of this module to here, including its eager imports
+IMPORT_MS = round((time.perf_counter() - _import_started) * 1000, 2)
+
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
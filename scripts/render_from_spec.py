@@ -0,0 +1,125 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Re-render floor plans from their saved artifacts, without calling Gemini or Groq.
+
+Every generation saves its parsed spec and resolved layout as a versioned
+artifact (see floor_plan_artifacts.py). This script renders a project's
+latest revision again, for example in another image format or after a
+renderer fix. If the artifact was saved by older layout code (its
+layoutVersion differs from LAYOUT_VERSION), or with --relayout, the
+layout is recomputed from the stored spec and saved as a new revision.
+Re-rendering a whole catalogue therefore costs CPU only.
+
+Usage: python render_from_spec.py <project_id> [<project_id> ...] [--revision N]
+       python render_from_spec.py --all [--format png|webp|svg] [--relayout] [--workers N]
+       python render_from_spec.py --all --prune KEEP
+"""
+
+import os
+import sys
+import json
+import argparse
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import generate_floor_plan
+from floor_plan_artifacts import list_projects, load_artifact, prune_artifacts
+from floor_plan_trace import span, tracing
+
+
+def render_project(project_id, image_format=None, revision=None, relayout=False):
+    """Render one project from its artifact, save the image and return the result record"""
+    artifact = load_artifact(project_id, revision)
+    if artifact is None:
+        return {"success": False, "projectId": project_id, "error": "No saved artifact"}
+    if image_format is None:
+        image_format = generate_floor_plan.IMAGE_FORMAT
+
+    description = artifact['description']
+    floor_plan_specs = artifact.get('floorPlanSpecs')
+    relayout = relayout or artifact.get('layoutVersion') != generate_floor_plan.LAYOUT_VERSION
+
+    with tracing('render-from-spec', projectId=project_id) as trace:
+        if relayout:
+            with span('layout') as layout_span:
+                layout = generate_floor_plan.layout_floor_plan(description, floor_plan_specs)
+                layout_span['rooms'] = len(layout['rooms'])
+        else:
+            layout = artifact['layout']
+        image_bytes = generate_floor_plan.render_image(layout, image_format)
+        # Only a recomputed layout is new enough to be worth another revision
+        result = generate_floor_plan.persist_generation(
+            project_id, description, image_bytes, artifact.get('paintingRecommendations'), image_format,
+            floor_plan_specs if relayout else None, layout if relayout else None)
+
+    result["fromRevision"] = artifact['revision']
+    result["relayout"] = relayout
+    result["timings"] = trace.summary()
+    return result
+
+
+def _render_safely(project_id, image_format, revision, relayout):
+    try:
+        return render_project(project_id, image_format, revision, relayout)
+    except Exception as e:
+        return {"success": False, "projectId": project_id, "error": str(e)}
+
+
+def render_projects(project_ids, image_format=None, revision=None, relayout=False, workers=None):
+    """Render every project on a process pool and yield the results in project order"""
+    workers = workers or os.cpu_count() or 1
+    if workers == 1 or len(project_ids) == 1:
+        for project_id in project_ids:
+            yield _render_safely(project_id, image_format, revision, relayout)
+        return
+    count = len(project_ids)
+    # Spawned, not forked, so callers with threads running don't hand children locked locks
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn')) as pool:
+        yield from pool.map(_render_safely, project_ids, [image_format] * count, [revision] * count,
+                            [relayout] * count)
+
+
+def main():
+    """Main function to re-render floor plans from saved artifacts"""
+    parser = argparse.ArgumentParser(description="Re-render floor plans from saved specs without provider calls")
+    parser.add_argument("projects", nargs='*', help="Project ids to re-render")
+    parser.add_argument("--all", action="store_true", help="Re-render every project with a saved artifact")
+    parser.add_argument("--revision", type=int, default=None,
+                        help="Artifact revision to render (default: the latest; single project only)")
+    parser.add_argument("--format", choices=sorted(generate_floor_plan.IMAGE_MIME_TYPES), default=None)
+    parser.add_argument("--relayout", action="store_true",
+                        help="Recompute the layout from the stored spec even if the stored layout is current")
+    parser.add_argument("--workers", type=int, default=None, help="Render processes (default: CPU count)")
+    parser.add_argument("--prune", type=int, default=None, metavar="KEEP",
+                        help="Instead of rendering, delete all but the newest KEEP revisions of each project")
+    args = parser.parse_args()
+
+    project_ids = list_projects() if args.all else args.projects
+    if not project_ids:
+        parser.error("give project ids or --all")
+    if args.prune is not None:
+        if args.prune < 1:
+            parser.error("--prune needs to keep at least one revision")
+        removed = sum(prune_artifacts(project_id, args.prune) for project_id in project_ids)
+        print(f"Deleted {removed} old revisions from {len(project_ids)} projects")
+        return
+    if args.revision is not None and len(project_ids) != 1:
+        parser.error("--revision needs exactly one project")
+
+    failed = 0
+    for result in render_projects(project_ids, args.format, args.revision, args.relayout, args.workers):
+        result.pop("imageData", None)
+        print(json.dumps(result))
+        failed += not result.get('success')
+
+    print(f"Re-rendered {len(project_ids) - failed} of {len(project_ids)} projects")
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
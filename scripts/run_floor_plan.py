@@ -4,11 +4,14 @@
 """
 Wrapper script for generate_floor_plan.py that handles Unicode characters properly.
 This script ensures that the floor plan generator can process descriptions with special characters.
+
+The generator runs in this interpreter rather than in a second child process,
+so each call pays for Python startup and the generator imports only once.
+For repeated calls, run floor_plan_server.py and point the app at it instead.
 """
 
 import os
 import sys
-import subprocess
 import json
 
 def main():
@@ -22,52 +25,27 @@ def main():
     
     # Replace problematic Unicode characters with ASCII equivalents
     description = description.replace('₹', 'Rs.')
-    
+
+    # Make sure the generator sits on the import path regardless of cwd
+    script_dir = os.path.dirname(os.path.abspath(__file__))
+    if script_dir not in sys.path:
+        sys.path.insert(0, script_dir)
+
+    # Importing the generator switches stdout/stderr to UTF-8
+    import generate_floor_plan
+
     print(f"Processing project: {project_id}")
     print(f"Description: {description[:100]}...")
     
-    # Get the path to the generate_floor_plan.py script
-    script_dir = os.path.dirname(os.path.abspath(__file__))
-    generator_script = os.path.join(script_dir, "generate_floor_plan.py")
-    
-    # Set environment variables to handle Unicode
-    env = os.environ.copy()
-    env["PYTHONIOENCODING"] = "utf-8"
-    
     try:
-        # Run the generator script with the processed description
-        result = subprocess.run(
-            [sys.executable, generator_script, project_id, description],
-            capture_output=True,
-            text=True,
-            encoding='utf-8',
-            env=env
-        )
-        
-        # Check for errors
-        if result.returncode != 0:
-            print(f"Error running floor plan generator: {result.stderr}")
-            sys.exit(1)
-        
-        # Extract the JSON result from the output
-        output = result.stdout
-        json_start = output.find("===JSON_RESULT_START===")
-        json_end = output.find("===JSON_RESULT_END===")
-        
-        if json_start >= 0 and json_end >= 0:
-            json_str = output[json_start + len("===JSON_RESULT_START==="):json_end].strip()
-            try:
-                result_data = json.loads(json_str)
-                print(json.dumps(result_data))
-            except json.JSONDecodeError:
-                print("Error parsing JSON result")
-                print(output)
-        else:
-            print(output)
-        
+        result_data = generate_floor_plan.run_generation(project_id, description)
     except Exception as e:
-        print(f"Error: {e}")
+        print(f"Error running floor plan generator: {e}")
         sys.exit(1)
 
+    print("\n===JSON_RESULT_START===\n")
+    print(json.dumps(result_data))
+    print("\n===JSON_RESULT_END===\n")
+
 if __name__ == "__main__":
     main()
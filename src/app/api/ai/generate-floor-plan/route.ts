@@ -10,8 +10,56 @@ import { promisify } from 'util';
 // Promisify exec for async/await usage
 const execAsync = promisify(exec);
 
+// Upper bound on generator processes running at once when no worker is configured
+const MAX_GENERATOR_PROCESSES = parseInt(process.env.FLOOR_PLAN_MAX_PROCESSES || '4', 10);
+let runningGenerators = 0;
+
+// Thrown when the generator is at capacity, so the caller can answer 503 right away
+class GeneratorBusyError extends Error {
+  retryAfter: number;
+
+  constructor(message: string, retryAfter = 5) {
+    super(message);
+    this.name = 'GeneratorBusyError';
+    this.retryAfter = retryAfter;
+  }
+}
+
+// Function to generate floor plan blueprint image using the long-lived Python worker (scripts/floor_plan_server.py)
+async function generateFloorPlanWithWorker(workerUrl: string, projectId: string, prompt: string) {
+  console.log(`Requesting floor plan from worker at ${workerUrl}`);
+  const response = await fetch(`${workerUrl.replace(/\/$/, '')}/generate`, {
+    method: 'POST',
+    headers: {
+      'Content-Type': 'application/json',
+    },
+    body: JSON.stringify({ projectId, description: prompt }),
+  });
+
+  const result = await response.json();
+  if (response.status === 503 || response.status === 429) {
+    throw new GeneratorBusyError(result.error || 'Floor plan worker is busy',
+      parseInt(response.headers.get('Retry-After') || '5', 10));
+  }
+  if (!response.ok) {
+    throw new Error(result.error || `Floor plan worker returned ${response.status}`);
+  }
+  return result;
+}
+
 // Function to generate floor plan blueprint image using the Python script with Gemini-enhanced blueprint generator
 async function generateFloorPlan(projectId: string, prompt: string) {
+  // Prefer the warm worker when one is configured, to skip interpreter startup and imports
+  const workerUrl = process.env.FLOOR_PLAN_WORKER_URL;
+  if (workerUrl) {
+    return generateFloorPlanWithWorker(workerUrl, projectId, prompt);
+  }
+
+  if (runningGenerators >= MAX_GENERATOR_PROCESSES) {
+    throw new GeneratorBusyError(`${runningGenerators} floor plan generators are already running`);
+  }
+  runningGenerators++;
+
   try {
     // Get the absolute path to the wrapper script
     const scriptPath = path.join(process.cwd(), 'scripts', 'run_floor_plan.py');
@@ -58,6 +106,8 @@ async function generateFloorPlan(projectId: string, prompt: string) {
   } catch (error) {
     console.error('Error executing Python script:', error);
     throw error;
+  } finally {
+    runningGenerators--;
   }
 }
 
@@ -120,21 +170,38 @@ export async function POST(req: Request) {
       }
 
       console.log('Floor plan generated successfully');
+      if (result.timings) {
+        console.log('Floor plan timings:', JSON.stringify(result.timings));
+      }
 
       // Store the description in the project
       project.floorPlanDescription = result.description;
 
-      // Create a data URL from the base64 image
-      dataUrl = `data:image/png;base64,${result.imageData}`;
+      // Create a data URL from the image. The generator normally hands back only the
+      // path of the PNG (or SVG) it wrote, so the bytes are read and encoded exactly once here.
+      const mimeType = result.imageMimeType || 'image/png';
+      if (result.imageData) {
+        dataUrl = `data:${mimeType};base64,${result.imageData}`;
+      } else {
+        const imagePath = path.resolve(process.cwd(), result.imageFile);
+        dataUrl = `data:${mimeType};base64,${fs.readFileSync(imagePath).toString('base64')}`;
+      }
 
       // Create a public URL for the image file
       const baseUrl = process.env.NEXT_PUBLIC_APP_URL || 'http://localhost:3000';
-      const publicImageUrl = `${baseUrl}/floor-plans/${project._id}.png`;
+      const publicImageUrl = `${baseUrl}/floor-plans/${path.basename(result.imageFile || `${project._id}.png`)}`;
 
       console.log('Floor plan image saved at:', publicImageUrl);
     } catch (error) {
       console.error('Error generating floor plan:', error);
 
+      if (error instanceof GeneratorBusyError) {
+        return NextResponse.json(
+          { error: 'The floor plan generator is busy. Please try again in a few seconds.' },
+          { status: 503, headers: { 'Retry-After': String(error.retryAfter) } }
+        );
+      }
+
       // Return an error response
       return NextResponse.json(
         { error: 'Failed to generate floor plan. Please try again.' },